@@ -1,25 +1,65 @@
+import atexit
+import math
 import pickle
+import time
 from collections import OrderedDict
+from contextlib import ExitStack
 from enum import Enum
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
 
+import pandas as pd
 import typer
 import json
 
+from refida import bundle, canonical
 from refida import data as dm
+from refida import distill
 from refida import etl as em
+from refida import explain as xm
 from refida import features
+from refida import gazetteer as gz
+from refida import geo_index, registry
+from refida import sentences as sm
 from refida.search_index import LexicalIndexDoc, SemIndexDoc, SemIndexSent
 from settings import (
+    CONTINENTS,
     DATA_DETAILS,
     DATA_DIR,
+    DATA_ENTITY_SECTIONS,
     DATA_RESEARCH,
     DATA_SOURCES,
     DATA_SUMMARY,
     DATA_TEXT,
+    DEFAULT_FILTER_TOPICS_SCORE_THRESHOLD,
+    EXPLAIN_N_JOBS,
+    EXPLAIN_THRESHOLD,
+    FEATURE_ENTITY_CANONICAL,
+    FEATURE_ENTITY_TEXT,
     FEATURE_TOPIC_GROUP,
+    FEATURE_TOPIC_SCORE,
     FEATURE_TOPIC_TOPIC,
+    FEATURES_BATCH_SIZE,
+    FIELD_ID,
+    GEOCODE_CONCURRENCY,
+    GEOCODER,
+    GEOCODER_FALLBACK,
+    MODELS_BUNDLE_DATADIR,
     SEARCH_COLUMN,
+    SENTENCES_N_JOBS,
+    SENTENCES_SECTIONS,
+    SPACY_FAST_LANGUAGE_MODEL,
+    SPACY_N_PROCESS,
+    SUMMARISATION_DECODING,
+    SUMMARISATION_DECODING_PRESETS,
+    SUMMARISATION_QUANTIZE,
     TOPIC_CLASSIFICATION_AREAS,
+    TOPIC_CLASSIFICATION_FIELDS_OF_RESEARCH,
+    TOPIC_CLASSIFICATION_GROUP_THRESHOLD,
+    TOPIC_CLASSIFICATION_OUTPUTS,
+    TOPIC_CLASSIFICATION_PREFILTER,
     TOPIC_CLASSIFICATION_TOPICS,
     get_fields_of_research,
     get_outputs,
@@ -28,6 +68,28 @@ from settings import (
 app = typer.Typer()
 
 
+@app.callback()
+def main(timings: bool = False):
+    """
+    Process the impact case studies data for the dashboard.
+
+    :param timings: Report the time taken to load each model, and its memory.
+    """
+    if timings:
+        atexit.register(report_models)
+
+
+def report_models():
+    """
+    Print the load time and estimated memory of the models loaded by the command.
+    """
+    for row in registry.registry.report():
+        typer.echo(
+            f"Loaded {row['kind']} {row['name']} in {row['seconds']:.1f}s, "
+            f"{row['memory']}MB{'' if row['loaded'] else ', evicted'}."
+        )
+
+
 @app.command()
 def etl(datadir: str = DATA_DIR.name):
     """
@@ -58,6 +120,42 @@ def error(msg: str):
     raise typer.Abort()
 
 
+@app.command()
+def sentences(
+    datadir: str = DATA_DIR.name,
+    workers: int = SENTENCES_N_JOBS,
+    batch_size: int = FEATURES_BATCH_SIZE,
+):
+    """
+    Split the sections of the data into sentences, once, for the commands and the
+    dashboard features that process sentences. The sentence table has the sentence id,
+    document id, section and character offsets of each sentence.
+
+    :param datadir: Path to the data directory.
+    :param workers: Number of processes splitting the documents of a batch.
+    :param batch_size: Number of documents to split, and write, at a time.
+    """
+    n_docs = get_n_docs(datadir, [])
+
+    path = dm.get_sentences_data_path(datadir)
+    batches = sm.stream_sentences(
+        dm.get_etl_chunks([FIELD_ID] + SENTENCES_SECTIONS, datadir, batch_size),
+        n_jobs=workers,
+    )
+
+    n_sentences = 0
+    with typer.progressbar(
+        batches,
+        length=get_n_batches(n_docs, batch_size),
+        label="Splitting sentences...",
+    ) as progress:
+        for idx, table in enumerate(progress):
+            write_batch(table, path, idx)
+            n_sentences += len(table)
+
+    typer.echo(f"Split {n_docs} documents into {n_sentences} sentences.")
+
+
 class TopicsSection(str, Enum):
     """
     Enum for the sections of the topics data.
@@ -69,87 +167,478 @@ class TopicsSection(str, Enum):
     research = DATA_RESEARCH
 
 
+class TopicsAction(str, Enum):
+    """
+    Enum for the topics command actions.
+    """
+
+    classify = "classify"
+    distill = "distill"
+
+
 @app.command()
-def topics(datadir: str = DATA_DIR.name, column: TopicsSection = TopicsSection.text):
+def topics(
+    action: TopicsAction = typer.Argument(TopicsAction.classify),
+    datadir: str = DATA_DIR.name,
+    column: TopicsSection = TopicsSection.text,
+    prefilter: int = TOPIC_CLASSIFICATION_PREFILTER,
+    hierarchical: bool = False,
+    group_threshold: float = TOPIC_CLASSIFICATION_GROUP_THRESHOLD,
+    fast: bool = False,
+    batch_size: int = FEATURES_BATCH_SIZE,
+):
     """
-    Apply topic classification to the data.
+    Apply topic classification to the data, or distill a fast topic classifier from
+    the topics data.
 
+    :param action: `classify` the data or `distill` a classifier.
     :param datadir: Path to the data directory.
     :param column: Column to use for topic classification.
+    :param prefilter: Number of candidate topics, selected by sentence similarity, to
+        classify per document, 0 to classify all the topics.
+    :param hierarchical: Classify the topic groups first and only classify the topics
+        of the matching groups, for the columns with grouped topics.
+    :param group_threshold: Minimum score for a topic group to be matched.
+    :param fast: Use the distilled classifier instead of the zero shot model, it
+        cannot be combined with the prefilter or the hierarchical classification.
+    :param batch_size: Number of documents to classify, and write, at a time.
     """
-    with typer.progressbar(length=2, label="Topic classification...") as progress:
+    if action == TopicsAction.distill:
+        return distill_topics(datadir, column)
+
+    n_docs = get_n_docs(datadir, [column])
+
+    groups, labels, hierarchy = get_topic_labels(column)
+    if not hierarchical:
+        hierarchy = None
+
+    distilled = None
+    if fast:
+        distilled = get_distilled_model(column, datadir, prefilter, hierarchical)
+
+    previous = dm.get_topics_data(column, datadir)
+    path = dm.get_topics_data_path(column, datadir)
+
+    # number of (document, label) pairs scored by the model in each batch
+    pairs: list[int] = []
+    batches = features.stream_topic_classification(
+        dm.get_batches(column, datadir, batch_size),
+        topics=labels,
+        prefilter=prefilter,
+        hierarchy=hierarchy,
+        group_threshold=group_threshold,
+        distilled=distilled,
+        pairs=pairs,
+    )
+
+    with typer.progressbar(
+        batches,
+        length=get_n_batches(n_docs, batch_size),
+        label="Topic classification...",
+    ) as progress:
+        for idx, topics in enumerate(progress):
+            topics[FEATURE_TOPIC_GROUP] = topics[FEATURE_TOPIC_TOPIC]
+            if groups:
+                topics[FEATURE_TOPIC_GROUP] = topics[FEATURE_TOPIC_GROUP].apply(
+                    groups.get
+                )
+
+            write_batch(topics, path, idx)
+
+    topics = dm.get_topics_data(column, datadir)
+    if topics is None:
+        return
+
+    dm.save_topics_matrix(topics, dm.get_topics_matrix_path(column, datadir))
+
+    if hierarchy or 0 < prefilter < len(labels):
+        # the documents with text all have topics
+        n_docs = topics[FIELD_ID].nunique()
+        report_pruning(sum(pairs), n_docs * len(labels), previous, topics)
+
+
+def get_topic_labels(
+    column: TopicsSection,
+) -> tuple[Optional[dict[str, str]], list[str], Optional[dict[str, list[str]]]]:
+    """
+    Return the topic group of each topic, the topics and the topics grouped by topic
+    group, for the column. The columns without grouped topics have no groups.
+
+    :param column: Column to use for topic classification.
+    """
+    if column in [TopicsSection.details, TopicsSection.summary]:
+        groups, labels = get_outputs()
+        return groups, labels, TOPIC_CLASSIFICATION_OUTPUTS
+
+    if column == TopicsSection.research:
+        groups, labels = get_fields_of_research()
+        return groups, labels, TOPIC_CLASSIFICATION_FIELDS_OF_RESEARCH
+
+    return None, TOPIC_CLASSIFICATION_TOPICS, None
+
+
+def get_distilled_model(
+    column: TopicsSection, datadir: str, prefilter: int, hierarchical: bool
+) -> dict:
+    """
+    Return the distilled classifier for the column, the distilled classifier scores
+    all the topics, so it cannot be combined with the prefilter or the hierarchical
+    classification.
+
+    :param column: Column to use for topic classification.
+    :param datadir: Path to the data directory.
+    :param prefilter: Number of candidate topics to classify per document.
+    :param hierarchical: Wether to classify the topic groups first.
+    """
+    if prefilter or hierarchical:
+        error("The --fast option cannot be used with --prefilter or --hierarchical.")
+
+    distilled = dm.get_distilled_model(column, datadir)
+    if distilled is None:
+        error("No distilled classifier found. Run `topics distill` first.")
+
+    return distilled
+
+
+def get_n_docs(datadir: str, columns: list[str]) -> int:
+    """
+    Return the number of documents in the etl data, without loading their text. Exits
+    with an error when there is no data, or when a column is not in the data.
+
+    :param datadir: Path to the data directory.
+    :param columns: Columns the command processes.
+    """
+    found = dm.get_etl_columns(datadir)
+    if found is None:
+        error("No data found. Run the `etl` command first.")
+
+    for column in columns:
+        if column not in found:
+            error(f"Column {column} not found in data.")
+
+    return dm.get_etl_size(datadir)
+
+
+def get_n_batches(n_rows: int, batch_size: int) -> int:
+    """
+    Return the number of batches the data is processed in.
+
+    :param n_rows: Number of rows to process.
+    :param batch_size: Number of rows per batch.
+    """
+    return math.ceil(n_rows / batch_size)
+
+
+def write_batch(data: pd.DataFrame, path: Path, idx: int):
+    """
+    Write a batch of results to a CSV file, the first batch overwrites the file.
+
+    :param data: Batch of results.
+    :param path: Path to the CSV file.
+    :param idx: Index of the batch.
+    """
+    data.to_csv(path, mode="a" if idx else "w", header=not idx, index=False)
+
+
+def distill_topics(datadir: str, column: TopicsSection):
+    """
+    Train a fast topic classifier on the output of the topic classification.
+
+    :param datadir: Path to the data directory.
+    :param column: Column the topic classification was applied to.
+    """
+    with typer.progressbar(length=2, label="Distilling topics...") as progress:
         data = dm.get_etl_data(datadir)
+        topics = dm.get_topics_data(column, datadir)
         progress.update(1)
 
         if data is None:
             error("No data found. Run the `etl` command first.")
 
-        if column not in data.columns:
-            error(f"Column {column} not found in data.")
+        if topics is None:
+            error("No topics found. Run the `topics` command first.")
 
-        labels = TOPIC_CLASSIFICATION_TOPICS
-        groups = None
-        if column in [TopicsSection.details, TopicsSection.summary]:
-            groups, labels = get_outputs()
-        elif column == TopicsSection.research:
-            groups, labels = get_fields_of_research()
+        labels = sorted(topics[FEATURE_TOPIC_TOPIC].unique())
+        distilled = features.distill_topic_classification(data, column, topics, labels)
+        distill.save(dm.get_distilled_model_path(column, datadir), **distilled)
 
-        topics = features.topic_classification(data, column, labels)
-        topics[FEATURE_TOPIC_GROUP] = topics[FEATURE_TOPIC_TOPIC]
-        if groups:
-            topics[FEATURE_TOPIC_GROUP] = topics[FEATURE_TOPIC_GROUP].apply(groups.get)
+        progress.update(1)
 
-        topics.to_csv(dm.get_topics_data_path(column, datadir), index=False)
 
-        progress.update(1)
+def report_pruning(
+    pairs: int,
+    total: int,
+    previous: Optional[pd.DataFrame],
+    topics: pd.DataFrame,
+    threshold: float = DEFAULT_FILTER_TOPICS_SCORE_THRESHOLD,
+):
+    """
+    Print the cost reduction of a pruned topic classification and, when the output of
+    a previous run exists, the recall against it.
+
+    :param pairs: Number of (document, label) pairs scored by the model.
+    :param total: Number of (document, topic) pairs in a full classification.
+    :param previous: Topics from a previous run.
+    :param topics: Topics from the pruned run.
+    :param threshold: Minimum score for the topics to be compared.
+    """
+    typer.echo(
+        f"Classified {pairs} of {total} document/topic pairs, "
+        f"{total / max(pairs, 1):.1f}x fewer classification pairs."
+    )
+
+    if previous is not None:
+        recall = features.topics_recall(previous, topics, threshold)
+        if recall is not None:
+            typer.echo(
+                f"Recall against the previous run, for scores >= {threshold}: "
+                f"{recall:.2%}"
+            )
 
 
 @app.command()
-def areas(datadir: str = DATA_DIR.name, threshold: float = 0.5):
+def areas(
+    datadir: str = DATA_DIR.name,
+    threshold: float = 0.5,
+    batch_size: int = FEATURES_BATCH_SIZE,
+):
     """
     Apply topic classification to the data to extracts areas of strenght, improvements,
     and future plans.
 
     :param datadir: Path to the data directory.
     :param threshold: Minimum score for the topics to be included in the results.
+    :param batch_size: Number of documents to classify, and write, at a time.
     """
+    column = TopicsSection.details
+    n_docs = get_n_docs(datadir, [column])
+
+    path = dm.get_topics_data_path(f"areas_{column}", datadir)
+
+    # the sentences are segmented when the sentence table was not built
+    sentences_data = dm.get_sentences_data(column.value, datadir)
+
+    batches = features.stream_topic_classification(
+        dm.get_batches(column, datadir, batch_size),
+        topics=TOPIC_CLASSIFICATION_AREAS,
+        sentences=True,
+        threshold=threshold,
+        sentences_data=sentences_data,
+    )
+
     with typer.progressbar(
-        length=2, label="Topic classification, areas..."
+        batches,
+        length=get_n_batches(n_docs, batch_size),
+        label="Topic classification, areas...",
     ) as progress:
-        data = dm.get_etl_data(datadir)
-        progress.update(1)
+        for idx, topics in enumerate(progress):
+            write_batch(topics, path, idx)
 
-        if data is None:
-            error("No data found. Run the `etl` command first.")
 
-        column = TopicsSection.details
-        labels = TOPIC_CLASSIFICATION_AREAS
-        topics = features.topic_classification(
-            data, column, labels, sentences=True, threshold=threshold
-        )
-        topics.to_csv(dm.get_topics_data_path(f"areas_{column}", datadir), index=False)
+class ExplainMethod(str, Enum):
+    """
+    Enum for the explain command methods.
+    """
 
-        progress.update(1)
+    shap = "shap"
+    occlusion = "occlusion"
+
+
+@app.command()
+def explain(
+    datadir: str = DATA_DIR.name,
+    column: TopicsSection = TopicsSection.text,
+    method: ExplainMethod = ExplainMethod.shap,
+    threshold: float = EXPLAIN_THRESHOLD,
+    workers: int = EXPLAIN_N_JOBS,
+    batch_size: int = FEATURES_BATCH_SIZE,
+):
+    """
+    Precompute the explanations, the attribution of each token of the text, of the
+    topics of the documents for the dashboard. The explanations already computed are
+    kept, and each batch is written to a shard, merged into the store at the end, so
+    that the command can resume.
+
+    :param datadir: Path to the data directory.
+    :param column: Column the topics were classified from.
+    :param method: Explain the tokens with `shap`, or the sentences with `occlusion`,
+        faster, see `EXPLAIN_OCCLUSION_MAX_PASSES`.
+    :param threshold: Minimum score for the topics to be explained.
+    :param workers: Number of processes explaining the documents of a batch.
+    :param batch_size: Number of documents to explain, and write, at a time.
+    """
+    data = dm.get_etl_data(datadir)
+    if data is None:
+        error("No data found. Run the `etl` command first.")
+
+    if column not in data.columns:
+        error(f"Column {column} not found in data.")
+
+    topics = dm.get_topics_data(column, datadir)
+    if topics is None:
+        error("No topics data found. Run the `topics` command first.")
+
+    label = column.value
+    explainer = xm.explain_topics
+    if method == ExplainMethod.occlusion:
+        label = f"{method.value}_{column.value}"
+        explainer = xm.sentence_occlusion
+        offsets = sm.get_offsets_by_id(dm.get_sentences_data(column.value, datadir))
+
+    # the shards of an interrupted run are merged first
+    store = dm.merge_explanations(label, datadir)
+    done = store["index"] if store is not None else {}
+
+    topics = topics[topics[FEATURE_TOPIC_SCORE] >= threshold]
+    topics = topics[
+        [
+            (str(doc_id), topic) not in done
+            for doc_id, topic in zip(topics[FIELD_ID], topics[FEATURE_TOPIC_TOPIC])
+        ]
+    ]
+    topics = topics.groupby(FIELD_ID)[FEATURE_TOPIC_TOPIC].agg(
+        lambda x: sorted(set(x))
+    )
+
+    data = data[[FIELD_ID, column]].dropna()
+    data = data.merge(topics, left_on=FIELD_ID, right_index=True)
+    rows = list(data.itertuples(index=False, name=None))
+    if method == ExplainMethod.occlusion:
+        rows = [
+            (doc_id, sm.split(text, offsets.get(str(doc_id))), doc_topics)
+            for doc_id, text, doc_topics in rows
+        ]
+
+    batches = xm.stream_explanations(
+        iter_batches(rows, batch_size), n_jobs=workers, explainer=explainer
+    )
+
+    n_explanations = 0
+    with typer.progressbar(
+        batches,
+        length=get_n_batches(len(rows), batch_size),
+        label="Explaining topics...",
+    ) as progress:
+        for idx, batch in enumerate(progress):
+            shard = dm.get_explanations_shard_path(label, idx, datadir)
+            dm.save_explanations(batch, shard)
+            n_explanations += len(batch)
+
+    store = dm.merge_explanations(label, datadir)
+    typer.echo(
+        f"Explained {n_explanations} document topics, "
+        f"{len(store['ids']) if store is not None else 0} in the store."
+    )
+
+
+def iter_batches(rows: list, batch_size: int) -> Iterator[list]:
+    """
+    Yield the rows in batches of `batch_size` rows.
+
+    :param rows: Rows to batch.
+    :param batch_size: Number of rows per batch.
+    """
+    iterator = iter(rows)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+SummaryDecoding = Enum(  # type: ignore
+    "SummaryDecoding", {name: name for name in SUMMARISATION_DECODING_PRESETS}, type=str
+)
+
+
+class SummaryMode(str, Enum):
+    """
+    Enum for the summaries command modes.
+    """
+
+    abstractive = "abstractive"
+    extractive = "extractive"
 
 
 @app.command()
-def summaries(datadir: str = DATA_DIR.name):
+def summaries(
+    datadir: str = DATA_DIR.name,
+    mode: SummaryMode = SummaryMode.abstractive,
+    batch_size: int = FEATURES_BATCH_SIZE,
+    decoding: SummaryDecoding = SummaryDecoding(SUMMARISATION_DECODING),
+    quantize: bool = SUMMARISATION_QUANTIZE,
+    cache: bool = True,
+    chunked: bool = False,
+):
     """
     Summarise the text of in the data.
 
     :param datadir: Path to the data directory.
+    :param mode: Generate the summaries with the summarisation model, abstractive, or
+        select the most central sentences of the text, extractive. The other options
+        only apply to the abstractive mode.
+    :param batch_size: Number of documents to summarise, and write, at a time.
+    :param decoding: Decoding preset used to generate the summaries.
+    :param quantize: Use a dynamically quantised model, on CPU.
+    :param cache: Reuse the cached summaries of texts that have not changed.
+    :param chunked: Summarise long texts in chunks, instead of truncating them.
     """
-    with typer.progressbar(length=2, label="Summarising text...") as progress:
-        data = dm.get_etl_data(datadir)
-        progress.update(1)
+    n_docs = get_n_docs(datadir, [DATA_TEXT])
 
-        if data is None:
-            error("No data found. Run the `etl` command first.")
+    # number of characters of the texts of each batch, for the throughput
+    n_chars: list[int] = []
+    texts = count_characters(dm.get_batches(DATA_TEXT, datadir, batch_size), n_chars)
 
-        summaries = features.summarise(data)
-        summaries.to_csv(dm.get_summaries_data_path(datadir), index=False)
+    path = dm.get_summaries_data_path(datadir)
+    if mode == SummaryMode.extractive:
+        batches = features.stream_extractive_summarise(
+            texts, sentences_data=dm.get_sentences_data(DATA_TEXT, datadir)
+        )
+    else:
+        batches = features.stream_summarise(
+            texts,
+            decoding=decoding.value,
+            quantize=quantize,
+            cache=dm.get_summaries_cache_path(datadir) if cache else None,
+            chunked=chunked,
+        )
 
-        progress.update(1)
+    start = time.perf_counter()
+    with typer.progressbar(
+        batches, length=get_n_batches(n_docs, batch_size), label="Summarising text..."
+    ) as progress:
+        for idx, summaries in enumerate(progress):
+            write_batch(summaries, path, idx)
+
+    report_throughput(time.perf_counter() - start, n_docs, sum(n_chars), "characters")
+
+
+def count_characters(
+    batches: Iterable[list[tuple[str, str]]], n_chars: list[int]
+) -> Iterator[list[tuple[str, str]]]:
+    """
+    Yield the batches of (id, text), appending the number of characters of the texts
+    of each batch to `n_chars`.
+
+    :param batches: Batches of (id, text).
+    :param n_chars: List the number of characters of each batch is appended to.
+    """
+    for batch in batches:
+        n_chars.append(sum(len(text) for _, text in batch if isinstance(text, str)))
+        yield batch
+
+
+def report_throughput(seconds: float, n_docs: int, n_units: int, units: str):
+    """
+    Print the number of documents, and of units of text, processed per second.
+
+    :param seconds: Time taken to process the documents.
+    :param n_docs: Number of documents processed.
+    :param n_units: Number of units of text, for example tokens, processed.
+    :param units: Name of the units of text.
+    """
+    seconds = max(seconds, 1e-9)
+    typer.echo(
+        f"Processed {n_docs} documents in {seconds:.1f}s: "
+        f"{n_docs / seconds:.2f} documents/s, {n_units / seconds:.0f} {units}/s."
+    )
 
 
 class EntitySection(str, Enum):
@@ -164,45 +653,192 @@ class EntitySection(str, Enum):
 
 @app.command()
 def entities(
-    datadir: str = DATA_DIR.name, column: EntitySection = EntitySection.summary
+    datadir: str = DATA_DIR.name,
+    column: EntitySection = EntitySection.summary,
+    all_sections: bool = False,
+    batch_size: int = FEATURES_BATCH_SIZE,
+    workers: int = SPACY_N_PROCESS,
+    tiered: bool = False,
+    baseline: str = "",
 ):
     """
     Extract entities from the data of the text of the given column.
 
     :param datadir: Path to the data directory.
     :param column: Name of the column to extract entities from.
+    :param all_sections: Extract entities from all the sections in one pass, loading
+        the model once, instead of only from the given column.
+    :param batch_size: Number of documents to process, by spaCy, and write at a time.
+    :param workers: Number of spaCy processes.
+    :param tiered: Process the text with a fast model first, and only process the
+        sentences that may contain entities with the transformer model.
+    :param baseline: Path to a data directory with the entities of a reference run,
+        for example with the transformer model over the full text, to report the
+        agreement of the extracted entities with.
     """
-    with typer.progressbar(
-        length=2, label=f"Extracting {column} entities..."
-    ) as progress:
-        data = dm.get_etl_data(datadir)
-        progress.update(1)
+    sections = (
+        [section.value for section in EntitySection] if all_sections else [column.value]
+    )
+    n_docs = get_n_docs(datadir, sections)
 
-        if data is None:
-            error("No data found. Run the `etl` command first.")
+    references = get_baseline_entities(baseline, datadir, sections)
 
-        if column not in data.columns:
-            error(f"Column {column} not found in data.")
+    batches = features.stream_sections_entity_extraction(
+        dm.get_sections_batches(sections, datadir, batch_size),
+        batch_size=batch_size,
+        n_process=workers,
+        fast_model=SPACY_FAST_LANGUAGE_MODEL if tiered else None,
+    )
+
+    n_tokens = 0
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        files = {
+            section: stack.enter_context(
+                open(dm.get_spacy_docs_path(section, datadir), "wb")
+            )
+            for section in sections
+        }
+        batch_idx = {section: 0 for section in sections}
+
+        with typer.progressbar(
+            batches,
+            length=get_n_batches(n_docs, batch_size) * len(sections),
+            label=f"Extracting {', '.join(sections)} entities...",
+        ) as progress:
+            for section, docs, entities in progress:
+                write_batch(
+                    entities,
+                    dm.get_entities_data_path(section, datadir),
+                    batch_idx[section],
+                )
+                pickle.dump(docs, files[section])
+                batch_idx[section] += 1
+                n_tokens += sum(len(doc) for doc in docs)
 
-        docs, entities = features.entity_extraction(data, column)
-        entities.to_csv(dm.get_entities_data_path(column, datadir), index=False)
+    report_throughput(
+        time.perf_counter() - start, n_docs * len(sections), n_tokens, "tokens"
+    )
 
-        with open(dm.get_spacy_docs_path(column, datadir), "wb") as f:
-            pickle.dump(docs, f)
+    for section, reference in references.items():
+        report_agreement(
+            section, baseline, reference, dm.get_entities_data(section, datadir)
+        )
+
+
+def get_baseline_entities(
+    baseline: str, datadir: str, sections: list[str]
+) -> dict[str, pd.DataFrame]:
+    """
+    Return the baseline entities of each section, read before the entities are
+    extracted. Exits with an error when the baseline is the data directory, whose
+    entities are overwritten, or when the entities of a section are not found.
 
+    :param baseline: Path to the baseline data directory, no entities are returned
+        when it is not set.
+    :param datadir: Path to the data directory.
+    :param sections: Names of the sections the entities are extracted from.
+    """
+    if not baseline:
+        return {}
+
+    if Path(baseline).resolve() == Path(datadir).resolve():
+        error("The baseline must be a different data directory.")
+
+    references = {}
+    for section in sections:
+        reference = dm.get_entities_data(section, baseline)
+        if reference is None:
+            error(f"No {section} entities found in the baseline {baseline}.")
+
+        references[section] = reference
+
+    return references
+
+
+def report_agreement(
+    section: str,
+    baseline: str,
+    reference: pd.DataFrame,
+    entities: Optional[pd.DataFrame],
+):
+    """
+    Print the agreement between the entities and the entities of a baseline run, for
+    example a run with the transformer model over the full text.
+
+    :param section: Name of the section the entities were extracted from.
+    :param baseline: Path to the baseline data directory.
+    :param reference: Entities from the baseline run.
+    :param entities: Entities from this run.
+    """
+    if entities is None:
+        return
+
+    agreement = features.entities_agreement(reference, entities)
+    if agreement is None:
+        return
+
+    typer.echo(f"Agreement with the {section} entities in {baseline}:")
+    typer.echo(agreement.to_string(float_format="{:.2%}".format))
+
+
+@app.command()
+def canonicalise(
+    datadir: str = DATA_DIR.name, column: EntitySection = EntitySection.summary
+):
+    """
+    Map the spelling variants of the entities to a canonical entity, run it before the
+    `geolocate` command so that the variants are only geocoded once. The extracted
+    entities are kept, the canonical entities are added in a column.
+
+    :param datadir: Path to the data directory.
+    :param column: Name of the column the entities were extracted from.
+    """
+    data = dm.get_entities_data(column.value, datadir)
+    if data is None:
+        error("No data found. Run the `entities` command first.")
+
+    with typer.progressbar(length=1, label="Canonicalising entities...") as progress:
+        entities = canonical.canonicalise(data)
+        entities.to_csv(dm.get_entities_data_path(column.value, datadir), index=False)
         progress.update(1)
 
+    typer.echo(
+        f"Canonicalised {entities[FEATURE_ENTITY_TEXT].nunique()} variants into "
+        f"{entities[FEATURE_ENTITY_CANONICAL].nunique()} entities."
+    )
+
+
+class Geocoder(str, Enum):
+    """
+    Enum for the geocoders.
+    """
+
+    nominatim = "nominatim"
+    gazetteer = "gazetteer"
+
 
 @app.command()
 def geolocate(
-    datadir: str = DATA_DIR.name, column: EntitySection = EntitySection.summary
+    datadir: str = DATA_DIR.name,
+    column: EntitySection = EntitySection.summary,
+    geocoder: Geocoder = Geocoder(GEOCODER),
+    fallback: bool = GEOCODER_FALLBACK,
+    concurrency: int = GEOCODE_CONCURRENCY,
 ):
     """
     Geolocate the location entities in the data.
 
     :param datadir: Path to the data directory.
     :param column: Name of the column to geolocate entities from.
+    :param geocoder: Geocode with the Nominatim service, or with the local gazetteer
+        built by the `gazetteer` command.
+    :param fallback: Geocode the places not found in the gazetteer with Nominatim.
+    :param concurrency: Maximum number of places geocoded at the same time, increase
+        it with a self hosted Nominatim server, see `NOMINATIM_DOMAIN`.
     """
+    gazetteer_path = get_gazetteer_path(geocoder, datadir)
+
     with typer.progressbar(
         length=2, label="Geolocating location entities..."
     ) as progress:
@@ -212,15 +848,200 @@ def geolocate(
         if data is None:
             error("No data found. Run the `entities` command first.")
 
-        geo_df, geojson = features.geolocate(data)
+        geo_df, geojson = features.geolocate(
+            canonical.get_canonical_entities(data),
+            gazetteer=gazetteer_path,
+            fallback=fallback,
+            concurrency=concurrency,
+            centroids=dm.get_centroids(datadir),
+        )
 
         geo_df.to_csv(dm.get_geo_data_path(column, datadir), index=False)
+        geo_index.save(
+            dm.get_geo_index_path(column, datadir), geo_index.build(geo_df)
+        )
+        geo_index.build_bins(geo_df).to_csv(
+            dm.get_geo_bins_path(column, datadir), index=False
+        )
+        dm.save_places_matrix(
+            get_all_geo_data(datadir), dm.get_places_matrix_path(datadir)
+        )
         with open(dm.get_geojson_path(column, datadir), "wb") as f:
             pickle.dump(geojson, f)
 
         progress.update(1)
 
 
+def get_all_geo_data(datadir: str) -> pd.DataFrame:
+    """
+    Return the geolocated entities of all the sections geolocated so far.
+
+    :param datadir: Path to the data directory.
+    """
+    data = [dm.get_geo_data(section, datadir) for section in DATA_ENTITY_SECTIONS]
+
+    return pd.concat([section for section in data if section is not None])
+
+
+def get_gazetteer_path(geocoder: Geocoder, datadir: str) -> Optional[Path]:
+    """
+    Return the path to the gazetteer when geocoding with the gazetteer.
+
+    :param geocoder: Geocoder to use.
+    :param datadir: Path to the data directory.
+    """
+    if geocoder != Geocoder.gazetteer:
+        return None
+
+    path = dm.get_gazetteer_path(datadir)
+    if not path.is_file():
+        error("No gazetteer found. Run the `gazetteer` command first.")
+
+    return path
+
+
+@app.command()
+def gazetteer(
+    datadir: str = DATA_DIR.name,
+    places: list[str] = typer.Option(["cities15000.txt"]),
+    countries: str = "countryInfo.txt",
+    admin1: str = "admin1CodesASCII.txt",
+):
+    """
+    Build the local gazetteer, used by `geolocate --geocoder gazetteer`, from GeoNames
+    dumps, http://download.geonames.org/export/dump/, in the 0_external directory.
+
+    :param datadir: Path to the data directory.
+    :param places: GeoNames places dumps, include a dump with the countries, for
+        example `allCountries.txt`, to geolocate countries.
+    :param countries: GeoNames countries information.
+    :param admin1: GeoNames names of the first level administrative divisions.
+    """
+    try:
+        places_paths = [dm.get_geonames_path(name, datadir) for name in places]
+        countries_path = dm.get_geonames_path(countries, datadir)
+        admin1_path = dm.get_geonames_path(admin1, datadir)
+    except FileNotFoundError as e:
+        error(str(e))
+
+    with typer.progressbar(length=1, label="Building gazetteer...") as progress:
+        n_places = gz.build(
+            dm.get_gazetteer_path(datadir), places_paths, countries_path, admin1_path
+        )
+        progress.update(1)
+
+    typer.echo(f"Added {n_places} places to the gazetteer.")
+
+
+@app.command()
+def centroids(
+    datadir: str = DATA_DIR.name,
+    countries: str = "countryInfo.txt",
+    geocoder: Geocoder = Geocoder(GEOCODER),
+    concurrency: int = GEOCODE_CONCURRENCY,
+):
+    """
+    Build the table of the latitude and longitude of the countries, from the GeoNames
+    countries information in the 0_external directory, and of the continents. The
+    `geolocate` command uses it instead of geocoding the country of each place.
+
+    :param datadir: Path to the data directory.
+    :param countries: GeoNames countries information.
+    :param geocoder: Geocode with the Nominatim service, or with the local gazetteer.
+    :param concurrency: Maximum number of places geocoded at the same time.
+    """
+    try:
+        path = dm.get_geonames_path(countries, datadir)
+    except FileNotFoundError as e:
+        error(str(e))
+
+    names = [row[4] for row in gz.read_geonames(path)]
+
+    gazetteer_path = get_gazetteer_path(geocoder, datadir)
+
+    with typer.progressbar(length=1, label="Geocoding countries...") as progress:
+        data = features.get_centroids(
+            names + CONTINENTS,
+            partial(features.get_location, gazetteer=gazetteer_path),
+            concurrency,
+        )
+        data.to_csv(dm.get_centroids_path(datadir), index=False)
+        progress.update(1)
+
+    typer.echo(f"Added {len(data)} countries and continents to the centroids.")
+
+
+class ModelsAction(str, Enum):
+    """
+    Enum for the models command actions.
+    """
+
+    bundle = "bundle"
+    verify = "verify"
+
+
+@app.command()
+def models(
+    action: ModelsAction = typer.Argument(ModelsAction.bundle),
+    datadir: str = MODELS_BUNDLE_DATADIR,
+    force: bool = False,
+):
+    """
+    Snapshot the models used by the commands and the dashboard into the 0_external
+    directory, with the checksums of their files, or verify the checksums. The bundled
+    models are loaded instead of the models from the network or the user cache.
+
+    :param action: `bundle` the models or `verify` the bundle.
+    :param datadir: Path to the data directory, the models are only loaded from the
+        bundle in the data directory of the settings, `MODELS_BUNDLE_DATADIR`.
+    :param force: Snapshot the models that are already bundled again.
+    """
+    try:
+        path = dm.get_models_bundle_path(datadir)
+    except FileNotFoundError as e:
+        error(str(e))
+
+    if action == ModelsAction.verify:
+        verify_models(path)
+        return
+
+    manifest = bundle.load_manifest(path)
+    todo = [model for model in bundle.get_models() if force or model not in manifest]
+
+    failed = []
+    with typer.progressbar(todo, label="Bundling models...") as progress:
+        for kind, name in progress:
+            try:
+                bundle.save_manifest(path, [bundle.snapshot(path, kind, name)])
+            except Exception as e:
+                failed.append(f"{kind} {name}: {e}")
+
+    typer.echo(f"Bundled {len(todo) - len(failed)} models in {path}.")
+
+    if failed:
+        for problem in failed:
+            typer.echo(problem)
+
+        error(f"{len(failed)} models could not be bundled.")
+
+
+def verify_models(path: Path):
+    """
+    Verify the checksums of the bundle of models, and exit with an error listing the
+    problems found.
+
+    :param path: Path to the bundle.
+    """
+    problems = bundle.verify(path)
+    for problem in problems:
+        typer.echo(problem)
+
+    if problems:
+        error(f"{len(problems)} problems found in the bundle of models.")
+
+    typer.echo("The bundle of models is complete.")
+
+
 @app.command()
 def index(action: str = "build", datadir: str = DATA_DIR.name):
     """
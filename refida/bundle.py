@@ -0,0 +1,244 @@
+import hashlib
+import json
+import shutil
+from fnmatch import fnmatch
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional
+
+import nltk
+import spacy
+from huggingface_hub import HfApi, hf_hub_download
+
+import settings as _s
+from refida import data as dm
+
+MANIFEST = "manifest.json"
+
+
+def get_models() -> list[tuple[str, str]]:
+    """
+    Return the kind and name of the models used by the features, the explanations and
+    the search index, to bundle.
+    """
+    models = [
+        ("transformers", _s.TOPIC_CLASSIFICATION_MODEL),
+        ("transformers", _s.TOPIC_CLASSIFICATION_PREFILTER_MODEL),
+        ("transformers", _s.TOPIC_CLASSIFICATION_DISTILL_MODEL),
+        ("transformers", _s.SUMMARISATION_MODEL),
+        ("transformers", _s.SUMMARISATION_EXTRACTIVE_MODEL),
+        ("transformers", _s.SEARCH_TRANSFORMER),
+        ("spacy", _s.SPACY_LANGUAGE_MODEL),
+        ("spacy", _s.SPACY_FAST_LANGUAGE_MODEL),
+    ]
+    models.extend(("nltk", name) for name in _s.MODELS_BUNDLE_NLTK)
+
+    return list(dict.fromkeys(models))
+
+
+def get_model_path(path: Path, kind: str, name: str) -> Path:
+    """
+    Return the path of a model in the bundle.
+
+    :param path: Path to the bundle.
+    :param kind: Kind of model, `transformers`, `spacy` or `nltk`.
+    :param name: Name of the model.
+    """
+    return path / kind / name.replace("/", "--")
+
+
+def snapshot(path: Path, kind: str, name: str) -> dict:
+    """
+    Snapshot a model into the bundle, replacing the previous snapshot. Returns the
+    manifest entry of the model, with the checksums of its files. A failed snapshot
+    is removed.
+
+    :param path: Path to the bundle.
+    :param kind: Kind of model, `transformers`, `spacy` or `nltk`.
+    :param name: Name of the model.
+    """
+    model_path = get_model_path(path, kind, name)
+    if model_path.exists():
+        shutil.rmtree(model_path)
+    model_path.mkdir(parents=True)
+
+    try:
+        SNAPSHOTS[kind](name, model_path)
+    except Exception:
+        shutil.rmtree(model_path)
+        raise
+
+    return dict(
+        kind=kind,
+        name=name,
+        path=model_path.relative_to(path).as_posix(),
+        files=get_checksums(model_path),
+    )
+
+
+def snapshot_transformers(
+    name: str, path: Path, ignore: list[str] = _s.MODELS_BUNDLE_IGNORE
+):
+    """
+    Download the files of a Hugging Face model into a directory, at the current
+    revision of the model, skipping the weights of other frameworks.
+
+    :param name: Name of the model in the Hugging Face hub.
+    :param path: Path to the directory.
+    :param ignore: Patterns of the names of the files to skip.
+    """
+    info = HfApi().model_info(name)
+
+    for sibling in info.siblings:
+        filename = sibling.rfilename
+        if any(fnmatch(filename, pattern) for pattern in ignore):
+            continue
+
+        target = path / filename
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(hf_hub_download(name, filename, revision=info.sha), target)
+
+
+def snapshot_spacy(name: str, path: Path):
+    """
+    Save an installed spaCy language model into a directory.
+
+    :param name: Name of the spaCy language model.
+    :param path: Path to the directory.
+    """
+    spacy.load(name).to_disk(path)
+
+
+def snapshot_nltk(name: str, path: Path):
+    """
+    Download an nltk resource into a directory, that is added to the nltk data path
+    when loading.
+
+    :param name: Name of the nltk resource.
+    :param path: Path to the directory.
+    """
+    if not nltk.download(name, download_dir=str(path), quiet=True):
+        raise ValueError(f"nltk resource not found: {name}")
+
+
+SNAPSHOTS: dict[str, Callable[[str, Path], None]] = dict(
+    transformers=snapshot_transformers, spacy=snapshot_spacy, nltk=snapshot_nltk
+)
+
+
+def get_checksums(path: Path) -> dict[str, str]:
+    """
+    Return the sha256 checksum of each file in a directory, keyed by relative path.
+
+    :param path: Path to the directory.
+    """
+    return {
+        file.relative_to(path).as_posix(): get_checksum(file)
+        for file in sorted(path.rglob("*"))
+        if file.is_file()
+    }
+
+
+def get_checksum(path: Path) -> str:
+    """
+    Return the sha256 checksum of a file.
+
+    :param path: Path to the file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2**20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def save_manifest(path: Path, entries: list[dict]):
+    """
+    Add the entries to the manifest of the bundle, replacing the entries of the same
+    models.
+
+    :param path: Path to the bundle.
+    :param entries: Manifest entries, see `snapshot`.
+    """
+    manifest = load_manifest(path).copy()
+    for entry in entries:
+        manifest[(entry["kind"], entry["name"])] = entry
+
+    path.mkdir(parents=True, exist_ok=True)
+    with open(path / MANIFEST, "w") as f:
+        json.dump(dict(models=list(manifest.values())), f, indent=2)
+
+    load_manifest.cache_clear()
+
+
+@lru_cache(maxsize=4)
+def load_manifest(path: Path) -> dict[tuple[str, str], dict]:
+    """
+    Load the manifest of the bundle, keyed by kind and name of the model. Returns an
+    empty manifest if the bundle does not exist.
+
+    :param path: Path to the bundle.
+    """
+    try:
+        with open(path / MANIFEST) as f:
+            entries = json.load(f)["models"]
+    except FileNotFoundError:
+        return {}
+
+    return {(entry["kind"], entry["name"]): entry for entry in entries}
+
+
+def verify(path: Path, models: Optional[list[tuple[str, str]]] = None) -> list[str]:
+    """
+    Verify the checksums of the files of the bundled models. Returns the problems
+    found, an empty list if the bundle is complete and unchanged.
+
+    :param path: Path to the bundle.
+    :param models: Kind and name of the models expected in the bundle, defaults to all
+        the models, see `get_models`.
+    """
+    if models is None:
+        models = get_models()
+
+    manifest = load_manifest(path)
+
+    problems = []
+    for kind, name in models:
+        entry = manifest.get((kind, name))
+        if entry is None:
+            problems.append(f"{kind} {name}: not bundled")
+            continue
+
+        model_path = path / entry["path"]
+        for filename, checksum in entry["files"].items():
+            file = model_path / filename
+            if not file.is_file():
+                problems.append(f"{kind} {name}: {filename} is missing")
+            elif get_checksum(file) != checksum:
+                problems.append(f"{kind} {name}: {filename} checksum mismatch")
+
+    return problems
+
+
+def resolve(kind: str, name: str, path: Optional[Path] = None) -> str:
+    """
+    Return the path of the model in the bundle, or the name of the model, to load it
+    from the network or the user cache, when it is not bundled.
+
+    :param kind: Kind of model, `transformers`, `spacy` or `nltk`.
+    :param name: Name of the model.
+    :param path: Path to the bundle, defaults to the bundle in the data directory of
+        the bundle, see `settings.MODELS_BUNDLE_DATADIR`.
+    """
+    if path is None:
+        try:
+            path = dm.get_models_bundle_path(_s.MODELS_BUNDLE_DATADIR)
+        except FileNotFoundError:
+            return name
+
+    entry = load_manifest(path).get((kind, name))
+    if entry is None or not (path / entry["path"]).is_dir():
+        return name
+
+    return str(path / entry["path"])
@@ -0,0 +1,283 @@
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Iterator
+
+import pandas as pd
+
+import settings as _s
+
+
+def canonicalise(
+    entities: pd.DataFrame,
+    threshold: float = _s.ENTITY_CANONICAL_THRESHOLD,
+    max_block: int = _s.ENTITY_CANONICAL_MAX_BLOCK,
+) -> pd.DataFrame:
+    """
+    Map the spelling variants of the entities, for example "Kings College London" and
+    "KCL", to a canonical entity. The canonical entity is added in the canonical
+    column, the text and entity columns keep the extracted entities.
+
+    :param entities: Entities data with id, label, text and entity columns.
+    :param threshold: Minimum similarity for two variants to be the same entity.
+    :param max_block: Blocks with more variants than this are not compared.
+    """
+    entities = entities.copy()
+
+    canonical = {}
+    for label, group in entities.groupby(_s.FEATURE_ENTITY_LABEL):
+        counts = group[_s.FEATURE_ENTITY_TEXT].value_counts()
+        for variant, text in get_canonical(counts, threshold, max_block).items():
+            canonical[(label, variant)] = text
+
+    entities[_s.FEATURE_ENTITY_CANONICAL] = [
+        canonical.get((label, text), text)
+        for label, text in zip(
+            entities[_s.FEATURE_ENTITY_LABEL], entities[_s.FEATURE_ENTITY_TEXT]
+        )
+    ]
+
+    return entities
+
+
+def get_canonical_entities(entities: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return the entities with the text and entity columns set to the canonical entity,
+    when the entities were canonicalised, see `canonicalise`.
+
+    :param entities: Entities data with label, text and entity columns.
+    """
+    if _s.FEATURE_ENTITY_CANONICAL not in entities.columns:
+        return entities
+
+    entities = entities.copy()
+    entities[_s.FEATURE_ENTITY_TEXT] = entities[_s.FEATURE_ENTITY_CANONICAL]
+    entities[_s.FEATURE_ENTITY_ENTITY] = (
+        entities[_s.FEATURE_ENTITY_LABEL] + ": " + entities[_s.FEATURE_ENTITY_TEXT]
+    )
+
+    return entities
+
+
+def get_canonical(
+    counts: pd.Series,
+    threshold: float = _s.ENTITY_CANONICAL_THRESHOLD,
+    max_block: int = _s.ENTITY_CANONICAL_MAX_BLOCK,
+) -> dict[str, str]:
+    """
+    Group the variants of the same entity and return the canonical form of each
+    variant, the most frequent, and then longest, variant of its group.
+
+    Only the variants that share a blocking key, see `get_blocking_keys`, are compared.
+
+    :param counts: Number of occurrences of each variant.
+    :param threshold: Minimum similarity for two variants to be the same entity.
+    :param max_block: Blocks with more variants than this are not compared.
+    """
+    variants = counts.index.tolist()
+    normalised = [normalise(variant) for variant in variants]
+    acronyms = [get_acronym(variant) for variant in variants]
+    expansions = get_expansions(variants, normalised, acronyms)
+
+    pairs = [
+        (a, b)
+        for a, b in get_pairs(get_blocks(normalised, acronyms), max_block)
+        if is_same(
+            (variants[a], normalised[a], acronyms[a]),
+            (variants[b], normalised[b], acronyms[b]),
+            expansions,
+            threshold,
+        )
+    ]
+
+    canonical = {}
+    for members in get_groups(len(variants), pairs):
+        best = max(members, key=lambda idx: (counts.iloc[idx], len(variants[idx])))
+        for idx in members:
+            canonical[variants[idx]] = variants[best]
+
+    return canonical
+
+
+def get_expansions(
+    variants: list[str], normalised: list[str], acronyms: list[str]
+) -> dict[str, set[str]]:
+    """
+    Return the normalised forms of the variants with each acronym, an acronym is only
+    merged with a variant when it has a single expansion.
+
+    :param variants: Variants of the entities.
+    :param normalised: Normalised form of each variant.
+    :param acronyms: Acronym of each variant.
+    """
+    expansions = defaultdict(set)
+    for variant, text, acronym in zip(variants, normalised, acronyms):
+        if acronym != variant:
+            expansions[acronym].add(text)
+
+    return expansions
+
+
+def get_blocks(normalised: list[str], acronyms: list[str]) -> dict[str, list[int]]:
+    """
+    Return the indices of the variants that share each blocking key.
+
+    :param normalised: Normalised form of each variant.
+    :param acronyms: Acronym of each variant.
+    """
+    blocks = defaultdict(list)
+    for idx, (text, acronym) in enumerate(zip(normalised, acronyms)):
+        for key in get_blocking_keys(text, acronym):
+            blocks[key].append(idx)
+
+    return blocks
+
+
+def get_pairs(
+    blocks: dict[str, list[int]], max_block: int
+) -> Iterator[tuple[int, int]]:
+    """
+    Yield the pairs of variants to compare, the pairs of the variants of each block,
+    once, skipping the blocks with more variants than `max_block`.
+
+    :param blocks: Indices of the variants of each block, see `get_blocks`.
+    :param max_block: Blocks with more variants than this are not compared.
+    """
+    compared = set()
+    for block in blocks.values():
+        if len(block) > max_block:
+            continue
+
+        for pair in combinations(block, 2):
+            if pair not in compared:
+                compared.add(pair)
+                yield pair
+
+
+def is_same(
+    a: tuple[str, str, str],
+    b: tuple[str, str, str],
+    expansions: dict[str, set[str]],
+    threshold: float = _s.ENTITY_CANONICAL_THRESHOLD,
+) -> bool:
+    """
+    Wether two variants are the same entity: an acronym and a variant with that
+    acronym, when the acronym has a single expansion, or two similar variants.
+
+    :param a: Variant, normalised form and acronym of the first variant.
+    :param b: Variant, normalised form and acronym of the second variant.
+    :param expansions: Normalised forms of the variants with each acronym.
+    :param threshold: Minimum similarity for two variants to be the same entity.
+    """
+    variant_a, normalised_a, acronym_a = a
+    variant_b, normalised_b, acronym_b = b
+
+    if variant_a == acronym_b:
+        return len(expansions[variant_a]) == 1
+
+    if variant_b == acronym_a:
+        return len(expansions[variant_b]) == 1
+
+    return is_similar(normalised_a, normalised_b, threshold)
+
+
+def get_groups(n: int, pairs: list[tuple[int, int]]) -> list[list[int]]:
+    """
+    Return the groups of items connected by the pairs, with union-find.
+
+    :param n: Number of items.
+    :param pairs: Pairs of indices of the items in the same group.
+    """
+    parents = list(range(n))
+
+    def find(idx: int) -> int:
+        while parents[idx] != idx:
+            parents[idx] = parents[parents[idx]]
+            idx = parents[idx]
+        return idx
+
+    for a, b in pairs:
+        parents[find(a)] = find(b)
+
+    groups = defaultdict(list)
+    for idx in range(n):
+        groups[find(idx)].append(idx)
+
+    return list(groups.values())
+
+
+def normalise(text: str) -> str:
+    """
+    Normalise the text of an entity for comparison: lower case, without accents,
+    possessives, punctuation, a leading "the" and extra spaces.
+
+    :param text: Text to normalise.
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"['’]s\b", "s", text.lower())
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"^the\s+", "", text.strip())
+
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def get_acronym(text: str) -> str:
+    """
+    Return the acronym of the text, the initials of its capitalised words. Texts that
+    are already an acronym are returned unchanged.
+
+    :param text: Text to get the acronym of.
+    """
+    text = str(text).strip()
+    if re.fullmatch(r"[A-Z]{2,}", text):
+        return text
+
+    return "".join(word[0] for word in re.findall(r"\b[A-Z][\w'’]*", text))
+
+
+def get_blocking_keys(normalised: str, acronym: str) -> set[str]:
+    """
+    Return the blocking keys of an entity, entities are only compared to the entities
+    that share a key with them: the normalised tokens, the character trigrams of the
+    first token, to catch misspellings, and the acronym.
+
+    :param normalised: Normalised text of the entity.
+    :param acronym: Acronym of the entity.
+    """
+    tokens = normalised.split()
+    keys = {f"token:{token}" for token in tokens if len(token) > 2}
+
+    if tokens:
+        first = tokens[0]
+        keys.update(f"gram:{first[i : i + 3]}" for i in range(max(len(first) - 2, 1)))
+
+    if len(acronym) > 1:
+        keys.add(f"acronym:{acronym}")
+
+    return keys
+
+
+def is_similar(
+    a: str, b: str, threshold: float = _s.ENTITY_CANONICAL_THRESHOLD
+) -> bool:
+    """
+    Wether the similarity ratio between two normalised texts is equal or greater than
+    the threshold. The cheaper upper bounds of the ratio are checked first.
+
+    :param a: First text.
+    :param b: Second text.
+    :param threshold: Minimum similarity, between 0 and 1.
+    """
+    if a == b:
+        return True
+
+    matcher = SequenceMatcher(None, a, b)
+
+    return (
+        matcher.real_quick_ratio() >= threshold
+        and matcher.quick_ratio() >= threshold
+        and matcher.ratio() >= threshold
+    )
@@ -1,12 +1,34 @@
 import pickle
+import shutil
+import sqlite3
+from contextlib import closing
 from functools import lru_cache
 from pathlib import Path
 from typing import Iterator, Optional
 
+import numpy as np
 import pandas as pd
 from spacy.tokens import Doc
 
-from settings import DATA_DIR
+from refida import distill, geo_index
+from settings import (
+    DATA_DIR,
+    FEATURE_ENTITY_LABEL,
+    FEATURE_GEO_CATEGORY,
+    FEATURE_GEO_LAT,
+    FEATURE_GEO_LON,
+    FEATURE_GEO_PLACE,
+    FEATURE_GEO_PLACE_LAT,
+    FEATURE_GEO_PLACE_LON,
+    FEATURE_GEO_STATE,
+    FEATURE_SENTENCE_SECTION,
+    FEATURE_TOPIC_GROUP,
+    FEATURE_TOPIC_SCORE,
+    FEATURE_TOPIC_TOPIC,
+    FEATURES_BATCH_SIZE,
+    FIELD_ID,
+    TOPICS_MATRIX_SCORE_FLOOR,
+)
 
 
 def get_raw_data(datadir: str = DATA_DIR.name) -> Iterator[Path]:
@@ -52,6 +74,69 @@ def get_etl_data(datadir: str = DATA_DIR.name) -> Optional[pd.DataFrame]:
     return None
 
 
+def get_etl_columns(datadir: str = DATA_DIR.name) -> Optional[list[str]]:
+    data = get_data(get_etl_data_path(datadir), dict(nrows=0))
+    if data is None:
+        return None
+
+    return data.columns.tolist()
+
+
+def get_etl_size(datadir: str = DATA_DIR.name) -> int:
+    data = get_data(get_etl_data_path(datadir), dict(usecols=[FIELD_ID]))
+    if data is None:
+        return 0
+
+    return len(data)
+
+
+def get_etl_chunks(
+    columns: list[str],
+    datadir: str = DATA_DIR.name,
+    batch_size: int = FEATURES_BATCH_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read the etl data in chunks, without loading the whole file.
+
+    :param columns: Columns to read, the columns not in the data are skipped.
+    :param datadir: Path to the data directory.
+    :param batch_size: Number of rows per chunk.
+    """
+    yield from pd.read_csv(
+        get_etl_data_path(datadir),
+        usecols=lambda name: name in columns,
+        chunksize=batch_size,
+    )
+
+
+def get_batches(
+    column: str, datadir: str = DATA_DIR.name, batch_size: int = FEATURES_BATCH_SIZE
+) -> Iterator[list[tuple[str, str]]]:
+    for chunk in get_etl_chunks([FIELD_ID, column], datadir, batch_size):
+        yield list(chunk[[FIELD_ID, column]].itertuples(index=False, name=None))
+
+
+def get_sections_batches(
+    columns: list[str],
+    datadir: str = DATA_DIR.name,
+    batch_size: int = FEATURES_BATCH_SIZE,
+) -> Iterator[tuple[str, list[tuple[str, str]]]]:
+    """
+    Read the etl data once and yield the batches of (id, text) of each of the columns,
+    with the name of the column, the batches of a chunk are yielded one column after
+    the other.
+
+    :param columns: Columns to read the batches of.
+    :param datadir: Path to the data directory.
+    :param batch_size: Number of rows per batch.
+    """
+    for chunk in get_etl_chunks([FIELD_ID] + columns, datadir, batch_size):
+        for column in columns:
+            yield column, list(
+                chunk[[FIELD_ID, column]].itertuples(index=False, name=None)
+            )
+
+
 def get_data(filename: Path, kwargs: dict = {}) -> Optional[pd.DataFrame]:
     try:
         return pd.read_csv(filename, **kwargs)  # type: ignore
@@ -71,6 +156,238 @@ def get_topics_data_path(label: str, datadir: str = DATA_DIR.name) -> Path:
     return get_data_path(datadir, "1_interim", f"topics_{label}.csv")
 
 
+def save_topics_matrix(
+    topics: pd.DataFrame, path: Path, floor: float = TOPICS_MATRIX_SCORE_FLOOR
+):
+    """
+    Save the topics as a sparse matrix of documents by topics, in compressed sparse
+    row format, with the scores equal or greater than the floor stored as float16.
+
+    :param topics: Topics data with id, topic, score and group columns.
+    :param path: Path to save the matrix to.
+    :param floor: Minimum score to store.
+    """
+    topics = topics[topics[FEATURE_TOPIC_SCORE] >= floor]
+    topics = topics.groupby([FIELD_ID, FEATURE_TOPIC_TOPIC], sort=False).agg(
+        {FEATURE_TOPIC_SCORE: "max", FEATURE_TOPIC_GROUP: "first"}
+    )
+    topics = topics.reset_index()
+
+    ids, rows = np.unique(topics[FIELD_ID].to_numpy(dtype=str), return_inverse=True)
+    labels, columns = np.unique(
+        topics[FEATURE_TOPIC_TOPIC].to_numpy(dtype=str), return_inverse=True
+    )
+    groups = (
+        topics.drop_duplicates(FEATURE_TOPIC_TOPIC)
+        .set_index(FEATURE_TOPIC_TOPIC)[FEATURE_TOPIC_GROUP]
+        .reindex(labels)
+        .to_numpy(dtype=str)
+    )
+
+    order = np.lexsort((columns, rows))
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(ids)), out=indptr[1:])
+
+    with open(path, "wb") as f:
+        np.savez_compressed(
+            f,
+            data=topics[FEATURE_TOPIC_SCORE].to_numpy()[order].astype(np.float16),
+            indices=columns[order].astype(np.int32),
+            indptr=indptr,
+            ids=ids,
+            labels=labels,
+            groups=groups,
+            floor=floor,
+        )
+
+
+def get_topics_matrix(label: str, datadir: str = DATA_DIR.name) -> Optional[dict]:
+    try:
+        with np.load(get_topics_matrix_path(label, datadir)) as f:
+            matrix = {name: f[name] for name in f.files}
+    except FileNotFoundError:
+        return None
+
+    matrix["floor"] = float(matrix["floor"])
+    matrix["rows"] = np.repeat(np.arange(len(matrix["ids"])), np.diff(matrix["indptr"]))
+
+    return matrix
+
+
+def get_topics_matrix_path(label: str, datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "1_interim", f"topics_{label}.npz")
+
+
+def query_topics_matrix(
+    matrix: dict,
+    threshold: float = 0.0,
+    topics: Optional[list[str]] = None,
+    ids: Optional[tuple[str]] = None,
+) -> pd.DataFrame:
+    """
+    Return the topics, from a topics matrix, with a score equal or greater than the
+    threshold, optionally limited to the given topics and documents ids.
+
+    :param matrix: Topics matrix, see `get_topics_matrix`.
+    :param threshold: Minimum score.
+    :param topics: Topics to return.
+    :param ids: Documents ids to return.
+    """
+    mask = matrix["data"] >= threshold
+    if topics:
+        columns = np.flatnonzero(np.isin(matrix["labels"], topics))
+        mask &= np.isin(matrix["indices"], columns)
+    if ids:
+        rows = np.flatnonzero(np.isin(matrix["ids"], ids))
+        mask &= np.isin(matrix["rows"], rows)
+
+    columns = matrix["indices"][mask]
+
+    return pd.DataFrame(
+        {
+            FIELD_ID: matrix["ids"][matrix["rows"][mask]],
+            FEATURE_TOPIC_TOPIC: matrix["labels"][columns],
+            FEATURE_TOPIC_SCORE: matrix["data"][mask].astype(np.float64).round(3),
+            FEATURE_TOPIC_GROUP: matrix["groups"][columns],
+        }
+    )
+
+
+def save_explanations(
+    explanations: list[tuple[str, str, np.ndarray, np.ndarray]], path: Path
+):
+    """
+    Save the explanations of the topics, the tokens of the documents and their float16
+    attributions to each topic, concatenated and indexed by document id and topic.
+
+    :param explanations: Id, topic, tokens and token attributions of each explanation.
+    :param path: Path to save the explanations to.
+    """
+    explanations = sorted(explanations, key=lambda explanation: explanation[:2])
+    ids, topics, tokens, values = zip(*explanations) if explanations else [[]] * 4
+    lengths = [len(explanation) for explanation in tokens]
+
+    indptr = np.zeros(len(explanations) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+
+    with open(path, "wb") as f:
+        np.savez_compressed(
+            f,
+            ids=np.array(ids, dtype=str),
+            topics=np.array(topics, dtype=str),
+            indptr=indptr,
+            tokens=np.concatenate([np.empty(0, dtype=str), *tokens]).astype(str),
+            values=np.concatenate([np.empty(0), *values]).astype(np.float16),
+        )
+
+
+def get_explanations(label: str, datadir: str = DATA_DIR.name) -> Optional[dict]:
+    return load_explanations(get_explanations_path(label, datadir))
+
+
+def load_explanations(path: Path) -> Optional[dict]:
+    try:
+        with np.load(path) as f:
+            explanations = {name: f[name] for name in f.files}
+    except FileNotFoundError:
+        return None
+
+    explanations["index"] = {
+        key: idx
+        for idx, key in enumerate(zip(explanations["ids"], explanations["topics"]))
+    }
+
+    return explanations
+
+
+def get_explanations_path(label: str, datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "1_interim", f"explanations_{label}.npz")
+
+
+def get_explanations_shard_path(
+    label: str, idx: int, datadir: str = DATA_DIR.name
+) -> Path:
+    path = get_explanations_shards_path(label, datadir)
+    path.mkdir(exist_ok=True)
+
+    return path / f"{idx:05d}.npz"
+
+
+def get_explanations_shards_path(label: str, datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "1_interim", f"explanations_{label}")
+
+
+def merge_explanations(label: str, datadir: str = DATA_DIR.name) -> Optional[dict]:
+    """
+    Merge the shards of explanations, saved a batch at a time, into the explanations
+    store, and remove the shards. Returns the explanations store.
+
+    :param label: Label of the explanations.
+    :param datadir: Path to the data directory.
+    """
+    path = get_explanations_shards_path(label, datadir)
+    shards = sorted(path.glob("*.npz")) if path.is_dir() else []
+    if not shards:
+        return get_explanations(label, datadir)
+
+    explanations = {}
+    stores = [get_explanations(label, datadir)]
+    stores.extend(load_explanations(shard) for shard in shards)
+    for store in stores:
+        if store is not None:
+            for explanation in iter_explanations(store):
+                explanations[explanation[:2]] = explanation
+
+    save_explanations(
+        list(explanations.values()), get_explanations_path(label, datadir)
+    )
+    shutil.rmtree(path)
+
+    return get_explanations(label, datadir)
+
+
+def get_explanation(
+    explanations: dict, doc_id: str, topic: str
+) -> Optional[tuple[np.ndarray, np.ndarray]]:
+    """
+    Return the tokens and token attributions of the explanation of a document topic.
+
+    :param explanations: Explanations, see `get_explanations`.
+    :param doc_id: Id of the document.
+    :param topic: Topic of the document.
+    """
+    idx = explanations["index"].get((str(doc_id), topic))
+    if idx is None:
+        return None
+
+    start, end = explanations["indptr"][idx], explanations["indptr"][idx + 1]
+
+    return explanations["tokens"][start:end], explanations["values"][start:end]
+
+
+def iter_explanations(
+    explanations: dict,
+) -> Iterator[tuple[str, str, np.ndarray, np.ndarray]]:
+    """
+    Iterate over the id, topic, tokens and token attributions of the explanations.
+
+    :param explanations: Explanations, see `get_explanations`.
+    """
+    for doc_id, topic in zip(explanations["ids"].tolist(), explanations["topics"]):
+        yield (doc_id, topic, *get_explanation(explanations, doc_id, topic))
+
+
+def get_distilled_model(label: str, datadir: str = DATA_DIR.name) -> Optional[dict]:
+    try:
+        return distill.load(get_distilled_model_path(label, datadir))
+    except FileNotFoundError:
+        return None
+
+
+def get_distilled_model_path(label: str, datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "1_interim", f"distilled_{label}.npz")
+
+
 def get_summaries_data(datadir: str = DATA_DIR.name) -> Optional[pd.DataFrame]:
     return get_data(get_summaries_data_path(datadir))
 
@@ -79,6 +396,73 @@ def get_summaries_data_path(datadir: str = DATA_DIR.name) -> Path:
     return get_data_path(datadir, "1_interim", "summaries.csv")
 
 
+def get_summaries_cache_path(datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "1_interim", "summaries_cache.sqlite")
+
+
+def get_cached_summaries(path: Path, model: str, keys: list[str]) -> dict[str, str]:
+    """
+    Return the cached summaries, by text key, generated with the given model.
+
+    :param path: Path to the cache database.
+    :param model: Name, and options, of the model used to generate the summaries.
+    :param keys: Keys of the texts to get the summaries for.
+    """
+    summaries = {}
+
+    with closing(get_summaries_cache(path)) as con:
+        for start in range(0, len(keys), 500):
+            end = start + 500
+            chunk = keys[start:end]
+            rows = con.execute(
+                "SELECT key, summary FROM summaries WHERE model = ? AND key IN "
+                f"({', '.join('?' * len(chunk))})",
+                [model, *chunk],
+            )
+            summaries.update(rows)
+
+    return summaries
+
+
+def cache_summaries(path: Path, model: str, summaries: dict[str, str]):
+    """
+    Store summaries, by text key, in the cache.
+
+    :param path: Path to the cache database.
+    :param model: Name, and options, of the model used to generate the summaries.
+    :param summaries: Summaries by text key.
+    """
+    with closing(get_summaries_cache(path)) as con, con:
+        con.executemany(
+            "INSERT OR REPLACE INTO summaries(key, model, summary) VALUES (?, ?, ?)",
+            [(key, model, summary) for key, summary in summaries.items()],
+        )
+
+
+def get_summaries_cache(path: Path) -> sqlite3.Connection:
+    con = sqlite3.connect(path)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS summaries"
+        "(key TEXT, model TEXT, summary TEXT, PRIMARY KEY (key, model))"
+    )
+
+    return con
+
+
+def get_sentences_data(
+    section: Optional[str] = None, datadir: str = DATA_DIR.name
+) -> Optional[pd.DataFrame]:
+    data = get_data(get_sentences_data_path(datadir))
+    if data is None or section is None:
+        return data
+
+    return data[data[FEATURE_SENTENCE_SECTION] == section]
+
+
+def get_sentences_data_path(datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "1_interim", "sentences.csv")
+
+
 def get_entities_data(
     label: str, datadir: str = DATA_DIR.name
 ) -> Optional[pd.DataFrame]:
@@ -101,14 +485,50 @@ def get_spacy_doc(label: str, idx: int, datadir: str = DATA_DIR.name) -> Optiona
 
 
 def get_spacy_docs(label: str, datadir: str = DATA_DIR.name) -> Optional[list]:
+    docs = []
+
+    # the docs can be pickled in batches
     with open(get_spacy_docs_path(label, datadir), "rb") as f:
-        return pickle.load(f)
+        while True:
+            try:
+                docs.extend(pickle.load(f))
+            except EOFError:
+                return docs
 
 
 def get_spacy_docs_path(label: str, datadir: str = DATA_DIR.name) -> Path:
     return get_data_path(datadir, "1_interim", f"spacy_docs_{label}")
 
 
+def get_gazetteer_path(datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "0_external", "gazetteer.sqlite")
+
+
+def get_models_bundle_path(datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "0_external", "models")
+
+
+def get_geonames_path(filename: str, datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "0_external", filename, file_exists=True)
+
+
+def get_centroids(datadir: str = DATA_DIR.name) -> dict[str, tuple[float, float]]:
+    data = get_data(get_centroids_path(datadir))
+    if data is None:
+        return {}
+
+    return {
+        name: (lat, lon)
+        for name, lat, lon in data[
+            [FEATURE_GEO_PLACE, FEATURE_GEO_LAT, FEATURE_GEO_LON]
+        ].itertuples(index=False, name=None)
+    }
+
+
+def get_centroids_path(datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "0_external", "country_centroids.csv")
+
+
 def get_geo_data(label: str, datadir: str = DATA_DIR.name) -> Optional[pd.DataFrame]:
     return get_data(get_geo_data_path(label, datadir))
 
@@ -117,6 +537,139 @@ def get_geo_data_path(label: str, datadir: str = DATA_DIR.name) -> Path:
     return get_data_path(datadir, "1_interim", f"geo_{label}.csv")
 
 
+# attributes of the columns of the places matrix
+PLACES_MATRIX_ATTRIBUTES = [
+    FEATURE_ENTITY_LABEL,
+    FEATURE_GEO_CATEGORY,
+    FEATURE_GEO_STATE,
+    FEATURE_GEO_PLACE,
+    FEATURE_GEO_PLACE_LAT,
+    FEATURE_GEO_PLACE_LON,
+]
+PLACES_MATRIX_COORDINATES = [FEATURE_GEO_PLACE_LAT, FEATURE_GEO_PLACE_LON]
+
+
+def save_places_matrix(geo: pd.DataFrame, path: Path):
+    """
+    Save the places mentioned by the documents as a binary sparse matrix of documents
+    by places, in compressed sparse row format, with a table of the attributes of the
+    places: entity label, category, state, place and place lat and lon. The places
+    without state have an empty state.
+
+    :param geo: Geolocated entities, of one or more sections.
+    :param path: Path to save the matrix to.
+    """
+    places = geo[[FIELD_ID] + PLACES_MATRIX_ATTRIBUTES]
+    places = places.fillna({FEATURE_GEO_STATE: ""}).dropna()
+
+    ids, rows = np.unique(places[FIELD_ID].to_numpy(dtype=str), return_inverse=True)
+    columns = places.groupby(PLACES_MATRIX_ATTRIBUTES).ngroup().to_numpy()
+    attributes = places.assign(column=columns).drop_duplicates("column")
+    attributes = attributes.sort_values(by="column")
+
+    n_columns = len(attributes)
+    pairs = np.unique(rows.astype(np.int64) * n_columns + columns)
+    rows, columns = np.divmod(pairs, max(n_columns, 1))
+
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(ids)), out=indptr[1:])
+
+    with open(path, "wb") as f:
+        np.savez_compressed(
+            f,
+            indices=columns.astype(np.int32),
+            indptr=indptr,
+            ids=ids,
+            **{
+                column: attributes[column].to_numpy(
+                    dtype=np.float64 if column in PLACES_MATRIX_COORDINATES else str
+                )
+                for column in PLACES_MATRIX_ATTRIBUTES
+            },
+        )
+
+
+def get_places_matrix(datadir: str = DATA_DIR.name) -> Optional[dict]:
+    try:
+        with np.load(get_places_matrix_path(datadir)) as f:
+            matrix = {name: f[name] for name in f.files}
+    except FileNotFoundError:
+        return None
+
+    matrix["rows"] = np.repeat(np.arange(len(matrix["ids"])), np.diff(matrix["indptr"]))
+
+    return matrix
+
+
+def get_places_matrix_path(datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "1_interim", "places.npz")
+
+
+def query_places_matrix(
+    matrix: dict,
+    ids: tuple[str],
+    entity_types: Optional[list[str]] = None,
+    state: bool = False,
+) -> pd.DataFrame:
+    """
+    Return the number of documents, among the given documents, that mention each place,
+    the product of the selection vector of the documents and the places matrix.
+
+    :param matrix: Places matrix, see `get_places_matrix`.
+    :param ids: Documents ids to count.
+    :param entity_types: Only count the places of these entity types.
+    :param state: Count the places by state, the places without state are skipped.
+    """
+    selection = np.isin(matrix["ids"], np.asarray(ids, dtype=str))
+    mask = selection[matrix["rows"]]
+    rows, columns = matrix["rows"][mask], matrix["indices"][mask]
+
+    attributes = pd.DataFrame(
+        {column: matrix[column] for column in PLACES_MATRIX_ATTRIBUTES}
+    )
+    keys = PLACES_MATRIX_ATTRIBUTES.copy()
+    if state:
+        keys.insert(0, keys.pop(keys.index(FEATURE_GEO_STATE)))
+    else:
+        keys.remove(FEATURE_GEO_STATE)
+
+    # columns that only differ by state are the same place when not counting by state,
+    # the documents are counted once per place
+    groups = attributes.groupby(keys).ngroup().to_numpy()
+    n_groups = max(len(np.unique(groups)), 1)
+    counts = np.bincount(
+        np.unique(rows * n_groups + groups[columns]) % n_groups, minlength=n_groups
+    )
+
+    places = attributes[keys].assign(group=groups).drop_duplicates("group")
+    places = places.sort_values(by="group")
+    places["count"] = counts[: len(places)]
+    places = places[places["count"] > 0].drop(columns=["group"])
+
+    if entity_types:
+        places = places[places[FEATURE_ENTITY_LABEL].isin(entity_types)]
+    if state:
+        places = places[places[FEATURE_GEO_STATE] != ""]
+
+    return places.reset_index(drop=True)
+
+
+def get_geo_bins(label: str, datadir: str = DATA_DIR.name) -> Optional[pd.DataFrame]:
+    return get_data(get_geo_bins_path(label, datadir))
+
+
+def get_geo_bins_path(label: str, datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "1_interim", f"geo_bins_{label}.csv")
+
+
+def get_geo_index(label: str, datadir: str = DATA_DIR.name) -> Optional[dict]:
+    return geo_index.load(get_geo_index_path(label, datadir))
+
+
+def get_geo_index_path(label: str, datadir: str = DATA_DIR.name) -> Path:
+    return get_data_path(datadir, "1_interim", f"geo_index_{label}.npz")
+
+
 def get_geojson(label: str, datadir: str = DATA_DIR.name) -> Optional[list[str]]:
     with open(get_geojson_path(label, datadir), "rb") as f:
         return pickle.load(f)
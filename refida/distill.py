@@ -0,0 +1,100 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import settings as _s
+
+
+def get_targets(topics: pd.DataFrame, ids: list, labels: list[str]) -> np.ndarray:
+    """
+    Build the matrix of topic scores, documents by labels, used as training targets.
+    Missing (document, label) pairs have a score of 0.
+
+    :param topics: Topics data with id, topic and score columns.
+    :param ids: Documents ids, in the order of the rows of the matrix.
+    :param labels: Labels, in the order of the columns of the matrix.
+    """
+    targets = (
+        topics.pivot_table(
+            index=_s.FIELD_ID,
+            columns=_s.FEATURE_TOPIC_TOPIC,
+            values=_s.FEATURE_TOPIC_SCORE,
+            aggfunc="max",
+        )
+        .reindex(index=ids, columns=labels)
+        .fillna(0.0)
+    )
+
+    return targets.to_numpy(dtype=np.float32)
+
+
+def fit(
+    features: np.ndarray,
+    targets: np.ndarray,
+    epochs: int = _s.TOPIC_CLASSIFICATION_DISTILL_EPOCHS,
+    learning_rate: float = _s.TOPIC_CLASSIFICATION_DISTILL_LEARNING_RATE,
+    l2: float = _s.TOPIC_CLASSIFICATION_DISTILL_L2,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fit one logistic regression per label, with gradient descent on the cross entropy
+    between the predictions and the (soft) target scores.
+
+    :param features: Matrix of documents by features.
+    :param targets: Matrix of documents by labels, with scores between 0 and 1.
+    :param epochs: Number of gradient descent iterations.
+    :param learning_rate: Gradient descent step size.
+    :param l2: L2 regularisation strength.
+    """
+    n_docs, n_features = features.shape
+    weights = np.zeros((n_features, targets.shape[1]), dtype=np.float32)
+    bias = np.zeros(targets.shape[1], dtype=np.float32)
+
+    for _ in range(epochs):
+        error = predict(features, weights, bias) - targets
+        weights -= learning_rate * (features.T @ error / n_docs + l2 * weights)
+        bias -= learning_rate * error.mean(axis=0)
+
+    return weights, bias
+
+
+def predict(features: np.ndarray, weights: np.ndarray, bias: np.ndarray) -> np.ndarray:
+    """
+    Return the matrix of documents by labels scores.
+
+    :param features: Matrix of documents by features.
+    :param weights: Matrix of features by labels weights.
+    :param bias: Labels bias.
+    """
+    return 1.0 / (1.0 + np.exp(-(features @ weights + bias)))
+
+
+def save(
+    path: Path, weights: np.ndarray, bias: np.ndarray, labels: list[str], model: str
+):
+    """
+    Save a distilled classifier.
+
+    :param path: Path to save the classifier to.
+    :param weights: Matrix of features by labels weights.
+    :param bias: Labels bias.
+    :param labels: Labels, in the order of the columns of the weights.
+    :param model: Name of the sentence embeddings model used for the features.
+    """
+    with open(path, "wb") as f:
+        np.savez(f, weights=weights, bias=bias, labels=labels, model=model)
+
+
+def load(path: Path) -> dict:
+    """
+    Load a distilled classifier.
+
+    :param path: Path to load the classifier from.
+    """
+    with np.load(path) as classifier:
+        return dict(
+            weights=classifier["weights"],
+            bias=classifier["bias"],
+            labels=classifier["labels"].tolist(),
+            model=str(classifier["model"]),
+        )
@@ -1,8 +1,15 @@
+import time
+from typing import Callable, Iterator, Union
+
+import numpy as np
 import shap
+from joblib import Parallel, delayed
 from transformers import ZeroShotClassificationPipeline
 from txtai.pipeline import Labels
 
 import settings as _s
+from refida import registry
+from refida import sentences as sm
 from settings import memory
 
 
@@ -29,29 +36,193 @@ class ExplainableZeroShotClassificationPipeline(ZeroShotClassificationPipeline):
         ]
 
     def set_explain_labels(self, labels):
+        """
+        Set the labels to explain, and map them to the outputs of the model. The labels
+        of previous calls are removed from the model config.
+        """
+        config = self.model.config
+        if not hasattr(self, "config_labels"):
+            self.config_labels = (dict(config.label2id), dict(config.id2label))
+
+        label2id, id2label = self.config_labels
+        config.label2id = {**label2id, **{v: k for k, v in enumerate(labels)}}
+        config.id2label = {**id2label, **{k: v for k, v in enumerate(labels)}}
+
         self.explain_labels = labels
 
 
+def get_pipeline(
+    model_name: str = _s.TOPIC_CLASSIFICATION_MODEL,
+) -> ExplainableZeroShotClassificationPipeline:
+    """
+    Return the explainable zero shot classification pipeline, sharing the model and
+    tokenizer of the txtai.Labels pipeline.
+
+    :param model_name: Name of the zero shot classification model.
+    """
+
+    def load() -> ExplainableZeroShotClassificationPipeline:
+        classifier = registry.get_labels(model_name)
+        return ExplainableZeroShotClassificationPipeline(
+            model=classifier.pipeline.model, tokenizer=classifier.pipeline.tokenizer
+        )
+
+    return registry.registry.get("explainable", model_name, load)
+
+
+def get_explainer(
+    topics: list[str], model_name: str = _s.TOPIC_CLASSIFICATION_MODEL
+) -> shap.Explainer:
+    """
+    Return a shap explainer of the zero shot classification of the topics.
+
+    :param topics: Topics to explain.
+    :param model_name: Name of the zero shot classification model.
+    """
+    pipeline = get_pipeline(model_name)
+    pipeline.set_explain_labels(topics)
+
+    return shap.Explainer(pipeline)
+
+
 @memory.cache
 def topic_classification(
     text: str,
     topics: list[str] = _s.TOPIC_CLASSIFICATION_TOPICS,
     model_name: str = _s.TOPIC_CLASSIFICATION_MODEL,
 ):
-    classifier = Labels(model_name)
+    explainer = get_explainer(topics, model_name)
+    shap_values = explainer([text])
+
+    return shap_values
+
+
+def explain_topics(
+    text: str, topics: list[str], model_name: str = _s.TOPIC_CLASSIFICATION_MODEL
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Explain the zero shot classification of the text into the topics. Returns the
+    tokens of the text and the attribution of each token to each topic.
+
+    :param text: Text to explain.
+    :param topics: Topics to explain.
+    :param model_name: Name of the zero shot classification model.
+    """
+    shap_values = get_explainer(topics, model_name)([text])
+    label2id = get_pipeline(model_name).model.config.label2id
 
-    model = classifier.pipeline.model
-    tokenizer = classifier.pipeline.tokenizer
+    return np.asarray(shap_values.data[0], dtype=str), {
+        topic: shap_values.values[0][:, label2id[topic]] for topic in topics
+    }
 
-    model.config.label2id.update({v: k for k, v in enumerate(topics)})
-    model.config.id2label.update({k: v for k, v in enumerate(topics)})
 
-    pipeline = ExplainableZeroShotClassificationPipeline(
-        model=model, tokenizer=tokenizer
+def sentence_occlusion(
+    text: Union[str, list[str]],
+    topics: list[str],
+    model_name: str = _s.TOPIC_CLASSIFICATION_MODEL,
+    max_passes: int = _s.EXPLAIN_OCCLUSION_MAX_PASSES,
+    time_budget: float = _s.EXPLAIN_OCCLUSION_TIME_BUDGET,
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Explain the zero shot classification of the text into the topics by occluding its
+    sentences, a fast alternative to `explain_topics`. The attribution of a sentence is
+    the drop of the topic score when the sentence is removed from the text.
+
+    The number of forward passes is capped by `max_passes` and by the time budget,
+    estimated from the time of the pass over the full text. When there are more
+    sentences than passes, contiguous sentences are occluded together and share the
+    drop of the score. All the occluded texts are classified in one call.
+
+    Returns the sentences of the text, with their trailing space, and the attribution
+    of each sentence to each topic, as `explain_topics`.
+
+    :param text: Text to explain, or its sentences, see `refida.sentences.split`.
+    :param topics: Topics to explain.
+    :param model_name: Name of the zero shot classification model.
+    :param max_passes: Maximum number of forward passes, including the full text.
+    :param time_budget: Approximate maximum number of seconds to spend.
+    """
+    sentences = text if isinstance(text, list) else sm.split(text)
+    if not sentences:
+        return np.empty(0, dtype=str), {topic: np.empty(0) for topic in topics}
+
+    classifier = registry.get_labels(model_name)
+
+    start = time.perf_counter()
+    scores = get_scores(classifier, [" ".join(sentences)], topics)[0]
+    seconds = time.perf_counter() - start
+
+    n_groups = min(len(sentences), max_passes - 1)
+    if seconds > 0:
+        n_groups = min(n_groups, int((time_budget - seconds) / seconds))
+    groups = np.array_split(np.arange(len(sentences)), max(n_groups, 1))
+
+    occluded = get_scores(
+        classifier,
+        [
+            " ".join(
+                sentence
+                for idx, sentence in enumerate(sentences)
+                if not group[0] <= idx <= group[-1]
+            )
+            for group in groups
+        ],
+        topics,
     )
-    pipeline.set_explain_labels(topics)
 
-    explainer = shap.Explainer(pipeline)
-    shap_values = explainer([text])
+    values = np.zeros((len(sentences), len(topics)))
+    for group, group_scores in zip(groups, occluded):
+        values[group] = (scores - group_scores) / len(group)
 
-    return shap_values
+    return np.asarray([f"{sentence} " for sentence in sentences], dtype=str), {
+        topic: values[:, idx] for idx, topic in enumerate(topics)
+    }
+
+
+def get_scores(classifier: Labels, texts: list[str], topics: list[str]) -> np.ndarray:
+    """
+    Return the scores, of shape texts by topics, of the zero shot classification.
+
+    :param classifier: Zero shot classifier.
+    :param texts: Texts to classify.
+    :param topics: Topics to score.
+    """
+    scores = np.zeros((len(texts), len(topics)))
+    for idx, predictions in enumerate(classifier(texts, topics, multilabel=True)):
+        for topic, score in predictions:
+            scores[idx, topic] = score
+
+    return scores
+
+
+def stream_explanations(
+    batches: Iterator[list[tuple[str, str, list[str]]]],
+    model_name: str = _s.TOPIC_CLASSIFICATION_MODEL,
+    n_jobs: int = _s.EXPLAIN_N_JOBS,
+    explainer: Callable[
+        [str, list[str], str], tuple[np.ndarray, dict[str, np.ndarray]]
+    ] = explain_topics,
+) -> Iterator[list[tuple[str, str, np.ndarray, np.ndarray]]]:
+    """
+    Explain the topic classification of batches of documents, with the documents of
+    a batch explained in parallel. Yields, for each batch, the id, topic, tokens and
+    token attributions of each explanation.
+
+    :param batches: Batches of the id, text and topics to explain of the documents.
+    :param model_name: Name of the zero shot classification model.
+    :param n_jobs: Number of processes, each loads the model once.
+    :param explainer: Function explaining a text, `explain_topics` or
+        `sentence_occlusion`.
+    """
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for batch in batches:
+            explanations = parallel(
+                delayed(explainer)(text, topics, model_name)
+                for _, text, topics in batch
+            )
+
+            yield [
+                (doc_id, topic, tokens, values[topic])
+                for (doc_id, _, topics), (tokens, values) in zip(batch, explanations)
+                for topic in topics
+            ]
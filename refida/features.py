@@ -1,14 +1,27 @@
-from functools import lru_cache
-from typing import Optional
+import asyncio
+import hashlib
+from collections import defaultdict
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
 
 import geojson
 import geopy
+import numpy as np
 import pandas as pd
-import spacy
 from geopy.location import Location
-from txtai.pipeline import Labels, Segmentation, Summary
+from spacy.language import Language
+from spacy.tokens import Doc, Span
+from spacy.util import filter_spans
+from txtai.embeddings import Embeddings
+from txtai.pipeline import Labels, Summary
 
 import settings as _s
+from refida import data as dm
+from refida import distill, registry
+from refida import sentences as sm
+from refida import gazetteer as gz
 
 
 def topic_classification(
@@ -18,10 +31,29 @@ def topic_classification(
     sentences: bool = False,
     threshold: float = 0.0,
     model: str = _s.TOPIC_CLASSIFICATION_MODEL,
+    prefilter: int = 0,
+    prefilter_model: str = _s.TOPIC_CLASSIFICATION_PREFILTER_MODEL,
+    hierarchy: Optional[dict[str, list[str]]] = None,
+    group_threshold: float = _s.TOPIC_CLASSIFICATION_GROUP_THRESHOLD,
+    distilled: Optional[dict] = None,
+    classifier: Optional[Labels] = None,
+    sentences_data: Optional[pd.DataFrame] = None,
+    pairs: Optional[list[int]] = None,
 ) -> pd.DataFrame:
     """
     Topic classification using txtai.Labels.
 
+    When `prefilter` is set, the topics are first ranked by the similarity between the
+    sentence embeddings of the text and of the topics, and only the `prefilter` most
+    similar topics are scored by the zero shot classification model.
+
+    When `hierarchy` is set, the text is first classified against the topic groups and
+    only the topics of the groups with a score equal or greater than `group_threshold`
+    are scored, the `prefilter` is ignored.
+
+    When `distilled` is set, the topics are scored by the distilled classifier instead
+    of the zero shot classification model, see `distill_topic_classification`.
+
     :param data: DataFrame with text to classify.
     :param column: Column with text to classify.
     :param topics: Topics to classify.
@@ -30,55 +62,720 @@ def topic_classification(
     :param threshold: Topics with a score lower than the threshold will be excluded from
         the results.
     :param model: Model to use.
+    :param prefilter: Number of candidate topics to score per text, 0 to score all.
+    :param prefilter_model: Sentence embeddings model used to select the candidates.
+    :param hierarchy: Topics grouped by topic group.
+    :param group_threshold: Minimum score for the topics of a group to be scored.
+    :param distilled: Distilled classifier, see `refida.distill.load`.
+    :param classifier: txtai.Labels pipeline to use instead of loading the model.
+    :param sentences_data: Sentence table of the section of the text, see
+        `refida.sentences`, used instead of segmenting the text.
+    :param pairs: List the number of (text, topic) pairs scored by the zero shot
+        classification model is appended to.
     """
-    classifier = Labels(model)
-
     topics_df = data[[_s.FIELD_ID, column]].copy()
     topics_df = topics_df.dropna(subset=[column])
 
     if sentences:
-        segment = Segmentation(sentences=True)
-        topics_df["sentence"] = segment(topics_df[column].values.tolist())
-        topics_df = topics_df.drop(columns=[column])
-        topics_df = topics_df.explode("sentence")
-        topics_df[column] = topics_df["sentence"]
+        topics_df = sm.get_sentences(topics_df, column, sentences_data)
+        topics_df[column] = topics_df[_s.FEATURE_SENTENCE_TEXT]
+
+    texts = topics_df[column].values.tolist()
+    if distilled:
+        predictions = distilled_classification(distilled, texts, topics)
+    else:
+        predictions = zero_shot_classification(
+            texts,
+            topics,
+            model,
+            prefilter,
+            prefilter_model,
+            hierarchy,
+            group_threshold,
+            classifier,
+            pairs,
+        )
 
-    topics_df["topics"] = classifier(
-        topics_df[column].values.tolist(), topics, multilabel=True
+    return topics_long_format(
+        topics_df.drop(columns=[column]), predictions, topics, threshold
     )
-    topics_df["topics"] = topics_df["topics"].apply(
-        lambda predictions: [[topics[p[0]], p[1]] for p in predictions]
+
+
+def topics_long_format(
+    data: pd.DataFrame,
+    predictions: list[list[tuple[int, float]]],
+    topics: list[str],
+    threshold: float = 0.0,
+) -> pd.DataFrame:
+    """
+    Build the topics DataFrame, with one row per (text, topic) prediction with a score
+    equal or greater than the threshold.
+
+    :param data: DataFrame with one row per classified text.
+    :param predictions: Predictions, (topic index, score), for each text.
+    :param topics: Topics the predictions refer to.
+    :param threshold: Minimum score for the predictions to be included.
+    """
+    counts = np.fromiter(map(len, predictions), dtype=np.int64, count=len(predictions))
+    flat = np.fromiter(
+        chain.from_iterable(chain.from_iterable(predictions)),
+        dtype=np.float64,
+        count=2 * int(counts.sum()),
+    ).reshape(-1, 2)
+
+    mask = flat[:, 1] >= threshold
+    rows = np.repeat(np.arange(len(predictions)), counts)[mask]
+    flat = flat[mask]
+
+    return long_format(
+        data,
+        rows,
+        {
+            _s.FEATURE_TOPIC_TOPIC: np.asarray(topics, dtype=object)[
+                flat[:, 0].astype(np.intp)
+            ],
+            _s.FEATURE_TOPIC_SCORE: flat[:, 1],
+        },
     )
-    topics_df = topics_df.explode("topics")
-    topics_df[[_s.FEATURE_TOPIC_TOPIC, _s.FEATURE_TOPIC_SCORE]] = pd.DataFrame(
-        topics_df["topics"].tolist(), index=topics_df.index
+
+
+def long_format(
+    data: pd.DataFrame, rows: np.ndarray, columns: dict[str, np.ndarray]
+) -> pd.DataFrame:
+    """
+    Build a long format DataFrame from the `rows` of the data and the `columns`, which
+    have one value per row index.
+
+    :param data: DataFrame with the values to repeat.
+    :param rows: Position, in the data, of each row of the long format DataFrame.
+    :param columns: Columns to add to the long format DataFrame.
+    """
+    long_data = {name: data[name].to_numpy()[rows] for name in data.columns}
+    long_data.update(columns)
+
+    return pd.DataFrame(long_data)
+
+
+def stream_topic_classification(
+    batches: Iterable[list[tuple[str, str]]], **kwargs
+) -> Iterator[pd.DataFrame]:
+    """
+    Topic classification of batches of (id, text), yields the topics of each batch as
+    soon as it is classified. The model is loaded once for all the batches.
+
+    :param batches: Batches of (id, text) to classify.
+    :param kwargs: Options for `topic_classification`.
+    """
+    if not kwargs.get("distilled") and "classifier" not in kwargs:
+        kwargs["classifier"] = registry.get_labels(
+            kwargs.get("model", _s.TOPIC_CLASSIFICATION_MODEL)
+        )
+
+    for batch in batches:
+        yield topic_classification(get_batch_data(batch), _s.DATA_TEXT, **kwargs)
+
+
+def get_batch_data(batch: list[tuple[str, str]]) -> pd.DataFrame:
+    """
+    Convert a batch of (id, text) into a DataFrame with id and text columns.
+
+    :param batch: Batch of (id, text).
+    """
+    return pd.DataFrame(batch, columns=[_s.FIELD_ID, _s.DATA_TEXT])
+
+
+def zero_shot_classification(
+    texts: list[str],
+    topics: list[str],
+    model: str = _s.TOPIC_CLASSIFICATION_MODEL,
+    prefilter: int = 0,
+    prefilter_model: str = _s.TOPIC_CLASSIFICATION_PREFILTER_MODEL,
+    hierarchy: Optional[dict[str, list[str]]] = None,
+    group_threshold: float = _s.TOPIC_CLASSIFICATION_GROUP_THRESHOLD,
+    classifier: Optional[Labels] = None,
+    pairs: Optional[list[int]] = None,
+) -> list[list[tuple[int, float]]]:
+    """
+    Zero shot classification of the texts, see `topic_classification`. The predictions
+    refer to the indices of the topics.
+
+    :param texts: Texts to classify.
+    :param topics: Topics to classify.
+    :param model: Model to use.
+    :param prefilter: Number of candidate topics to score per text, 0 to score all.
+    :param prefilter_model: Sentence embeddings model used to select the candidates.
+    :param hierarchy: Topics grouped by topic group.
+    :param group_threshold: Minimum score for the topics of a group to be scored.
+    :param classifier: txtai.Labels pipeline to use instead of loading the model.
+    :param pairs: List the number of (text, label) pairs scored by the model is
+        appended to.
+    """
+    if classifier is None:
+        classifier = registry.get_labels(model)
+
+    if pairs is None:
+        pairs = []
+
+    candidates = None
+    if hierarchy:
+        candidates = group_prefilter(
+            classifier, texts, topics, hierarchy, group_threshold
+        )
+        pairs.append(len(texts) * len(hierarchy))
+    elif 0 < prefilter < len(topics):
+        candidates = label_prefilter(texts, topics, prefilter, prefilter_model)
+
+    if candidates is None:
+        pairs.append(len(texts) * len(topics))
+        return classifier(texts, topics, multilabel=True)
+
+    pairs.append(sum(len(candidate) for candidate in candidates))
+
+    return classify_candidates(classifier, texts, topics, candidates)
+
+
+def distill_topic_classification(
+    data: pd.DataFrame,
+    column: str,
+    topics: pd.DataFrame,
+    labels: list[str],
+    model: str = _s.TOPIC_CLASSIFICATION_DISTILL_MODEL,
+) -> dict:
+    """
+    Train a light multi-label classifier, over sentence embeddings, to reproduce the
+    scores of the zero shot topic classification.
+
+    :param data: DataFrame with the text that was classified.
+    :param column: Column with the text that was classified.
+    :param topics: Topics from the zero shot classification of the text.
+    :param labels: Topics to train the classifier for.
+    :param model: Sentence embeddings model to use.
+    """
+    data = data[data[_s.FIELD_ID].isin(topics[_s.FIELD_ID])]
+    data = data.dropna(subset=[column])
+
+    features = embed(registry.get_embeddings(model), data[column].values.tolist())
+    targets = distill.get_targets(topics, data[_s.FIELD_ID].values.tolist(), labels)
+    weights, bias = distill.fit(features, targets)
+
+    return dict(weights=weights, bias=bias, labels=labels, model=model)
+
+
+def distilled_classification(
+    distilled: dict, texts: list[str], labels: list[str]
+) -> list[list[tuple[int, float]]]:
+    """
+    Topic classification using a distilled classifier. The predictions refer to the
+    indices of the labels, labels unknown to the classifier are not scored.
+
+    :param distilled: Distilled classifier, see `refida.distill.load`.
+    :param texts: Texts to classify.
+    :param labels: Labels to classify.
+    """
+    known = [
+        (idx, distilled["labels"].index(label))
+        for idx, label in enumerate(labels)
+        if label in distilled["labels"]
+    ]
+
+    features = embed(registry.get_embeddings(distilled["model"]), texts)
+    scores = distill.predict(features, distilled["weights"], distilled["bias"])
+
+    return [[(idx, float(row[column])) for idx, column in known] for row in scores]
+
+
+def label_prefilter(
+    texts: list[str],
+    labels: list[str],
+    k: int,
+    model: str = _s.TOPIC_CLASSIFICATION_PREFILTER_MODEL,
+) -> list[list[int]]:
+    """
+    Select the `k` labels most similar to each text, using sentence embeddings.
+
+    :param texts: Texts to select the labels for.
+    :param labels: Candidate labels.
+    :param k: Number of labels to select per text.
+    :param model: Sentence embeddings model to use.
+    """
+    embeddings = registry.get_embeddings(model)
+
+    similarity = embed(embeddings, texts) @ embed(embeddings, labels).T
+    top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+
+    return np.sort(top, axis=1).tolist()
+
+
+def group_prefilter(
+    classifier: Labels,
+    texts: list[str],
+    labels: list[str],
+    hierarchy: dict[str, list[str]],
+    threshold: float = _s.TOPIC_CLASSIFICATION_GROUP_THRESHOLD,
+) -> list[list[int]]:
+    """
+    Select the labels of the groups each text is classified into. When no group has a
+    score equal or greater than the threshold, the best scoring group is selected.
+    The labels of the groups a text did not select are never scored for that text.
+
+    :param classifier: txtai.Labels pipeline.
+    :param texts: Texts to select the labels for.
+    :param labels: Candidate labels.
+    :param hierarchy: Labels grouped by group name.
+    :param threshold: Minimum score for the labels of a group to be selected.
+    """
+    index = {label: idx for idx, label in enumerate(labels)}
+    groups = [
+        [index[label] for label in group_labels if label in index]
+        for group_labels in hierarchy.values()
+    ]
+
+    predictions = classifier(
+        texts, [group.capitalize() for group in hierarchy.keys()], multilabel=True
     )
-    topics_df = topics_df.drop(columns=[column, "topics"])
-    topics_df = topics_df[topics_df[_s.FEATURE_TOPIC_SCORE] >= threshold]
 
-    return topics_df
+    candidates = []
+    for prediction in predictions:
+        selected = [p[0] for p in prediction if p[1] >= threshold]
+        if not selected:
+            selected = [max(prediction, key=lambda p: p[1])[0]]
+        candidates.append(sorted(idx for group in selected for idx in groups[group]))
+
+    return candidates
 
 
-def summarise(data: pd.DataFrame, model: str = _s.SUMMARISATION_MODEL) -> pd.DataFrame:
+def embed(embeddings: Embeddings, texts: list[str]) -> np.ndarray:
+    """
+    Return the normalised sentence embeddings of the texts.
+
+    :param embeddings: txtai.Embeddings used to transform the texts.
+    :param texts: Texts to embed.
+    """
+    vectors = embeddings.batchtransform([(None, text, None) for text in texts])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def classify_candidates(
+    classifier: Labels,
+    texts: list[str],
+    labels: list[str],
+    candidates: list[list[int]],
+) -> list[list[tuple[int, float]]]:
+    """
+    Zero shot classification of each text against its own subset of the labels, so
+    that each text is only scored against its candidates. Texts with the same
+    candidate labels are classified together. The predictions refer to the indices of
+    the full list of labels.
+
+    :param classifier: txtai.Labels pipeline.
+    :param texts: Texts to classify.
+    :param labels: All the labels.
+    :param candidates: Indices of the candidate labels for each text.
+    """
+    batches: dict[tuple[int, ...], list[int]] = defaultdict(list)
+    for idx, candidate in enumerate(candidates):
+        if candidate:
+            batches[tuple(candidate)].append(idx)
+
+    predictions: list[list[tuple[int, float]]] = [[] for _ in texts]
+    for candidate, indices in batches.items():
+        results = classifier(
+            [texts[idx] for idx in indices],
+            [labels[c] for c in candidate],
+            multilabel=True,
+        )
+        for idx, result in zip(indices, results):
+            predictions[idx] = [(candidate[p[0]], p[1]) for p in result]
+
+    return predictions
+
+
+def topics_recall(
+    reference: pd.DataFrame, topics: pd.DataFrame, threshold: float = 0.0
+) -> Optional[float]:
+    """
+    Proportion of the (document, topic) pairs in the reference with a score equal or
+    greater than the threshold that are also found in the topics.
+
+    :param reference: Topics to compare against, for example a full classification.
+    :param topics: Topics to evaluate, for example a prefiltered classification.
+    :param threshold: Minimum score for the pairs to be compared.
+    """
+    keys = [_s.FIELD_ID, _s.FEATURE_TOPIC_TOPIC]
+
+    reference = reference[reference[_s.FEATURE_TOPIC_SCORE] >= threshold][keys]
+    reference = reference.drop_duplicates()
+    if reference.empty:
+        return None
+
+    topics = topics[topics[_s.FEATURE_TOPIC_SCORE] >= threshold][keys]
+    found = reference.merge(topics.drop_duplicates(), on=keys, how="inner")
+
+    return len(found) / len(reference)
+
+
+def summarise(
+    data: pd.DataFrame,
+    model: str = _s.SUMMARISATION_MODEL,
+    summary: Optional[Summary] = None,
+    batch_size: int = _s.SUMMARISATION_BATCH_SIZE,
+    decoding: str = _s.SUMMARISATION_DECODING,
+    quantize: bool = _s.SUMMARISATION_QUANTIZE,
+    cache: Optional[Path] = None,
+    chunked: bool = False,
+) -> pd.DataFrame:
     """
     Summarise the text.
 
     :param data: DataFrame with text to summarise.
     :param name: The name of the summary model to use.
+    :param summary: txtai.Summary pipeline to use instead of loading the model.
+    :param batch_size: Number of texts to summarise at a time by the model.
+    :param decoding: Name of the decoding preset, see `SUMMARISATION_DECODING_PRESETS`.
+    :param quantize: Wether to use a dynamically quantised, int8, model on CPU.
+    :param cache: Path to the summaries cache, only texts that are not in the cache
+        are summarised by the model.
+    :param chunked: Wether to summarise long texts in chunks that fit in the input of
+        the model, see `summarise_chunked`, instead of truncating them.
+    """
+    texts = data[_s.DATA_TEXT].values.tolist()
+    model_key = f"{model}:{decoding}:{'int8' if quantize else 'fp'}"
+
+    def load() -> Summary:
+        return summary or load_summary(model, quantize)
+
+    if chunked:
+        summaries = summarise_cached(
+            texts,
+            lambda missing: summarise_chunked(
+                load(), missing, batch_size, decoding, cache, model_key
+            ),
+            cache,
+            f"{model_key}:chunked",
+        )
+    else:
+        summaries = summarise_cached(
+            texts,
+            lambda missing: summarise_texts(load(), missing, batch_size, decoding),
+            cache,
+            model_key,
+        )
+
+    summary_df = data[[_s.FIELD_ID]].copy()
+    summary_df[_s.FEATURE_SUMMARY] = summaries
+
+    return summary_df
+
+
+def summarise_cached(
+    texts: list[str],
+    summarise_missing: Callable[[list[str]], list[str]],
+    cache: Optional[Path] = None,
+    model_key: str = "",
+) -> list[str]:
+    """
+    Return the cached summaries of the texts, and summarise the texts that are not in
+    the cache.
+
+    :param texts: Texts to summarise.
+    :param summarise_missing: Function that summarises a list of texts.
+    :param cache: Path to the summaries cache, no cache is used when not set.
+    :param model_key: Key of the model, and options, used to generate the summaries.
+    """
+    summaries: dict[int, str] = {}
+
+    if cache:
+        keys = [get_text_key(text) for text in texts]
+        cached = dm.get_cached_summaries(cache, model_key, list(set(keys)))
+        summaries = {idx: cached[key] for idx, key in enumerate(keys) if key in cached}
+
+    missing = [idx for idx in range(len(texts)) if idx not in summaries]
+    if missing:
+        generated = summarise_missing([texts[idx] for idx in missing])
+        summaries.update(zip(missing, generated))
+
+        if cache:
+            dm.cache_summaries(
+                cache, model_key, {keys[idx]: summaries[idx] for idx in missing}
+            )
+
+    return [summaries[idx] for idx in range(len(texts))]
+
+
+def get_text_key(text: Optional[str]) -> str:
+    """
+    Return the key used to cache the output of a model for the text.
+
+    :param text: The text to get the key for.
+    """
+    return hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+
+
+def load_summary(
+    model: str = _s.SUMMARISATION_MODEL, quantize: bool = _s.SUMMARISATION_QUANTIZE
+) -> Summary:
+    """
+    Load, once per process, the txtai.Summary pipeline.
+
+    :param model: The name of the summary model to use.
+    :param quantize: Wether to use a dynamically quantised, int8, model on CPU.
+    """
+    return registry.get_summary(model, quantize)
+
+
+def summarise_texts(
+    summary: Summary,
+    texts: list[str],
+    batch_size: int = _s.SUMMARISATION_BATCH_SIZE,
+    decoding: str = _s.SUMMARISATION_DECODING,
+) -> list[str]:
+    """
+    Summarise the texts in batches of texts of similar length, to minimise padding.
+    Texts shorter than the maximum summary length are returned unchanged, as done by
+    txtai.Summary.
+
+    :param summary: txtai.Summary pipeline.
+    :param texts: Texts to summarise.
+    :param batch_size: Number of texts to summarise at a time by the model.
+    :param decoding: Name of the decoding preset, see `SUMMARISATION_DECODING_PRESETS`.
+    """
+    kwargs = dict(truncation=True, **_s.SUMMARISATION_DECODING_PRESETS[decoding])
+    max_length = summary.pipeline.model.config.max_length
+
+    summaries = list(texts)
+    indices = sorted(
+        [
+            idx
+            for idx, text in enumerate(texts)
+            if isinstance(text, str) and len(text) >= max_length
+        ],
+        key=lambda idx: len(texts[idx]),
+        reverse=True,
+    )
+
+    for start in range(0, len(indices), batch_size):
+        end = start + batch_size
+        batch = indices[start:end]
+        results = summary.pipeline(
+            [texts[idx] for idx in batch], batch_size=len(batch), **kwargs
+        )
+        for idx, result in zip(batch, results):
+            summaries[idx] = summary.clean(result["summary_text"])
+
+    return summaries
+
+
+def summarise_chunked(
+    summary: Summary,
+    texts: list[str],
+    batch_size: int = _s.SUMMARISATION_BATCH_SIZE,
+    decoding: str = _s.SUMMARISATION_DECODING,
+    cache: Optional[Path] = None,
+    model_key: str = "",
+    max_tokens: int = _s.SUMMARISATION_CHUNK_TOKENS,
+    rounds: int = _s.SUMMARISATION_CHUNK_ROUNDS,
+) -> list[str]:
+    """
+    Summarise long texts with a map-reduce approach: the texts are split, on sentence
+    boundaries, into chunks that fit in the input of the model, the chunks of all the
+    texts are summarised together and the summaries of the chunks of each text are
+    joined. Texts whose joined summaries are still too long for the model are
+    summarised again, until they fit in one chunk or the number of rounds is reached;
+    the single chunk of each text is then summarised into the final summary.
+
+    :param summary: txtai.Summary pipeline.
+    :param texts: Texts to summarise.
+    :param batch_size: Number of chunks to summarise at a time by the model.
+    :param decoding: Name of the decoding preset, see `SUMMARISATION_DECODING_PRESETS`.
+    :param cache: Path to the summaries cache, the chunk summaries are cached so that
+        the unchanged chunks of edited texts are not summarised again.
+    :param model_key: Key of the model, and options, used to cache the summaries.
+    :param max_tokens: Maximum number of tokens in a chunk.
+    :param rounds: Maximum number of rounds of chunking, the text is truncated by the
+        model in the last round.
+    """
+    tokenizer = summary.pipeline.tokenizer
+    segment = registry.get_segmentation()
+
+    rounds = max(rounds, 1)
+
+    summaries = list(texts)
+    current = {idx: text for idx, text in enumerate(texts) if isinstance(text, str)}
+
+    for current_round in range(rounds):
+        if not current:
+            break
+
+        chunks = {}
+        for idx, text in current.items():
+            if current_round == rounds - 1:
+                chunks[idx] = [text]
+                continue
+
+            sentences = [sentence for sentence in segment(text) if sentence]
+            lengths = [
+                len(ids)
+                for ids in tokenizer(sentences, add_special_tokens=False)["input_ids"]
+            ]
+            chunks[idx] = get_chunks(sentences, lengths, max_tokens) or [text]
+
+        unique = list(dict.fromkeys(chain.from_iterable(chunks.values())))
+        chunk_summaries = dict(
+            zip(
+                unique,
+                summarise_cached(
+                    unique,
+                    lambda missing: summarise_texts(
+                        summary, missing, batch_size, decoding
+                    ),
+                    cache,
+                    model_key,
+                ),
+            )
+        )
+
+        current = {}
+        for idx, parts in chunks.items():
+            joined = " ".join(chunk_summaries[part] for part in parts)
+            if len(parts) == 1:
+                summaries[idx] = joined
+            else:
+                current[idx] = joined
+
+    return summaries
+
+
+def get_chunks(sentences: list[str], lengths: list[int], max_tokens: int) -> list[str]:
+    """
+    Group consecutive sentences into chunks of at most `max_tokens` tokens. Sentences
+    longer than `max_tokens` are kept in a chunk of their own.
+
+    :param sentences: Sentences to group.
+    :param lengths: Number of tokens in each sentence.
+    :param max_tokens: Maximum number of tokens in a chunk.
+    """
+    chunks: list[list[str]] = []
+    size = 0
+
+    for sentence, length in zip(sentences, lengths):
+        if not chunks or size + length > max_tokens:
+            chunks.append([])
+            size = 0
+
+        chunks[-1].append(sentence)
+        size += length
+
+    return [" ".join(chunk) for chunk in chunks]
+
+
+def stream_summarise(
+    batches: Iterable[list[tuple[str, str]]],
+    model: str = _s.SUMMARISATION_MODEL,
+    **kwargs,
+) -> Iterator[pd.DataFrame]:
+    """
+    Summarise batches of (id, text), yields the summaries of each batch as soon as it
+    is summarised. The model is loaded once, when first needed, for all the batches.
+
+    :param batches: Batches of (id, text) to summarise.
+    :param model: The name of the summary model to use.
+    :param kwargs: Options for `summarise`.
+    """
+    for batch in batches:
+        yield summarise(get_batch_data(batch), model, **kwargs)
+
+
+def extractive_summarise(
+    data: pd.DataFrame,
+    model: str = _s.SUMMARISATION_EXTRACTIVE_MODEL,
+    k: int = _s.SUMMARISATION_EXTRACTIVE_SENTENCES,
+    embeddings: Optional[Embeddings] = None,
+    sentences_data: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
     """
-    summary = Summary(model)
+    Extractive summary of the text: the `k` sentences closest to the centroid of the
+    sentence embeddings of the text, in the order they appear in the text.
+
+    :param data: DataFrame with text to summarise.
+    :param model: Sentence embeddings model to use.
+    :param k: Number of sentences in the summary.
+    :param embeddings: txtai.Embeddings to use instead of loading the model.
+    :param sentences_data: Sentence table of the text, see `refida.sentences`, used
+        instead of segmenting the text.
+    """
+    if embeddings is None:
+        embeddings = registry.get_embeddings(model)
+
+    doc_sentences = (
+        sm.get_sentences(data, _s.DATA_TEXT, sentences_data)
+        .groupby(_s.FIELD_ID, sort=False)[_s.FEATURE_SENTENCE_TEXT]
+        .agg(list)
+    )
+    sentences = [doc_sentences.get(doc_id, []) for doc_id in data[_s.FIELD_ID]]
+
+    flat = list(chain.from_iterable(sentences))
+    vectors = embed(embeddings, flat) if flat else np.zeros((0, 0))
+    offsets = np.cumsum([0] + [len(doc) for doc in sentences])
+
+    summaries = []
+    for doc, start, end in zip(sentences, offsets[:-1], offsets[1:]):
+        selected = get_central_sentences(vectors[start:end], k)
+        summaries.append(" ".join(doc[idx] for idx in selected))
 
     summary_df = data[[_s.FIELD_ID]].copy()
-    summary_df[_s.FEATURE_SUMMARY] = summary(data[_s.DATA_TEXT].values.tolist())
+    summary_df[_s.FEATURE_SUMMARY] = summaries
 
     return summary_df
 
 
+def get_central_sentences(vectors: np.ndarray, k: int) -> list[int]:
+    """
+    Return the indices, in order, of the `k` vectors most similar to the centroid of
+    the vectors.
+
+    :param vectors: Normalised sentence embeddings.
+    :param k: Number of sentences to select.
+    """
+    if len(vectors) <= k:
+        return list(range(len(vectors)))
+
+    scores = vectors @ vectors.mean(axis=0)
+    top = np.argpartition(-scores, k - 1)[:k]
+
+    return np.sort(top).tolist()
+
+
+def stream_extractive_summarise(
+    batches: Iterable[list[tuple[str, str]]],
+    model: str = _s.SUMMARISATION_EXTRACTIVE_MODEL,
+    **kwargs,
+) -> Iterator[pd.DataFrame]:
+    """
+    Extractive summary of batches of (id, text), yields the summaries of each batch as
+    soon as it is summarised. The model is loaded once for all the batches.
+
+    :param batches: Batches of (id, text) to summarise.
+    :param model: Sentence embeddings model to use.
+    :param kwargs: Options for `extractive_summarise`.
+    """
+    embeddings = registry.get_embeddings(model)
+
+    for batch in batches:
+        yield extractive_summarise(
+            get_batch_data(batch), model, embeddings=embeddings, **kwargs
+        )
+
+
 def entity_extraction(
     data: pd.DataFrame,
     column: str,
     model: str = _s.SPACY_LANGUAGE_MODEL,
     entity_types: list[str] = _s.SPACY_ENTITY_TYPES,
+    nlp: Optional[Language] = None,
+    batch_size: int = _s.SPACY_BATCH_SIZE,
+    n_process: int = _s.SPACY_N_PROCESS,
 ) -> tuple[list, pd.DataFrame]:
     """
     Extract entities using spaCy.
@@ -87,44 +784,311 @@ def entity_extraction(
     :param column: Column to extract entities from.
     :param model: spaCy language model to use.
     :param entity_types: Entity types to extract.
+    :param nlp: spaCy language pipeline to use instead of loading the model.
+    :param batch_size: Number of texts processed at a time by spaCy.
+    :param n_process: Number of processes used by spaCy.
     """
     if column not in data.columns:
         raise ValueError(f"Column {column} not in data.")
 
-    nlp = spacy.load(model)
+    if nlp is None:
+        nlp = load_spacy(model)
+
+    texts = data[column].fillna("").values.tolist()
+    docs: list = [None] * len(texts)
+
+    for doc, idx in nlp.pipe(
+        ((texts[idx], idx) for idx in get_length_order(texts)),
+        as_tuples=True,
+        batch_size=batch_size,
+        n_process=n_process,
+    ):
+        docs[idx] = doc
+
+    return docs, entities_long_format(data[[_s.FIELD_ID]], docs, entity_types)
+
+
+def load_spacy(model: str = _s.SPACY_LANGUAGE_MODEL) -> Language:
+    """
+    Load, once per process, the spaCy language model, with the components that are not
+    needed to extract entities disabled.
+
+    :param model: spaCy language model to use.
+    """
+    return registry.get_spacy(model, _s.SPACY_DISABLED_COMPONENTS)
+
+
+def get_length_order(texts: list[str]) -> list[int]:
+    """
+    Return the indices of the texts sorted by decreasing length, processing texts of
+    similar length together minimises padding.
+
+    :param texts: Texts to sort.
+    """
+    return sorted(range(len(texts)), key=lambda idx: len(texts[idx]), reverse=True)
+
+
+def entities_long_format(
+    data: pd.DataFrame, docs: list, entity_types: list[str]
+) -> pd.DataFrame:
+    """
+    Build the entities DataFrame, with one row per entity of the given types.
+
+    :param data: DataFrame with one row per spaCy doc.
+    :param docs: spaCy docs.
+    :param entity_types: Entity types to include.
+    """
+    ents = [[ent for ent in doc.ents if ent.label_ in entity_types] for doc in docs]
+
+    counts = np.fromiter(map(len, ents), dtype=np.int64, count=len(ents))
+    total = int(counts.sum())
+    labels = np.fromiter(
+        (ent.label_ for ent in chain.from_iterable(ents)), dtype=object, count=total
+    )
+    texts = np.fromiter(
+        (ent.text for ent in chain.from_iterable(ents)), dtype=object, count=total
+    )
+
+    return long_format(
+        data,
+        np.repeat(np.arange(len(ents)), counts),
+        {
+            _s.FEATURE_ENTITY_LABEL: labels,
+            _s.FEATURE_ENTITY_TEXT: texts,
+            _s.FEATURE_ENTITY_ENTITY: labels + ": " + texts,
+        },
+    )
+
+
+def stream_entity_extraction(
+    batches: Iterable[list[tuple[str, str]]],
+    model: str = _s.SPACY_LANGUAGE_MODEL,
+    entity_types: list[str] = _s.SPACY_ENTITY_TYPES,
+    batch_size: int = _s.SPACY_BATCH_SIZE,
+    n_process: int = _s.SPACY_N_PROCESS,
+) -> Iterator[tuple[list, pd.DataFrame]]:
+    """
+    Extract entities from batches of (id, text), yields the spaCy docs and entities of
+    each batch as soon as they are extracted, see `stream_sections_entity_extraction`.
+
+    :param batches: Batches of (id, text) to extract entities from.
+    :param model: spaCy language model to use.
+    :param entity_types: Entity types to extract.
+    :param batch_size: Number of texts processed at a time by spaCy.
+    :param n_process: Number of processes used by spaCy.
+    """
+    for _, docs, entities in stream_sections_entity_extraction(
+        ((None, batch) for batch in batches),
+        model,
+        entity_types,
+        batch_size,
+        n_process,
+    ):
+        yield docs, entities
+
+
+def stream_sections_entity_extraction(
+    batches: Iterable[tuple[Optional[str], list[tuple[str, str]]]],
+    model: str = _s.SPACY_LANGUAGE_MODEL,
+    entity_types: list[str] = _s.SPACY_ENTITY_TYPES,
+    batch_size: int = _s.SPACY_BATCH_SIZE,
+    n_process: int = _s.SPACY_N_PROCESS,
+    fast_model: Optional[str] = None,
+) -> Iterator[tuple[Optional[str], list, pd.DataFrame]]:
+    """
+    Extract entities from batches of (id, text) of one or more sections, yields the
+    section, spaCy docs and entities of each batch as soon as they are extracted. The
+    model is loaded, and the texts of all the batches are processed by a single
+    `nlp.pipe`, so that the model and the spaCy processes are only loaded once.
+
+    When `fast_model` is set, the texts are processed by the fast model and only the
+    candidate sentences, see `get_candidate_sentences`, are processed by `model`.
+
+    :param batches: Batches of (id, text) to extract entities from, with the name of
+        the section the texts are from.
+    :param model: spaCy language model to use.
+    :param entity_types: Entity types to extract.
+    :param batch_size: Number of texts processed at a time by spaCy.
+    :param n_process: Number of processes used by spaCy.
+    :param fast_model: spaCy language model used to select the sentences to process
+        with `model`.
+    """
+    nlp = load_spacy(model)
+    fast_nlp = (
+        registry.get_spacy(fast_model, _s.SPACY_FAST_DISABLED_COMPONENTS)
+        if fast_model
+        else None
+    )
+    pending: list[tuple[Optional[str], pd.DataFrame]] = []
+
+    def get_texts() -> Iterator[tuple[str, int]]:
+        for section, batch in batches:
+            data = get_batch_data(batch)
+            pending.append((section, data))
+
+            texts = data[_s.DATA_TEXT].fillna("").values.tolist()
+            for idx in get_length_order(texts):
+                yield texts[idx], idx
 
-    entities_df = data[[_s.FIELD_ID]].copy()
-    entities_df["doc"] = data[column].fillna("").apply(nlp)
+    docs: list = []
+    n_done = 0
 
-    docs = entities_df["doc"].tolist()
+    for doc, idx in (fast_nlp or nlp).pipe(
+        get_texts(), as_tuples=True, batch_size=batch_size, n_process=n_process
+    ):
+        if not docs:
+            docs = [None] * len(pending[0][1])
 
-    entities_df["entities"] = entities_df["doc"].apply(
-        lambda doc: [
-            [ent.label_, ent.text, f"{ent.label_}: {ent.text}"]
-            for ent in doc.ents
-            if ent.label_ in entity_types
-        ]
+        docs[idx] = doc
+        n_done += 1
+
+        if n_done == len(docs):
+            if fast_nlp:
+                docs = refine_entities(
+                    nlp, docs, entity_types, batch_size, n_process
+                )
+
+            section, data = pending.pop(0)
+            yield section, docs, entities_long_format(
+                data[[_s.FIELD_ID]], docs, entity_types
+            )
+            docs = []
+            n_done = 0
+
+
+def refine_entities(
+    nlp: Language,
+    docs: list,
+    entity_types: list[str] = _s.SPACY_ENTITY_TYPES,
+    batch_size: int = _s.SPACY_BATCH_SIZE,
+    n_process: int = _s.SPACY_N_PROCESS,
+) -> list:
+    """
+    Replace the entities of docs processed by a fast model with the entities found by
+    `nlp` in the candidate sentences of the docs.
+
+    :param nlp: spaCy language pipeline, for example a transformer model.
+    :param docs: spaCy docs processed by a fast model, with sentence boundaries.
+    :param entity_types: Entity types to extract.
+    :param batch_size: Number of sentences processed at a time by spaCy.
+    :param n_process: Number of processes used by spaCy.
+    """
+    sentences = [
+        (sentence.text, (idx, sentence.start_char))
+        for idx, doc in enumerate(docs)
+        for sentence in get_candidate_sentences(doc, entity_types)
+    ]
+    texts = [text for text, _ in sentences]
+    spans: list[list] = [[] for _ in docs]
+
+    for sentence, (idx, offset) in nlp.pipe(
+        (sentences[idx] for idx in get_length_order(texts)),
+        as_tuples=True,
+        batch_size=batch_size,
+        n_process=n_process,
+    ):
+        for ent in sentence.ents:
+            span = docs[idx].char_span(
+                offset + ent.start_char,
+                offset + ent.end_char,
+                label=ent.label_,
+                alignment_mode="expand",
+            )
+            if span is not None:
+                spans[idx].append(span)
+
+    for doc, doc_spans in zip(docs, spans):
+        doc.ents = filter_spans(doc_spans)
+
+    return docs
+
+
+def get_candidate_sentences(doc: Doc, entity_types: list[str]) -> list[Span]:
+    """
+    Return the sentences of a doc, processed by a fast model, that may contain
+    entities of the given types: sentences with entities of the given types, and
+    sentences where the fast model may have missed, or mislabelled, an entity, with
+    proper nouns that are not part of an entity of the given types.
+
+    :param doc: spaCy doc processed by a fast model.
+    :param entity_types: Entity types to extract.
+    """
+    return [
+        sentence
+        for sentence in doc.sents
+        if any(ent.label_ in entity_types for ent in sentence.ents)
+        or any(
+            token.tag_ in ("NNP", "NNPS") and token.ent_type_ not in entity_types
+            for token in sentence
+        )
+    ]
+
+
+def entities_agreement(
+    reference: pd.DataFrame, entities: pd.DataFrame
+) -> Optional[pd.DataFrame]:
+    """
+    Agreement between the entities and reference entities, for example extracted with
+    a transformer model over the full text, per entity label and for all the labels.
+    The (document, entity) pairs are compared.
+
+    :param reference: Entities to compare against.
+    :param entities: Entities to evaluate.
+    """
+    keys = [_s.FIELD_ID, _s.FEATURE_ENTITY_LABEL, _s.FEATURE_ENTITY_TEXT]
+
+    reference = reference[keys].drop_duplicates()
+    if reference.empty:
+        return None
+
+    entities = entities[keys].drop_duplicates()
+    found = reference.merge(entities, on=keys, how="inner")
+
+    counts = pd.DataFrame(
+        {
+            "reference": reference[_s.FEATURE_ENTITY_LABEL].value_counts(),
+            "entities": entities[_s.FEATURE_ENTITY_LABEL].value_counts(),
+            "found": found[_s.FEATURE_ENTITY_LABEL].value_counts(),
+        }
     )
-    entities_df = entities_df.drop(columns=["doc"])
-    entities_df = entities_df.explode("entities")
-    entities_df = entities_df.dropna(subset=["entities"])
-    entities_df[
-        [_s.FEATURE_ENTITY_LABEL, _s.FEATURE_ENTITY_TEXT, _s.FEATURE_ENTITY_ENTITY]
-    ] = pd.DataFrame(entities_df["entities"].tolist(), index=entities_df.index)
-    entities_df = entities_df.drop(columns=["entities"])
+    counts = counts.fillna(0).astype(int)
+    counts.loc["all"] = counts.sum()
 
-    return docs, entities_df
+    counts["precision"] = counts["found"] / counts["entities"].where(
+        counts["entities"] > 0
+    )
+    counts["recall"] = counts["found"] / counts["reference"].where(
+        counts["reference"] > 0
+    )
+
+    return counts
 
 
 def geolocate(
     data: pd.DataFrame,
     entity_types: list[str] = _s.SPACY_LOCATION_ENTITY_TYPES,
+    gazetteer: Optional[Path] = None,
+    fallback: bool = _s.GEOCODER_FALLBACK,
+    concurrency: int = _s.GEOCODE_CONCURRENCY,
+    geocoder: Optional[Callable[[str], Optional[Location]]] = None,
+    centroids: Optional[dict[str, tuple[float, float]]] = None,
 ) -> tuple[pd.DataFrame, list[dict]]:
     """
-    Geolocate data using OpenStreetMap Nominatim service.
+    Geolocate data using OpenStreetMap Nominatim service, or a local gazetteer.
+
+    The distinct place names, and then the distinct countries of the places that are
+    not in the centroids, are geocoded concurrently, and the place data is joined back
+    to the entities.
 
     :param data: DataFrame with text to geocode.
     :param entity_types: Entity types to geocode.
+    :param gazetteer: Path to the gazetteer to geocode with, instead of Nominatim.
+    :param fallback: Wether to geocode the places not found in the gazetteer with
+        Nominatim.
+    :param concurrency: Maximum number of places geocoded at the same time.
+    :param geocoder: Function to geocode a place name with, instead of `get_location`.
+    :param centroids: Latitude and longitude of the countries and continents, see
+        `get_centroids`.
     """
     place_data_columns = [
         _s.FEATURE_GEO_DISPLAY_NAME,
@@ -137,35 +1101,98 @@ def geolocate(
         _s.FEATURE_GEO_PLACE_LON,
         _s.FEATURE_GEO_GEOJSON,
     ]
+    keys = [_s.FEATURE_ENTITY_LABEL, _s.FEATURE_ENTITY_TEXT]
 
-    geo_df = data[data[_s.FEATURE_ENTITY_LABEL].isin(entity_types)].copy()
-    geo_df[place_data_columns] = geo_df.apply(
-        lambda x: get_place_data(x[_s.FEATURE_ENTITY_LABEL], x[_s.FEATURE_ENTITY_TEXT]),
-        axis=1,
-        result_type="expand",
-    )
-    geo_df = geo_df.dropna(subset=[_s.FEATURE_GEO_LAT, _s.FEATURE_GEO_LON])
-    geo_df[_s.FEATURE_GEO_GEOJSON] = geo_df.apply(
-        lambda x: geojson.Feature(
-            id=x[_s.FEATURE_ENTITY_TEXT],
-            geometry=x[_s.FEATURE_GEO_GEOJSON],
-            properties={"name": x[_s.FEATURE_ENTITY_TEXT]},
-        ),
-        axis=1,
+    if geocoder is None:
+        geocoder = partial(get_location, gazetteer=gazetteer, fallback=fallback)
+
+    if centroids is None:
+        centroids = {}
+
+    geo_df = data[data[_s.FEATURE_ENTITY_LABEL].isin(entity_types)]
+    places = geo_df[keys].dropna().drop_duplicates()
+
+    locations = resolve_locations(
+        places[_s.FEATURE_ENTITY_TEXT].unique().tolist(), geocoder, concurrency
+    )
+    countries = {
+        location.raw.get("address", {}).get("country")
+        for location in locations.values()
+        if location
+    }
+    locations.update(
+        resolve_locations(
+            [
+                name
+                for name in countries
+                if name and name not in locations and name not in centroids
+            ],
+            geocoder,
+            concurrency,
+        )
     )
 
-    geojson_features = geo_df[_s.FEATURE_GEO_GEOJSON].drop_duplicates().values.tolist()
+    place_data = [
+        get_place_data(label, name, locations, centroids)
+        or [None] * len(place_data_columns)
+        for label, name in places.itertuples(index=False, name=None)
+    ]
+    places = pd.concat(
+        [
+            places,
+            pd.DataFrame(place_data, columns=place_data_columns, index=places.index),
+        ],
+        axis=1,
+    ).dropna(subset=[_s.FEATURE_GEO_LAT, _s.FEATURE_GEO_LON])
 
-    geo_df = geo_df.drop(columns=[_s.FEATURE_GEO_GEOJSON])
+    geojson_features = [
+        geojson.Feature(id=name, geometry=geometry, properties={"name": name})
+        for name, geometry in places.drop_duplicates(subset=_s.FEATURE_ENTITY_TEXT)[
+            [_s.FEATURE_ENTITY_TEXT, _s.FEATURE_GEO_GEOJSON]
+        ].itertuples(index=False, name=None)
+    ]
+
+    geo_df = geo_df.merge(
+        places.drop(columns=[_s.FEATURE_GEO_GEOJSON]), on=keys, how="inner"
+    )
     geo_df = geo_df.drop_duplicates()
 
     return geo_df, geojson_features
 
 
-@lru_cache
+def resolve_locations(
+    names: list[str],
+    geocoder: Callable[[str], Optional[Location]],
+    concurrency: int = _s.GEOCODE_CONCURRENCY,
+) -> dict[str, Optional[Location]]:
+    """
+    Geocode the place names concurrently, in threads, with at most `concurrency`
+    names geocoded at the same time.
+
+    :param names: Distinct place names to geocode.
+    :param geocoder: Function to geocode a place name with.
+    :param concurrency: Maximum number of places geocoded at the same time.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def resolve(name: str) -> Optional[Location]:
+        async with semaphore:
+            return await asyncio.to_thread(geocoder, name)
+
+    async def resolve_all() -> list[Optional[Location]]:
+        return await asyncio.gather(*(resolve(name) for name in names))
+
+    if not names:
+        return {}
+
+    return dict(zip(names, asyncio.run(resolve_all())))
+
+
 def get_place_data(
     label: str,
     name: str,
+    locations: dict[str, Optional[Location]],
+    centroids: Optional[dict[str, tuple[float, float]]] = None,
 ) -> Optional[
     tuple[
         str,
@@ -180,15 +1207,18 @@ def get_place_data(
     ]
 ]:
     """
-    Get place data using OpenStreetMap Nominatim service.
+    Get place data from the geocoded locations.
 
     :param label: Entity label.
     :param name: Name of the place to get data for.
+    :param locations: Locations of the place names, and of their countries.
+    :param centroids: Latitude and longitude of the countries and continents, used
+        instead of the locations of the countries.
     """
     if not name:
         return None
 
-    location = geocode(name)
+    location = locations.get(name)
     if not location:
         return None
 
@@ -197,11 +1227,11 @@ def get_place_data(
     city = name
     place = display_name = raw["display_name"]
     state = None
-    place_location = None
+    place_point = None
 
     # continents
     if label == "LOC":
-        place_location = location
+        place_point = (location.latitude, location.longitude)
 
     if "address" in raw:
         address = raw["address"]
@@ -212,7 +1242,7 @@ def get_place_data(
         if "country" in address:
             place = address["country"]
 
-            place_location = geocode(place)
+            place_point = get_point(place, locations, centroids)
 
     return (
         display_name,
@@ -221,12 +1251,87 @@ def get_place_data(
         _s.get_place_category(city, place),
         state,
         place,
-        place_location.latitude if place_location else None,
-        place_location.longitude if place_location else None,
+        place_point[0] if place_point else None,
+        place_point[1] if place_point else None,
         location.raw["geojson"],
     )
 
 
+def get_point(
+    name: str,
+    locations: dict[str, Optional[Location]],
+    centroids: Optional[dict[str, tuple[float, float]]] = None,
+) -> Optional[tuple[float, float]]:
+    """
+    Return the latitude and longitude of a place, from the centroids or else from the
+    geocoded locations.
+
+    :param name: Name of the place.
+    :param locations: Geocoded locations of the place names.
+    :param centroids: Latitude and longitude of the countries and continents.
+    """
+    if centroids and name in centroids:
+        return centroids[name]
+
+    location = locations.get(name)
+    if location:
+        return location.latitude, location.longitude
+
+    return None
+
+
+def get_centroids(
+    names: list[str],
+    geocoder: Callable[[str], Optional[Location]],
+    concurrency: int = _s.GEOCODE_CONCURRENCY,
+) -> pd.DataFrame:
+    """
+    Geocode the countries and continents and return their latitude and longitude. The
+    countries are also added under the country name in the address of their
+    location, the name used by the geocoder for the country of a place.
+
+    :param names: Names of the countries and continents.
+    :param geocoder: Function to geocode a place name with.
+    :param concurrency: Maximum number of places geocoded at the same time.
+    """
+    rows = {}
+    for name, location in resolve_locations(names, geocoder, concurrency).items():
+        if not location:
+            continue
+
+        point = (location.latitude, location.longitude)
+        rows[name] = point
+
+        country = location.raw.get("address", {}).get("country")
+        if country:
+            rows.setdefault(country, point)
+
+    return pd.DataFrame(
+        [(name, lat, lon) for name, (lat, lon) in rows.items()],
+        columns=[_s.FEATURE_GEO_PLACE, _s.FEATURE_GEO_LAT, _s.FEATURE_GEO_LON],
+    )
+
+
+def get_location(
+    name: str, gazetteer: Optional[Path] = None, fallback: bool = _s.GEOCODER_FALLBACK
+) -> Optional[Location]:
+    """
+    Geolocate a place name with the gazetteer, when given, falling back to the
+    OpenStreetMap Nominatim service.
+
+    :param name: The name of the location to geolocate.
+    :param gazetteer: Path to the gazetteer to geocode with, instead of Nominatim.
+    :param fallback: Wether to geocode the places not found in the gazetteer with
+        Nominatim.
+    """
+    if gazetteer:
+        location = gz.geocode(name, gazetteer)
+        if location or not fallback:
+            return location
+
+    return geocode(name)
+
+
 @_s.memory.cache
 def geocode(name: str) -> Optional[Location]:
     """
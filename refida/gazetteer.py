@@ -0,0 +1,193 @@
+import csv
+import sqlite3
+import sys
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional
+
+from geopy.location import Location
+
+import settings as _s
+from refida.canonical import normalise
+
+# columns of the GeoNames dumps, http://download.geonames.org/export/dump/readme.txt
+GEONAMES_ID = 0
+GEONAMES_NAME = 1
+GEONAMES_ASCII_NAME = 2
+GEONAMES_ALTERNATE_NAMES = 3
+GEONAMES_LAT = 4
+GEONAMES_LON = 5
+GEONAMES_FEATURE_CLASS = 6
+GEONAMES_FEATURE_CODE = 7
+GEONAMES_COUNTRY_CODE = 8
+GEONAMES_ADMIN1_CODE = 10
+GEONAMES_POPULATION = 14
+
+
+def build(
+    path: Path,
+    places: list[Path],
+    countries: Path,
+    admin1: Path,
+    feature_classes: list[str] = _s.GAZETTEER_FEATURE_CLASSES,
+) -> int:
+    """
+    Build the gazetteer, an SQLite database of places indexed by their normalised
+    names and alternate names, from GeoNames dumps. Returns the number of places.
+
+    :param path: Path to the gazetteer database, it is overwritten.
+    :param places: GeoNames places dumps, for example `cities15000.txt` and
+        `allCountries.txt` or the dumps of some countries.
+    :param countries: GeoNames `countryInfo.txt`.
+    :param admin1: GeoNames `admin1CodesASCII.txt`.
+    :param feature_classes: GeoNames feature classes of the places to include.
+    """
+    path.unlink(missing_ok=True)
+
+    with closing(sqlite3.connect(path)) as con, con:
+        con.executescript(
+            """
+            CREATE TABLE places (
+                id INTEGER PRIMARY KEY, name TEXT, lat REAL, lon REAL,
+                feature_class TEXT, feature_code TEXT, country_code TEXT,
+                admin1_code TEXT, population INTEGER
+            );
+            CREATE TABLE names (name TEXT, id INTEGER, UNIQUE (name, id));
+            CREATE TABLE countries (code TEXT PRIMARY KEY, name TEXT);
+            CREATE TABLE admin1 (code TEXT PRIMARY KEY, name TEXT);
+            """
+        )
+
+        con.executemany(
+            "INSERT OR REPLACE INTO countries VALUES (?, ?)",
+            ((row[0], row[4]) for row in read_geonames(countries)),
+        )
+        con.executemany(
+            "INSERT OR REPLACE INTO admin1 VALUES (?, ?)",
+            ((row[0], row[1]) for row in read_geonames(admin1)),
+        )
+
+        n_places = 0
+        for dump in places:
+            for row in read_geonames(dump):
+                if row[GEONAMES_FEATURE_CLASS] not in feature_classes:
+                    continue
+
+                con.execute(
+                    "INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        int(row[GEONAMES_ID]),
+                        row[GEONAMES_NAME],
+                        float(row[GEONAMES_LAT]),
+                        float(row[GEONAMES_LON]),
+                        row[GEONAMES_FEATURE_CLASS],
+                        row[GEONAMES_FEATURE_CODE],
+                        row[GEONAMES_COUNTRY_CODE],
+                        row[GEONAMES_ADMIN1_CODE],
+                        int(row[GEONAMES_POPULATION] or 0),
+                    ),
+                )
+                con.executemany(
+                    "INSERT OR IGNORE INTO names VALUES (?, ?)",
+                    ((name, int(row[GEONAMES_ID])) for name in get_names(row)),
+                )
+                n_places += 1
+
+        con.execute("CREATE INDEX names_name ON names (name)")
+
+    return n_places
+
+
+def read_geonames(path: Path) -> Iterator[list[str]]:
+    """
+    Read the rows of a tab separated GeoNames file, skipping the comments.
+
+    :param path: Path to the GeoNames file.
+    """
+    csv.field_size_limit(sys.maxsize)
+
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if row and not row[0].startswith("#"):
+                yield row
+
+
+def get_names(row: list[str]) -> set[str]:
+    """
+    Return the normalised name, ascii name and alternate names of a GeoNames place.
+
+    :param row: Row of a GeoNames places dump.
+    """
+    names = [row[GEONAMES_NAME], row[GEONAMES_ASCII_NAME]]
+    names.extend(row[GEONAMES_ALTERNATE_NAMES].split(","))
+
+    return {normalised for name in names if (normalised := normalise(name))}
+
+
+@lru_cache(maxsize=4)
+def get_connection(path: Path) -> sqlite3.Connection:
+    """
+    Open, once, a read only connection to the gazetteer.
+
+    :param path: Path to the gazetteer database.
+    """
+    return sqlite3.connect(
+        f"file:{path.resolve()}?mode=ro", uri=True, check_same_thread=False
+    )
+
+
+def geocode(name: str, path: Path) -> Optional[Location]:
+    """
+    Geolocate a place name using the gazetteer. When several places have the name,
+    countries are preferred and then the places with the largest population. The raw
+    data of the location follows the format of the OpenStreetMap Nominatim service.
+
+    :param name: The name of the location to geolocate.
+    :param path: Path to the gazetteer database.
+    """
+    row = (
+        get_connection(path)
+        .execute(
+            """
+            SELECT p.name, p.lat, p.lon, p.feature_class, p.feature_code,
+                   c.name, a.name
+            FROM names n
+            JOIN places p ON p.id = n.id
+            LEFT JOIN countries c ON c.code = p.country_code
+            LEFT JOIN admin1 a ON a.code = p.country_code || '.' || p.admin1_code
+            WHERE n.name = ?
+            ORDER BY p.feature_code LIKE 'PCL%' DESC, p.population DESC
+            LIMIT 1
+            """,
+            (normalise(name),),
+        )
+        .fetchone()
+    )
+    if row is None:
+        return None
+
+    place, lat, lon, feature_class, feature_code, country, state = row
+
+    address = {}
+    if feature_class == "P":
+        address["city"] = place
+    if state and feature_class != "L" and not feature_code.startswith("PCL"):
+        address["state"] = state
+    if country and feature_class != "L":
+        address["country"] = country
+
+    display_name = ", ".join(
+        dict.fromkeys(
+            [place] + [address[key] for key in ("state", "country") if key in address]
+        )
+    )
+    raw = dict(
+        display_name=display_name,
+        lat=str(lat),
+        lon=str(lon),
+        address=address,
+        geojson=dict(type="Point", coordinates=[lon, lat]),
+    )
+
+    return Location(display_name, (lat, lon), raw)
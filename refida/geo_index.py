@@ -0,0 +1,270 @@
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import settings as _s
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+
+def build(geo: pd.DataFrame, cell_size: float = _s.GEO_INDEX_CELL_SIZE) -> dict:
+    """
+    Build a grid spatial index over the points of the geolocated entities. The points
+    are assigned to cells of `cell_size` degrees and sorted by cell, so that the points
+    of a cell are found with a binary search.
+
+    :param geo: Geolocated entities, with id, lat and lon columns.
+    :param cell_size: Size of the cells of the grid, in degrees.
+    """
+    points = geo[[_s.FIELD_ID, _s.FEATURE_GEO_LAT, _s.FEATURE_GEO_LON]]
+    points = points.dropna().drop_duplicates()
+
+    lat = points[_s.FEATURE_GEO_LAT].to_numpy(dtype=np.float64)
+    lon = points[_s.FEATURE_GEO_LON].to_numpy(dtype=np.float64)
+    keys = get_cell_keys(lat, lon, cell_size)
+    order = np.argsort(keys, kind="stable")
+
+    return dict(
+        keys=keys[order],
+        lat=lat[order],
+        lon=lon[order],
+        ids=points[_s.FIELD_ID].to_numpy(dtype=str)[order],
+        cell_size=cell_size,
+    )
+
+
+def save(path: Path, index: dict):
+    """
+    Save the spatial index in a compressed numpy archive.
+
+    :param path: Path to the archive.
+    :param index: Spatial index, see `build`.
+    """
+    np.savez_compressed(path, **index)
+
+
+def load(path: Path) -> Optional[dict]:
+    """
+    Load a spatial index saved with `save`, returns None if it does not exist.
+
+    :param path: Path to the archive.
+    """
+    try:
+        with np.load(path) as archive:
+            index = {key: archive[key] for key in archive.files}
+    except FileNotFoundError:
+        return None
+
+    index["cell_size"] = float(index["cell_size"])
+
+    return index
+
+
+def get_grid_shape(cell_size: float) -> tuple[int, int]:
+    """
+    Return the number of rows, of latitude, and columns, of longitude, of the grid.
+
+    :param cell_size: Size of the cells of the grid, in degrees.
+    """
+    return int(np.ceil(180 / cell_size)), int(np.ceil(360 / cell_size))
+
+
+def get_cell_keys(lat: np.ndarray, lon: np.ndarray, cell_size: float) -> np.ndarray:
+    """
+    Return the key of the grid cell of each point.
+
+    :param lat: Latitudes of the points.
+    :param lon: Longitudes of the points.
+    :param cell_size: Size of the cells of the grid, in degrees.
+    """
+    n_rows, n_cols = get_grid_shape(cell_size)
+    rows = np.clip(np.floor((lat + 90) / cell_size), 0, n_rows - 1).astype(np.int64)
+    cols = np.floor((lon + 180) / cell_size).astype(np.int64) % n_cols
+
+    return rows * n_cols + cols
+
+
+def query_bbox(
+    index: dict, south: float, west: float, north: float, east: float
+) -> np.ndarray:
+    """
+    Return the positions, in the index, of the points inside the bounding box. The box
+    crosses the antimeridian when `west` is greater than `east`.
+
+    :param index: Spatial index, see `build`.
+    :param south: Minimum latitude.
+    :param west: Minimum longitude.
+    :param north: Maximum latitude.
+    :param east: Maximum longitude.
+    """
+    cell_size = index["cell_size"]
+    n_rows, n_cols = get_grid_shape(cell_size)
+
+    row_start, row_end = [
+        int(np.clip(np.floor((lat + 90) / cell_size), 0, n_rows - 1))
+        for lat in (south, north)
+    ]
+    col_start = int(np.floor((west + 180) / cell_size))
+    col_end = int(np.floor((east + 180) / cell_size))
+    if west > east:
+        col_end += n_cols
+    cols = np.arange(col_start, min(col_end, col_start + n_cols - 1) + 1) % n_cols
+
+    cells = (np.arange(row_start, row_end + 1)[:, None] * n_cols + cols).ravel()
+    starts = np.searchsorted(index["keys"], cells, side="left")
+    ends = np.searchsorted(index["keys"], cells, side="right")
+
+    positions = np.concatenate(
+        [np.arange(start, end) for start, end in zip(starts, ends) if end > start]
+        or [np.empty(0, dtype=np.int64)]
+    )
+
+    lat, lon = index["lat"][positions], index["lon"][positions]
+    inside = (lat >= south) & (lat <= north)
+    if west > east:
+        inside &= (lon >= west) | (lon <= east)
+    else:
+        inside &= (lon >= west) & (lon <= east)
+
+    return positions[inside]
+
+
+def query_radius(index: dict, lat: float, lon: float, radius: float) -> set[str]:
+    """
+    Return the ids of the documents with points within `radius` km of a point.
+
+    :param index: Spatial index, see `build`.
+    :param lat: Latitude of the centre.
+    :param lon: Longitude of the centre.
+    :param radius: Radius in km.
+    """
+    lat_delta = radius / KM_PER_DEGREE
+    south, north = max(lat - lat_delta, -90.0), min(lat + lat_delta, 90.0)
+
+    # the widest longitude span of a circle is not at its centre latitude
+    ratio = np.sin(np.radians(min(lat_delta, 90.0))) / np.cos(np.radians(lat))
+    if south <= -90 or north >= 90 or ratio >= 1:
+        west, east = -180.0, 180.0
+    else:
+        lon_delta = np.degrees(np.arcsin(ratio))
+        west = (lon - lon_delta + 180) % 360 - 180
+        east = (lon + lon_delta + 180) % 360 - 180
+
+    positions = query_bbox(index, south, west, north, east)
+    distances = haversine(lat, lon, index["lat"][positions], index["lon"][positions])
+
+    return set(index["ids"][positions[distances <= radius]].tolist())
+
+
+def haversine(
+    lat: float, lon: float, lats: np.ndarray, lons: np.ndarray
+) -> np.ndarray:
+    """
+    Great circle distance, in km, between a point and an array of points.
+
+    :param lat: Latitude of the point.
+    :param lon: Longitude of the point.
+    :param lats: Latitudes of the points.
+    :param lons: Longitudes of the points.
+    """
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = (
+        np.sin((lats - lat) / 2) ** 2
+        + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    )
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def build_bins(
+    geo: pd.DataFrame, resolutions: list[float] = list(_s.GEO_BIN_RESOLUTIONS)
+) -> pd.DataFrame:
+    """
+    Precompute, for each resolution, the grid bin of the points of the places plotted
+    on the map. Returns a table with the place lat and lon, the resolution and the
+    lat and lon of the centre of the bin.
+
+    :param geo: Geolocated entities, with place lat and place lon columns.
+    :param resolutions: Size of the bins of each resolution, in degrees.
+    """
+    points = geo[[_s.FEATURE_GEO_PLACE_LAT, _s.FEATURE_GEO_PLACE_LON]]
+    points = points.dropna().drop_duplicates()
+
+    lat = points[_s.FEATURE_GEO_PLACE_LAT].to_numpy(dtype=np.float64)
+    lon = points[_s.FEATURE_GEO_PLACE_LON].to_numpy(dtype=np.float64)
+
+    bins = []
+    for resolution in resolutions:
+        bin_lat, bin_lon = get_bin_centres(lat, lon, resolution)
+        bins.append(
+            pd.DataFrame(
+                {
+                    _s.FEATURE_GEO_PLACE_LAT: lat,
+                    _s.FEATURE_GEO_PLACE_LON: lon,
+                    _s.FEATURE_GEO_BIN_RESOLUTION: resolution,
+                    _s.FEATURE_GEO_BIN_LAT: bin_lat,
+                    _s.FEATURE_GEO_BIN_LON: bin_lon,
+                }
+            )
+        )
+
+    return pd.concat(bins, ignore_index=True)
+
+
+def get_bin_centres(
+    lat: np.ndarray, lon: np.ndarray, cell_size: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return the lat and lon of the centre of the grid cell of each point.
+
+    :param lat: Latitudes of the points.
+    :param lon: Longitudes of the points.
+    :param cell_size: Size of the cells of the grid, in degrees.
+    """
+    n_rows, n_cols = get_grid_shape(cell_size)
+    keys = get_cell_keys(lat, lon, cell_size)
+    rows, cols = keys // n_cols, keys % n_cols
+
+    return (
+        np.minimum((rows + 0.5) * cell_size - 90, 90.0),
+        np.minimum((cols + 0.5) * cell_size - 180, 180.0),
+    )
+
+
+def aggregate_bins(
+    places: pd.DataFrame, bins: pd.DataFrame, resolution: float
+) -> pd.DataFrame:
+    """
+    Aggregate the places into the precomputed bins of a resolution. Returns one row per
+    bin, with the number of mentions, the number of places and a label naming the place
+    with the most mentions.
+
+    :param places: Places data, with place, place lat, place lon and count columns.
+    :param bins: Bins of the places, see `build_bins`.
+    :param resolution: Size of the bins, in degrees, one of the resolutions of `bins`.
+    """
+    columns = [_s.FEATURE_GEO_PLACE_LAT, _s.FEATURE_GEO_PLACE_LON]
+    bins = bins[bins[_s.FEATURE_GEO_BIN_RESOLUTION] == resolution]
+    bins = bins.drop_duplicates(subset=columns)
+
+    data = places.merge(bins, on=columns, how="inner")
+    data = data.sort_values(by="count", ascending=False)
+
+    data = (
+        data.groupby([_s.FEATURE_GEO_BIN_LAT, _s.FEATURE_GEO_BIN_LON])
+        .agg(
+            place=(_s.FEATURE_GEO_PLACE, "first"),
+            places=(_s.FEATURE_GEO_PLACE, "nunique"),
+            count=("count", "sum"),
+        )
+        .reset_index()
+    )
+    data[_s.FEATURE_GEO_BIN_LABEL] = [
+        place if n_places == 1 else f"{place} and {n_places - 1} more"
+        for place, n_places in zip(data["place"], data["places"])
+    ]
+
+    return data.drop(columns=["place"]).sort_values(by="count", ascending=False)
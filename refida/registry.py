@@ -0,0 +1,206 @@
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import nltk
+import spacy
+from spacy.language import Language
+from txtai.embeddings import Embeddings
+from txtai.pipeline import Labels, Segmentation, Summary
+
+import settings as _s
+from refida import bundle
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Process wide registry of the models and pipelines, keyed by kind, name and options.
+    The models are loaded lazily, on first use, and shared by all the callers. When the
+    estimated memory of the loaded models exceeds the budget, the least recently used
+    models are evicted.
+
+    The getters below load the models from the bundle of models, see `refida.bundle`,
+    when the model is bundled, and by name otherwise.
+    """
+
+    def __init__(self, budget: int = _s.MODELS_MEMORY_BUDGET):
+        """
+        :param budget: Memory budget for the loaded models, in MB.
+        """
+        self.budget = budget * 2**20
+        self.models: OrderedDict[tuple, tuple[Any, int]] = OrderedDict()
+        self.timings: dict[tuple, float] = {}
+        self.lock = threading.RLock()
+
+    def get(self, kind: str, name: str, loader: Callable[[], Any], **options) -> Any:
+        """
+        Return the model, loading it with the loader if it is not loaded.
+
+        :param kind: Kind of model, for example `labels` or `spacy`.
+        :param name: Name, or path, of the model.
+        :param loader: Function that loads the model.
+        :param options: Options the model is loaded with, part of the key.
+        """
+        key = (kind, name, tuple(sorted(options.items())))
+
+        with self.lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+                return self.models[key][0]
+
+            rss = get_rss()
+            start = time.perf_counter()
+            model = loader()
+            self.timings[key] = time.perf_counter() - start
+
+            self.models[key] = (model, max(get_rss() - rss, 0))
+            logger.info(f"Loaded {kind} {name} in {self.timings[key]:.1f}s")
+
+            self.evict(key)
+
+            return model
+
+    def evict(self, keep: tuple):
+        """
+        Evict the least recently used models until the loaded models fit the budget.
+
+        :param keep: Key of the model to keep loaded.
+        """
+        while self.get_memory() > self.budget and len(self.models) > 1:
+            key = next(key for key in self.models if key != keep)
+            del self.models[key]
+            logger.info(f"Evicted {key[0]} {key[1]}")
+
+        gc.collect()
+
+    def get_memory(self) -> int:
+        """
+        Return the estimated memory of the loaded models, in bytes.
+        """
+        return sum(memory for _, memory in self.models.values())
+
+    def clear(self):
+        """
+        Unload all the models.
+        """
+        with self.lock:
+            self.models.clear()
+            gc.collect()
+
+    def report(self) -> list[dict]:
+        """
+        Return the kind, name, options, load time, in seconds, estimated memory, in MB,
+        and whether it is still loaded, of each model loaded by the registry.
+        """
+        report = []
+        for key, seconds in self.timings.items():
+            kind, name, options = key
+            loaded = key in self.models
+            report.append(
+                dict(
+                    kind=kind,
+                    name=name,
+                    options=dict(options),
+                    seconds=round(seconds, 2),
+                    memory=round(self.models[key][1] / 2**20) if loaded else 0,
+                    loaded=loaded,
+                )
+            )
+
+        return report
+
+
+def get_rss() -> int:
+    """
+    Return the resident memory of the process, in bytes, or 0 when it is not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+registry = ModelRegistry()
+
+
+def get_labels(model: str = _s.TOPIC_CLASSIFICATION_MODEL) -> Labels:
+    """
+    Return the txtai.Labels zero shot classification pipeline.
+
+    :param model: Name of the zero shot classification model.
+    """
+    return registry.get(
+        "labels", model, lambda: Labels(bundle.resolve("transformers", model))
+    )
+
+
+def get_summary(
+    model: str = _s.SUMMARISATION_MODEL, quantize: bool = _s.SUMMARISATION_QUANTIZE
+) -> Summary:
+    """
+    Return the txtai.Summary pipeline.
+
+    :param model: Name of the summary model.
+    :param quantize: Wether to use a dynamically quantised, int8, model on CPU.
+    """
+    return registry.get(
+        "summary",
+        model,
+        lambda: Summary(bundle.resolve("transformers", model), quantize=quantize),
+        quantize=quantize,
+    )
+
+
+def get_embeddings(model: str = _s.SEARCH_TRANSFORMER) -> Embeddings:
+    """
+    Return txtai.Embeddings to compute sentence embeddings, not to build an index.
+
+    :param model: Name of the sentence embeddings model.
+    """
+    return registry.get(
+        "embeddings",
+        model,
+        lambda: Embeddings({"path": bundle.resolve("transformers", model)}),
+    )
+
+
+def get_segmentation() -> Segmentation:
+    """
+    Return the txtai.Segmentation pipeline that splits texts into sentences.
+    """
+
+    def load() -> Segmentation:
+        for name in _s.MODELS_BUNDLE_NLTK:
+            path = bundle.resolve("nltk", name)
+            if path != name and path not in nltk.data.path:
+                nltk.data.path.insert(0, path)
+
+        return Segmentation(sentences=True)
+
+    return registry.get("segmentation", "sentences", load)
+
+
+def get_spacy(
+    model: str = _s.SPACY_LANGUAGE_MODEL, disable: Optional[list[str]] = None
+) -> Language:
+    """
+    Return the spaCy language model.
+
+    :param model: Name of the spaCy language model.
+    :param disable: Components of the language model to disable.
+    """
+    disable = tuple(disable or [])
+
+    return registry.get(
+        "spacy",
+        model,
+        lambda: spacy.load(bundle.resolve("spacy", model), disable=list(disable)),
+        disable=disable,
+    )
@@ -4,10 +4,11 @@ import tempfile
 import numpy as np
 from txtai.database import SQLError
 from txtai.embeddings.transform import Action
-from txtai.pipeline import Segmentation
 import settings
 from txtai.embeddings import Embeddings, Transform
-from refida.data import get_data_path
+from refida import bundle
+from refida import sentences as sm
+from refida.data import get_data_path, get_sentences_data
 import re
 
 DUMMYDOCID = "FIRSTDOC"
@@ -22,7 +23,8 @@ class SemIndexDoc:
             session_state = {}
         self.session_state = session_state
         self.datadir = datadir
-        self.segmenter = Segmentation(sentences=True)
+        # column of the indexed texts, set when reindexing
+        self.search_column = settings.SEARCH_COLUMN
         self.set_highlight_format()
 
     def search_docs(self, phrase, limit=None, min_score=settings.SEARCH_MIN_SCORE):
@@ -61,6 +63,7 @@ class SemIndexDoc:
 
     def reindex(self, dataframe, search_column, progressbar=None):
 
+        self.search_column = search_column
         self.reset_embeddings()
 
         for r in dataframe.itertuples(False):
@@ -132,7 +135,7 @@ class SemIndexDoc:
     def reset_embeddings(self) -> Embeddings:
         self.embeddings = Embeddings(
             {
-                "path": settings.SEARCH_TRANSFORMER,
+                "path": bundle.resolve("transformers", settings.SEARCH_TRANSFORMER),
                 # to enable text & metadata storage (i.e. 'documents' sqlite file)
                 "content": True,
             }
@@ -186,7 +189,9 @@ class SemIndexDoc:
         phrase = self.clean_search_phrase(phrase)
 
         if settings.SEARCH_EXPLAIN_STRATEGY == 2:
-            sents = [s for s in self.segmenter(hit["text"]) if len(s) > 4]
+            sents = [
+                s for s in self.get_sentences(hit["id"], hit["text"]) if len(s) > 4
+            ]
             highlights = [
                 [sents[sim[0]], sim[1]]
                 for sim in self.load_embeddings().similarity(phrase, sents)
@@ -222,6 +227,18 @@ class SemIndexDoc:
 
         return ret
 
+    def get_sentences(self, docid, text):
+        """Sentences of the text, from the offsets in the sentence table if any."""
+        state_name = "sentences_" + self.search_column
+        offsets = self.session_state.get(state_name, None)
+        if offsets is None:
+            offsets = sm.get_offsets_by_id(
+                get_sentences_data(self.search_column, self.datadir)
+            )
+            self.session_state[state_name] = offsets
+
+        return sm.split(text, offsets.get(str(docid)))
+
     def get_info(self):
         index = self.load_embeddings()
         config = index.config.copy()
@@ -285,7 +302,7 @@ class SemIndexSent(SemIndexDoc):
         # index sentences
         embeddings = []
 
-        sents = self.segmenter(text)
+        sents = self.get_sentences(row.id, text)
         for sent in sents:
             self.sent_idx += 1
             embeddings.append(
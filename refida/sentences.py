@@ -0,0 +1,211 @@
+from math import ceil
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+import settings as _s
+from refida import registry
+
+COLUMNS = [
+    _s.FEATURE_SENTENCE_ID,
+    _s.FIELD_ID,
+    _s.FEATURE_SENTENCE_SECTION,
+    _s.FEATURE_SENTENCE_START,
+    _s.FEATURE_SENTENCE_END,
+]
+
+
+def sentences_table(
+    data: pd.DataFrame, sections: list[str] = _s.SENTENCES_SECTIONS
+) -> pd.DataFrame:
+    """
+    Split the sections of the data into sentences. Returns the sentence table, with
+    one row per sentence: the sentence id, see `get_sentence_id`, the document id, the
+    section and the character offsets, start and end, of the sentence in the section.
+
+    :param data: DataFrame with id and section columns.
+    :param sections: Sections to split, the sections not in the data are skipped.
+    """
+    rows = []
+    for section in sections:
+        if section not in data.columns:
+            continue
+
+        section_data = data[[_s.FIELD_ID, section]].dropna()
+        offsets = segment(section_data[section].astype(str).values.tolist())
+
+        for doc_id, doc_offsets in zip(section_data[_s.FIELD_ID], offsets):
+            for position, (start, end) in enumerate(doc_offsets):
+                sentence_id = get_sentence_id(doc_id, section, position)
+                rows.append((sentence_id, doc_id, section, start, end))
+
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def stream_sentences(
+    batches: Iterable[pd.DataFrame],
+    sections: list[str] = _s.SENTENCES_SECTIONS,
+    n_jobs: int = _s.SENTENCES_N_JOBS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Split batches of documents into sentences, with the documents of a batch split in
+    parallel. Yields the sentence table of each batch, see `sentences_table`.
+
+    :param batches: Batches of the data, with id and section columns.
+    :param sections: Sections to split.
+    :param n_jobs: Number of processes, each loads the segmentation pipeline once.
+    """
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for batch in batches:
+            size = max(ceil(len(batch) / n_jobs), 1)
+            parts = batch.groupby(np.arange(len(batch)) // size)
+            tables = parallel(
+                delayed(sentences_table)(part, sections) for _, part in parts
+            )
+
+            yield pd.concat(tables, ignore_index=True)
+
+
+def segment(texts: list[str]) -> list[list[tuple[int, int]]]:
+    """
+    Split the texts into sentences, with the segmentation pipeline, and return the
+    character offsets, start and end, of the sentences of each text.
+
+    :param texts: Texts to split.
+    """
+    segmentation = registry.get_segmentation()
+
+    return [get_offsets(text, segmentation(text)) for text in texts]
+
+
+def get_offsets(text: str, sentences: list[str]) -> list[tuple[int, int]]:
+    """
+    Return the character offsets of the sentences in the text. The segmentation
+    pipeline normalises the whitespace of the sentences, so the sentences are located
+    by their non whitespace characters, which are in the same order as in the text.
+
+    :param text: Text that was split.
+    :param sentences: Sentences of the text, in order.
+    """
+    positions = [idx for idx, char in enumerate(text) if not char.isspace()]
+
+    offsets = []
+    cursor = 0
+    for sentence in sentences:
+        n_chars = sum(not char.isspace() for char in sentence)
+        if not n_chars:
+            continue
+
+        offsets.append((positions[cursor], positions[cursor + n_chars - 1] + 1))
+        cursor += n_chars
+
+    return offsets
+
+
+def get_sentence_id(doc_id: Union[int, str], section: str, position: int) -> str:
+    """
+    Return the id of a sentence, stable as long as the text of the section does not
+    change.
+
+    :param doc_id: Id of the document.
+    :param section: Section of the document.
+    :param position: Position of the sentence in the section.
+    """
+    return f"{doc_id}:{section}:{position}"
+
+
+def is_aligned(text: str, offsets: list[tuple[int, int]]) -> bool:
+    """
+    Wether the offsets still match the sentence boundaries of the text, they do not
+    when the text changed after the sentence table was built.
+
+    :param text: Text of the section.
+    :param offsets: Character offsets of the sentences of the text.
+    """
+    if not offsets:
+        return not text.strip()
+
+    last = offsets[-1][1]
+    if last > len(text) or text[last:].strip():
+        return False
+
+    return all(
+        start < end and not text[start].isspace() and not text[end - 1].isspace()
+        for start, end in offsets
+    )
+
+
+def split(text: str, offsets: Optional[list[tuple[int, int]]] = None) -> list[str]:
+    """
+    Return the sentences of the text, with their whitespace normalised as the
+    segmentation pipeline does. The sentences are sliced from the offsets, when they
+    are aligned with the text, otherwise the text is segmented.
+
+    :param text: Text to split.
+    :param offsets: Character offsets of the sentences, from the sentence table.
+    """
+    if offsets is None or not is_aligned(text, offsets):
+        offsets = segment([text])[0]
+
+    return [" ".join(text[start:end].split()) for start, end in offsets]
+
+
+def get_offsets_by_id(
+    table: Optional[pd.DataFrame]
+) -> dict[str, list[tuple[int, int]]]:
+    """
+    Return the offsets of the sentences of each document, keyed by the document id as
+    a string, in the sentence table of a section.
+
+    :param table: Sentence table of a section, see `refida.data.get_sentences_data`.
+    """
+    offsets = {}
+    if table is None:
+        return offsets
+
+    table = table.sort_values(by=[_s.FIELD_ID, _s.FEATURE_SENTENCE_START])
+    for doc_id, start, end in zip(
+        table[_s.FIELD_ID],
+        table[_s.FEATURE_SENTENCE_START],
+        table[_s.FEATURE_SENTENCE_END],
+    ):
+        offsets.setdefault(str(doc_id), []).append((int(start), int(end)))
+
+    return offsets
+
+
+def get_sentences(
+    data: pd.DataFrame,
+    column: str,
+    table: Optional[pd.DataFrame] = None,
+    section: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Return one row per sentence of the texts of the column, with the document id, the
+    sentence id and the sentence. The sentences are read from the sentence table, and
+    the texts missing from the table, or changed since, are segmented.
+
+    :param data: DataFrame with id and text columns.
+    :param column: Column with the texts.
+    :param table: Sentence table of the section of the texts.
+    :param section: Section of the texts, for the sentence ids, defaults to the
+        section of the table, or to the column.
+    """
+    if section is None:
+        section = column
+        if table is not None and len(table):
+            section = table[_s.FEATURE_SENTENCE_SECTION].iloc[0]
+
+    offsets = get_offsets_by_id(table)
+
+    rows = []
+    for doc_id, text in data[[_s.FIELD_ID, column]].dropna().values.tolist():
+        for position, sentence in enumerate(split(text, offsets.get(str(doc_id)))):
+            rows.append((doc_id, get_sentence_id(doc_id, section, position), sentence))
+
+    return pd.DataFrame(
+        rows,
+        columns=[_s.FIELD_ID, _s.FEATURE_SENTENCE_ID, _s.FEATURE_SENTENCE_TEXT],
+    )
@@ -1,5 +1,7 @@
+from html import escape
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -126,6 +128,7 @@ def scatter_mapbox(
     lon: str,
     facet: str,
     focus: tuple[float, float],
+    zoom: int = 1,
 ) -> go.Figure:
     """
     Generate a mapbox scatter plot.
@@ -135,6 +138,8 @@ def scatter_mapbox(
     :param lat: Latitude field.
     :param lon: Longitude field.
     :param facet: Field used for colour and size of the bubbles.
+    :param focus: Latitude and longitude of the centre of the map.
+    :param zoom: Initial zoom level of the map.
     """
     return px.scatter_mapbox(
         data,
@@ -143,8 +148,31 @@ def scatter_mapbox(
         lon=lon,
         size=facet,
         mapbox_style="carto-positron",
-        zoom=1,
+        zoom=zoom,
         center=dict(lat=focus[0], lon=focus[1]),
         opacity=0.75,
         height=700,
     ).update_layout(margin=dict(r=0, t=0, l=0, b=0))
+
+
+def attributions_html(tokens: np.ndarray, values: np.ndarray) -> str:
+    """
+    Generate HTML of the tokens of a text highlighted by their attribution, green for
+    positive and red for negative attributions.
+
+    :param tokens: Tokens of the text.
+    :param values: Attribution of each token.
+    """
+    values = values.astype(np.float64)
+    scale = np.abs(values).max() if len(values) else 0
+
+    spans = []
+    for token, value in zip(tokens, values):
+        colour = "0, 160, 0" if value > 0 else "220, 0, 0"
+        alpha = abs(value) / scale if scale else 0
+        spans.append(
+            f'<span style="background-color: rgba({colour}, {alpha:.2f});" '
+            f'title="{value:.3f}">{escape(token)}</span>'
+        )
+
+    return "".join(spans)
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of the topics long format assembly, comparing the vectorised builder
+with the previous apply/explode implementation.
+
+    poetry run python -m scripts.benchmark_long_format
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+import typer
+
+import settings as _s
+from refida.features import topics_long_format
+
+
+def explode_long_format(
+    data: pd.DataFrame,
+    predictions: list[list[tuple[int, float]]],
+    topics: list[str],
+    threshold: float = 0.0,
+) -> pd.DataFrame:
+    topics_df = data.copy()
+    topics_df["topics"] = predictions
+    topics_df["topics"] = topics_df["topics"].apply(
+        lambda predictions: [[topics[p[0]], p[1]] for p in predictions]
+    )
+    topics_df = topics_df.explode("topics")
+    topics_df[[_s.FEATURE_TOPIC_TOPIC, _s.FEATURE_TOPIC_SCORE]] = pd.DataFrame(
+        topics_df["topics"].tolist(), index=topics_df.index
+    )
+    topics_df = topics_df.drop(columns=["topics"])
+    topics_df = topics_df[topics_df[_s.FEATURE_TOPIC_SCORE] >= threshold]
+
+    return topics_df
+
+
+def main(rows: int = 100_000, repeat: int = 3, threshold: float = 0.5):
+    """
+    Run the benchmark.
+
+    :param rows: Number of classified texts.
+    :param repeat: Number of times to run each implementation.
+    :param threshold: Minimum score for the topics.
+    """
+    topics = _s.TOPIC_CLASSIFICATION_TOPICS
+    rng = np.random.default_rng(0)
+    scores = rng.random((rows, len(topics)))
+
+    data = pd.DataFrame({_s.FIELD_ID: [f"doc_{i // 20}" for i in range(rows)]})
+    predictions = [list(enumerate(row)) for row in scores.tolist()]
+
+    for name, builder in [
+        ("explode", explode_long_format),
+        ("vectorised", topics_long_format),
+    ]:
+        seconds = min(
+            timeit.repeat(
+                lambda: builder(data, predictions, topics, threshold),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        typer.echo(f"{name}: {seconds:.3f}s for {rows * len(topics)} predictions")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -51,9 +51,16 @@ FEATURE_TOPIC_SCORE = "score"
 
 FEATURE_SUMMARY = "summary"
 
+FEATURE_SENTENCE_ID = "sentence_id"
+FEATURE_SENTENCE_SECTION = "section"
+FEATURE_SENTENCE_START = "start"
+FEATURE_SENTENCE_END = "end"
+FEATURE_SENTENCE_TEXT = "sentence"
+
 FEATURE_ENTITY_ENTITY = "entity"
 FEATURE_ENTITY_LABEL = "label"
 FEATURE_ENTITY_TEXT = "text"
+FEATURE_ENTITY_CANONICAL = "canonical"
 
 FEATURE_GEO_DISPLAY_NAME = "display_name"
 FEATURE_GEO_LAT = "lat"
@@ -64,9 +71,35 @@ FEATURE_GEO_PLACE = "place"
 FEATURE_GEO_PLACE_LAT = "place_lat"
 FEATURE_GEO_PLACE_LON = "place_lon"
 FEATURE_GEO_GEOJSON = "geojson"
+FEATURE_GEO_BIN_RESOLUTION = "resolution"
+FEATURE_GEO_BIN_LAT = "bin_lat"
+FEATURE_GEO_BIN_LON = "bin_lon"
+FEATURE_GEO_BIN_LABEL = "bin_label"
 
 DEFAULT_FILTER_TOPICS_SCORE_THRESHOLD = 0.75
 
+# topics with a score lower than the floor are not stored in the topics matrix
+TOPICS_MATRIX_SCORE_FLOOR = 0.05
+
+# topics with a score lower than the threshold are not explained by `explain`
+EXPLAIN_THRESHOLD = DEFAULT_FILTER_TOPICS_SCORE_THRESHOLD
+# number of processes explaining the topics, each loads the classification model
+EXPLAIN_N_JOBS = 1
+# maximum number of forward passes, and approximate number of seconds, to explain a
+# text with sentence occlusion
+EXPLAIN_OCCLUSION_MAX_PASSES = 32
+EXPLAIN_OCCLUSION_TIME_BUDGET = 10.0
+
+# size, in degrees, of the cells of the spatial index of the geolocated entities
+GEO_INDEX_CELL_SIZE = 1.0
+# range and default, in km, of the radius of the map region filter
+FILTER_GEO_RADIUS_OPTIONS = [10, 2000]
+FILTER_GEO_RADIUS_DEFAULT = 100
+# size, in degrees, of the map bins of each resolution, and the map zoom level they
+# are shown at, the bins are precomputed by the `geolocate` command
+GEO_BIN_RESOLUTIONS: dict[float, int] = {10.0: 1, 5.0: 2, 2.0: 3, 1.0: 4, 0.5: 5}
+GEO_BIN_RESOLUTION_DEFAULT = 5.0
+
 # =====================================================================================
 # search module settings
 # which column we search on
@@ -193,8 +226,40 @@ def get_uoa_panel(uoa: int) -> Optional[str]:
 
 # =====================================================================================
 # features module settings
+# number of documents processed, and written, at a time by the cli
+FEATURES_BATCH_SIZE: int = 16
+# memory budget, in MB, of the models loaded by a process, the least recently used
+# models are unloaded when the budget is exceeded, see `refida.registry`
+MODELS_MEMORY_BUDGET: int = 8192
+# files of the Hugging Face models not copied into the bundle of models, the weights
+# of the frameworks other than PyTorch, see `refida.bundle`
+MODELS_BUNDLE_IGNORE: list[str] = ["*.h5", "*.msgpack", "*.ot", "*.onnx", "*.tflite"]
+# nltk resources copied into the bundle of models, punkt splits the sentences
+MODELS_BUNDLE_NLTK: list[str] = ["punkt"]
+# data directory of the bundle of models, the models are loaded from this bundle by
+# all the commands and the dashboard, whatever their data directory
+MODELS_BUNDLE_DATADIR: str = DATA_DIR.name
+
+# sections split into sentences, once, by the `sentences` command, for the areas, the
+# search index, the extractive summaries and the occlusion explanations
+SENTENCES_SECTIONS: list[str] = [DATA_SUMMARY, DATA_RESEARCH, DATA_DETAILS, DATA_TEXT]
+SENTENCES_N_JOBS: int = 1
+
 # model used for topic modelling
 TOPIC_CLASSIFICATION_MODEL: str = "joeddav/bart-large-mnli-yahoo-answers"
+# number of candidate topics, selected by sentence embeddings similarity, to score with
+# the topic classification model, 0 to score all the topics
+TOPIC_CLASSIFICATION_PREFILTER: int = 0
+TOPIC_CLASSIFICATION_PREFILTER_MODEL: str = SEARCH_TRANSFORMER
+# minimum score for a topic group to have its topics classified, when classifying
+# hierarchically
+TOPIC_CLASSIFICATION_GROUP_THRESHOLD: float = 0.5
+# distilled topic classification, trained on the output of the topic classification
+# model and used for fast classification
+TOPIC_CLASSIFICATION_DISTILL_MODEL: str = SEARCH_TRANSFORMER
+TOPIC_CLASSIFICATION_DISTILL_EPOCHS: int = 500
+TOPIC_CLASSIFICATION_DISTILL_LEARNING_RATE: float = 1.0
+TOPIC_CLASSIFICATION_DISTILL_L2: float = 1e-4
 # labels used for topic modelling
 TOPIC_CLASSIFICATION_TOPICS: list[str] = [
     "Cultural",
@@ -553,9 +618,45 @@ TOPIC_CLASSIFICATION_AREAS: list[str] = [
 
 # model used for summarisation
 SUMMARISATION_MODEL: str = "sshleifer/distilbart-cnn-12-6"
+# number of texts summarised at a time by the model, the texts are sorted by length
+SUMMARISATION_BATCH_SIZE: int = 8
+# dynamic int8 quantisation of the model, only applies when running on CPU
+SUMMARISATION_QUANTIZE: bool = False
+# generation options passed to the summarisation model, the default preset uses the
+# options from the model configuration
+SUMMARISATION_DECODING_PRESETS: dict[str, dict] = {
+    "default": {},
+    "greedy": {"num_beams": 1, "do_sample": False},
+    "beam": {"num_beams": 2, "early_stopping": True},
+}
+SUMMARISATION_DECODING: str = "default"
+# maximum number of tokens in the chunks of long texts, for chunked summarisation, the
+# model input is limited to 1024 tokens
+SUMMARISATION_CHUNK_TOKENS: int = 960
+# maximum number of times the joined summaries of the chunks are summarised again
+SUMMARISATION_CHUNK_ROUNDS: int = 3
+# sentence embeddings model, and number of sentences, used for extractive summaries
+SUMMARISATION_EXTRACTIVE_MODEL: str = SEARCH_TRANSFORMER
+SUMMARISATION_EXTRACTIVE_SENTENCES: int = 3
 
 # https://spacy.io/models
 SPACY_LANGUAGE_MODEL: str = "en_core_web_trf"
+# components not needed to extract entities, the transformer and ner are kept
+SPACY_DISABLED_COMPONENTS: list[str] = [
+    "tagger",
+    "parser",
+    "attribute_ruler",
+    "lemmatizer",
+]
+# number of texts, and of processes, used by `nlp.pipe`, use a single process with
+# transformer models on GPU
+SPACY_BATCH_SIZE: int = 32
+SPACY_N_PROCESS: int = 1
+# fast model used, in tiered entity extraction, to select the sentences processed by
+# SPACY_LANGUAGE_MODEL, the tagger and parser are needed for the proper nouns and the
+# sentences
+SPACY_FAST_LANGUAGE_MODEL: str = "en_core_web_sm"
+SPACY_FAST_DISABLED_COMPONENTS: list[str] = ["lemmatizer"]
 
 SPACY_EXTRA_STOP_WORDS: list[str] = ["Miss", "Mr", "Mrs", "Ms"]
 
@@ -567,9 +668,46 @@ SPACY_ENTITY_TYPES: list[str] = SPACY_LOCATION_ENTITY_TYPES + [
     "PRODUCT",
 ]
 
-
-nominatim = Nominatim(user_agent="kdl.kcl.ac.uk")
-geolocator = RateLimiter(nominatim.geocode, min_delay_seconds=1)
+# minimum similarity, between 0 and 1, for two spelling variants of an entity to be
+# canonicalised to the same entity
+ENTITY_CANONICAL_THRESHOLD: float = 0.9
+# blocks of variants sharing a key with more variants than this are not compared, the
+# key is too common to discriminate between entities
+ENTITY_CANONICAL_MAX_BLOCK: int = 200
+
+
+# Nominatim server, and minimum delay in seconds between requests, the public server
+# allows one request per second, use a self hosted server for faster geocoding
+NOMINATIM_DOMAIN: str = "nominatim.openstreetmap.org"
+NOMINATIM_SCHEME: str = "https"
+NOMINATIM_MIN_DELAY: float = 1.0
+# maximum number of places geocoded at the same time, increase it, and set the minimum
+# delay to 0, with a self hosted server
+GEOCODE_CONCURRENCY: int = 1
+
+nominatim = Nominatim(
+    user_agent="kdl.kcl.ac.uk", domain=NOMINATIM_DOMAIN, scheme=NOMINATIM_SCHEME
+)
+geolocator = RateLimiter(nominatim.geocode, min_delay_seconds=NOMINATIM_MIN_DELAY)
+
+# geocoder used to geolocate the places, nominatim or gazetteer, a local database built
+# from GeoNames dumps with the `gazetteer` command
+GEOCODER: str = "nominatim"
+# wether to use nominatim for the places not found in the gazetteer
+GEOCODER_FALLBACK: bool = True
+# GeoNames feature classes included in the gazetteer: countries, states and regions
+# (A), continents and areas (L), and cities and villages (P)
+GAZETTEER_FEATURE_CLASSES: list[str] = ["A", "L", "P"]
+# continents included in the centroids table, with the countries
+CONTINENTS: list[str] = [
+    "Africa",
+    "Antarctica",
+    "Asia",
+    "Europe",
+    "North America",
+    "Oceania",
+    "South America",
+]
 
 
 @lru_cache
@@ -677,6 +815,14 @@ to classify the data according to different perspectives:
     based on the list of outcomes/outputs used by the impact data collection tool
     adopted by UKRI [Researchfish](https://researchfish.com/).
 """  # noqa
+DASHBOARD_HELP_EXPLANATIONS: str = """
+Contribution of each word of the text to the topic score, precomputed with
+[SHAP](https://shap.readthedocs.io/) by the `explain` command. Words in green increase
+the score of the topic, words in red decrease it.
+
+The topics without a word explanation can be explained by sentence, with the drop of
+the topic score when each sentence is removed from the text, in a few seconds.
+"""
 DASHBOARD_HELP_TOPICS_AGGR_FUNCTION: str = """
 The data in this section can either be aggregated by count (to find out
 how many documents belong to a topic) or by average score (to find out how
@@ -718,6 +864,13 @@ returned
 DASHBOARD_HELP_SEARCH_LIMIT: str = """
 Maximum number of the matching documents displayed on the result page
 """
+DASHBOARD_HELP_GEO_RESOLUTION: str = """
+Size of the bins the places are grouped into on the map, smaller bins show more detail
+"""
+DASHBOARD_HELP_FILTER_GEO: str = """
+Only show the case studies that mention a location within the radius of the chosen
+place
+"""
 DASHBOARD_FOOTER: str = """
 <style>
 .footer {
@@ -1,6 +1,7 @@
 import base64
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
@@ -9,7 +10,11 @@ from st_aggrid import AgGrid, DataReturnMode, GridOptionsBuilder
 from st_aggrid.shared import GridUpdateMode
 
 import settings as _s
+from refida import canonical
 from refida import data as dm
+from refida import explain as xm
+from refida import geo_index
+from refida import sentences as sm
 from refida import visualize as vm
 from refida.__init__ import __version__
 from refida.search_index import LexicalIndexDoc, SemIndexDoc, SemIndexSent
@@ -150,6 +155,12 @@ def geo_sidebar():
         _s.SPACY_LOCATION_ENTITY_TYPES,
         default=_s.SPACY_LOCATION_ENTITY_TYPES,
     )
+    st.session_state.geo_resolution = st.select_slider(
+        "Map resolution (degrees)",
+        sorted(_s.GEO_BIN_RESOLUTIONS, reverse=True),
+        _s.GEO_BIN_RESOLUTION_DEFAULT,
+        help=_s.DASHBOARD_HELP_GEO_RESOLUTION,
+    )
 
 
 def filters_sidebar():
@@ -207,6 +218,22 @@ def filters_sidebar():
             "Fields of research", fields_of_research
         )
 
+    places = get_place_points()
+    expanded = bool(get_session_filter_geo_place())
+    with st.expander("Filter by map region", expanded=expanded):
+        st.session_state.filter_geo_place = st.selectbox(
+            "Place",
+            [""] + sorted(places),
+            help=_s.DASHBOARD_HELP_FILTER_GEO,
+        )
+        st.session_state.filter_geo_radius = st.slider(
+            "Radius (km)",
+            _s.FILTER_GEO_RADIUS_OPTIONS[0],
+            _s.FILTER_GEO_RADIUS_OPTIONS[1],
+            _s.FILTER_GEO_RADIUS_DEFAULT,
+            10,
+        )
+
     entities = get_entities([_s.DATA_SUMMARY, _s.DATA_DETAILS, _s.DATA_SOURCES])
     if entities is not None:
         entities = entities[_s.FEATURE_ENTITY_ENTITY]
@@ -254,7 +281,7 @@ def filter_data(data: pd.DataFrame) -> Optional[pd.DataFrame]:
         topics=get_session_filter_impact_categories(),
     )
     if get_session_filter_impact_categories() and impact_categories is not None:
-        data = data[data[_s.FIELD_ID].isin(impact_categories[_s.FIELD_ID])]
+        data = data[data[_s.FIELD_ID].astype(str).isin(impact_categories[_s.FIELD_ID])]
 
     outputs = get_topics(
         [_s.DATA_SUMMARY, _s.DATA_DETAILS],
@@ -262,7 +289,7 @@ def filter_data(data: pd.DataFrame) -> Optional[pd.DataFrame]:
         topics=get_session_filter_outputs(),
     )
     if get_session_filter_outputs() and outputs is not None:
-        data = data[data[_s.FIELD_ID].isin(outputs[_s.FIELD_ID])]
+        data = data[data[_s.FIELD_ID].astype(str).isin(outputs[_s.FIELD_ID])]
 
     fields_of_research = get_topics(
         [_s.DATA_RESEARCH],
@@ -270,7 +297,7 @@ def filter_data(data: pd.DataFrame) -> Optional[pd.DataFrame]:
         topics=get_session_filter_fields_of_research(),
     )
     if get_session_filter_fields_of_research() and fields_of_research is not None:
-        data = data[data[_s.FIELD_ID].isin(fields_of_research[_s.FIELD_ID])]
+        data = data[data[_s.FIELD_ID].astype(str).isin(fields_of_research[_s.FIELD_ID])]
 
     entities = get_entities(
         [_s.DATA_SUMMARY, _s.DATA_DETAILS, _s.DATA_SOURCES],
@@ -279,6 +306,13 @@ def filter_data(data: pd.DataFrame) -> Optional[pd.DataFrame]:
     if get_session_filter_entities() and entities is not None:
         data = data[data[_s.FIELD_ID].isin(entities[_s.FIELD_ID])]
 
+    place = get_session_filter_geo_place()
+    if place:
+        ids = get_ids_within_radius(
+            *get_place_points()[place], get_session_filter_geo_radius()
+        )
+        data = data[data[_s.FIELD_ID].astype(str).isin(ids)]
+
     text_search(data)
     data = filter_data_by_text_search(data)
 
@@ -315,6 +349,50 @@ def get_session_filter_entities() -> list[str]:
     return st.session_state.get("filter_entities", [])
 
 
+def get_session_filter_geo_place() -> str:
+    return st.session_state.get("filter_geo_place", "")
+
+
+def get_session_filter_geo_radius() -> int:
+    return st.session_state.get("filter_geo_radius", _s.FILTER_GEO_RADIUS_DEFAULT)
+
+
+@st.experimental_memo
+def get_place_points() -> dict[str, tuple[float, float]]:
+    points = {}
+
+    for section in _s.DATA_ENTITY_SECTIONS:
+        data = dm.get_geo_data(section)
+        if data is not None:
+            data = data[
+                [_s.FEATURE_GEO_DISPLAY_NAME, _s.FEATURE_GEO_LAT, _s.FEATURE_GEO_LON]
+            ].drop_duplicates(subset=_s.FEATURE_GEO_DISPLAY_NAME)
+            points.update(
+                {
+                    name: (lat, lon)
+                    for name, lat, lon in data.itertuples(index=False, name=None)
+                }
+            )
+
+    return points
+
+
+@st.experimental_memo
+def get_geo_index(section: str) -> Optional[dict]:
+    return dm.get_geo_index(section)
+
+
+def get_ids_within_radius(lat: float, lon: float, radius: float) -> set[str]:
+    ids = set()
+
+    for section in _s.DATA_ENTITY_SECTIONS:
+        index = get_geo_index(section)
+        if index is not None:
+            ids.update(geo_index.query_radius(index, lat, lon, radius))
+
+    return ids
+
+
 def get_data_grid(data: pd.DataFrame) -> dict:
     data = data[_s.DASHBOARD_COLUMNS_FOR_DATA_GRID]
     options = GridOptionsBuilder.from_dataframe(
@@ -598,12 +676,14 @@ def show_topics(
         aggr = _s.FEATURE_TOPIC_SCORE
 
     threshold = get_session_filter_topics_score_threshold()
-    topics = get_topics(sources, threshold, tuple(data[_s.FIELD_ID].values.tolist()))
+    topics = get_topics(
+        sources, threshold, tuple(data[_s.FIELD_ID].astype(str).values.tolist())
+    )
     if topics is None or topics.empty:
         st.warning("No topics found")
         return
 
-    topics = topics.merge(data, on=_s.FIELD_ID)
+    topics = topics.merge(data.astype({_s.FIELD_ID: str}), on=_s.FIELD_ID)
 
     topics[_s.DATA_UOA] = topics.apply(
         lambda x: f"{str(x[_s.DATA_UOA_N]).zfill(2)}: {x[_s.DATA_UOA]}", axis=1
@@ -689,6 +769,64 @@ def show_topics(
         use_container_width=True,
     )
 
+    if n_rows == 1:
+        show_topics_explanations(
+            data.iloc[0], sorted(topics[_s.FEATURE_TOPIC_TOPIC].unique()), sources
+        )
+
+
+def show_topics_explanations(doc: pd.Series, topics: list[str], sources: list[str]):
+    explanations = {}
+    for topic in topics:
+        for label in sources + [f"occlusion_{source}" for source in sources]:
+            store = get_explanations(label)
+            if store is not None:
+                explanation = dm.get_explanation(store, doc[_s.FIELD_ID], topic)
+                if explanation is not None:
+                    explanations[topic] = explanation
+                    break
+
+    missing = [topic for topic in topics if topic not in explanations]
+    texts = [
+        (source, doc[source]) for source in sources if isinstance(doc.get(source), str)
+    ]
+    if not explanations and not (missing and texts):
+        return
+
+    st.subheader("Explanations")
+    with st.expander("About explanations", expanded=False):
+        st.markdown(_s.DASHBOARD_HELP_EXPLANATIONS)
+
+    if missing and texts and st.button("Explain the other topics by sentence"):
+        source, text = texts[0]
+        offsets = get_sentence_offsets(source).get(str(doc[_s.FIELD_ID]))
+        tokens, values = explain_sentences(
+            tuple(sm.split(text, offsets)), tuple(missing)
+        )
+        explanations.update({topic: (tokens, values[topic]) for topic in missing})
+
+    for topic, (tokens, values) in sorted(explanations.items()):
+        with st.expander(topic, expanded=False):
+            st.write(vm.attributions_html(tokens, values), unsafe_allow_html=True)
+
+
+@st.experimental_singleton
+def get_explanations(label: str) -> Optional[dict]:
+    # shared, not copied on each rerun, the store is only read
+    return dm.get_explanations(label)
+
+
+@st.experimental_memo
+def get_sentence_offsets(section: str) -> dict[str, list[tuple[int, int]]]:
+    return sm.get_offsets_by_id(dm.get_sentences_data(section))
+
+
+@st.experimental_memo
+def explain_sentences(
+    sentences: tuple[str], topics: tuple[str]
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    return xm.sentence_occlusion(list(sentences), list(topics))
+
 
 def get_session_topics_aggr_function() -> str:
     return st.session_state.topics_aggr_function
@@ -704,18 +842,13 @@ def get_topics(
     data = pd.DataFrame()
 
     for section in sections:
-        section_df = dm.get_topics_data(section)
+        section_df = get_section_topics(section, threshold, topics)
         if section_df is not None:
             data = pd.concat([data, section_df], ignore_index=True)
 
     if data is not None:
         data = data.drop_duplicates()
         if len(data):
-            data = data[data[_s.FEATURE_TOPIC_SCORE] >= threshold]
-
-            if topics:
-                data = data[data[_s.FEATURE_TOPIC_TOPIC].isin(topics)]
-
             if ids:
                 return get_rows_by_id(data, ids)
 
@@ -724,6 +857,31 @@ def get_topics(
     return None
 
 
+def get_section_topics(
+    section: str, threshold: float = 0.0, topics: Optional[list[str]] = None
+) -> Optional[pd.DataFrame]:
+    # the ids are strings, as in the topics matrix, compare them to the ids of the
+    # data as strings
+    matrix = get_topics_matrix(section)
+    if matrix is not None and threshold >= matrix["floor"]:
+        return dm.query_topics_matrix(matrix, threshold, topics)
+
+    data = dm.get_topics_data(section)
+    if data is not None:
+        data = data[data[_s.FEATURE_TOPIC_SCORE] >= threshold]
+        data = data.astype({_s.FIELD_ID: str})
+
+        if topics:
+            data = data[data[_s.FEATURE_TOPIC_TOPIC].isin(topics)]
+
+    return data
+
+
+@st.experimental_memo
+def get_topics_matrix(section: str) -> Optional[dict]:
+    return dm.get_topics_matrix(section)
+
+
 def show_entities(
     title: str,
     data: pd.DataFrame,
@@ -778,6 +936,7 @@ def get_entities(
     for section in sections:
         section_df = dm.get_entities_data(section)
         if section_df is not None:
+            section_df = canonical.get_canonical_entities(section_df)
             data = pd.concat([data, section_df], ignore_index=True)
 
     if data is not None:
@@ -875,16 +1034,39 @@ def show_geo(data: pd.DataFrame):
     places = places.drop(columns=[_s.FEATURE_ENTITY_LABEL, _s.FEATURE_GEO_CATEGORY])
     places = places.groupby(places.columns[:-1].values.tolist()).sum().reset_index()
     places = places.sort_values(by="count", ascending=False)
-    focus = places.iloc[0]
     view_and_download_data("Places map", places)
+
+    # one marker per place when the places were not binned by the geolocate command,
+    # or when the bins are out of date
+    map_data = places
+    label, lat, lon = (
+        _s.FEATURE_GEO_PLACE,
+        _s.FEATURE_GEO_PLACE_LAT,
+        _s.FEATURE_GEO_PLACE_LON,
+    )
+    zoom = 1
+
+    bins = get_geo_bins()
+    if bins is not None:
+        resolution = get_session_geo_resolution()
+        bins = geo_index.aggregate_bins(places, bins, resolution)
+        if not bins.empty:
+            map_data = bins
+            label, lat, lon = (
+                _s.FEATURE_GEO_BIN_LABEL,
+                _s.FEATURE_GEO_BIN_LAT,
+                _s.FEATURE_GEO_BIN_LON,
+            )
+            zoom = _s.GEO_BIN_RESOLUTIONS[resolution]
+
+    if map_data.empty:
+        st.warning("No places to map")
+        return
+
+    focus = map_data.iloc[0]
     st.plotly_chart(
         vm.scatter_mapbox(
-            places,
-            _s.FEATURE_GEO_PLACE,
-            _s.FEATURE_GEO_PLACE_LAT,
-            _s.FEATURE_GEO_PLACE_LON,
-            "count",
-            (focus[_s.FEATURE_GEO_PLACE_LAT], focus[_s.FEATURE_GEO_PLACE_LON]),
+            map_data, label, lat, lon, "count", (focus[lat], focus[lon]), zoom
         ),
         use_container_width=True,
     )
@@ -898,6 +1080,20 @@ def get_session_geo_min_mentions() -> int:
     return st.session_state.geo_min_mentions
 
 
+def get_session_geo_resolution() -> float:
+    return st.session_state.geo_resolution
+
+
+@st.experimental_memo
+def get_geo_bins() -> Optional[pd.DataFrame]:
+    bins = [dm.get_geo_bins(section) for section in _s.DATA_ENTITY_SECTIONS]
+    bins = [section_bins for section_bins in bins if section_bins is not None]
+    if not bins:
+        return None
+
+    return pd.concat(bins).drop_duplicates()
+
+
 @st.experimental_memo
 def get_places(
     ids: tuple[str],
@@ -905,6 +1101,11 @@ def get_places(
     section: Optional[str] = None,
     state: bool = False,
 ) -> Optional[pd.DataFrame]:
+    if not section:
+        matrix = get_places_matrix()
+        if matrix is not None:
+            return dm.query_places_matrix(matrix, ids, entity_types, state)
+
     data = pd.DataFrame()
 
     if section:
@@ -946,6 +1147,11 @@ def get_places(
     return None
 
 
+@st.experimental_memo
+def get_places_matrix() -> Optional[dict]:
+    return dm.get_places_matrix()
+
+
 def text_search(data: pd.DataFrame):
     """Run a text search
     and sets st.session_state.search_hits = [
@@ -0,0 +1,56 @@
+import pytest
+
+from refida import bundle
+
+
+def snapshot_fake(name: str, path):
+    path.joinpath("config.json").write_text(f'{{"name": "{name}"}}')
+    path.joinpath("weights").mkdir()
+    path.joinpath("weights", "model.bin").write_bytes(b"weights")
+
+
+def test_bundle(tmp_path, monkeypatch):
+    monkeypatch.setitem(bundle.SNAPSHOTS, "transformers", snapshot_fake)
+
+    entry = bundle.snapshot(tmp_path, "transformers", "org/model")
+    assert entry["path"] == "transformers/org--model"
+    assert sorted(entry["files"]) == ["config.json", "weights/model.bin"]
+
+    bundle.save_manifest(tmp_path, [entry])
+    models = [("transformers", "org/model")]
+
+    assert bundle.verify(tmp_path, models) == []
+    assert bundle.verify(tmp_path, [("spacy", "missing")]) == [
+        "spacy missing: not bundled"
+    ]
+
+    assert bundle.resolve("transformers", "org/model", tmp_path) == str(
+        tmp_path / "transformers" / "org--model"
+    )
+    assert bundle.resolve("spacy", "missing", tmp_path) == "missing"
+
+    model_path = tmp_path / entry["path"]
+    model_path.joinpath("weights", "model.bin").write_bytes(b"changed")
+    model_path.joinpath("config.json").unlink()
+
+    assert bundle.verify(tmp_path, models) == [
+        "transformers org/model: config.json is missing",
+        "transformers org/model: weights/model.bin checksum mismatch",
+    ]
+
+
+def test_resolve_without_bundle(tmp_path):
+    assert bundle.resolve("transformers", "org/model", tmp_path) == "org/model"
+
+
+def test_snapshot_failed(tmp_path, monkeypatch):
+    def snapshot_missing(name: str, path):
+        path.joinpath("partial").write_text("")
+        raise OSError(f"model not found: {name}")
+
+    monkeypatch.setitem(bundle.SNAPSHOTS, "spacy", snapshot_missing)
+
+    with pytest.raises(OSError):
+        bundle.snapshot(tmp_path, "spacy", "missing")
+
+    assert not bundle.get_model_path(tmp_path, "spacy", "missing").exists()
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from refida import canonical
+
+
+def test_canonicalise():
+    entities = pd.DataFrame(
+        data=dict(
+            id=[1, 2, 3, 4, 5, 6],
+            label=["ORG", "ORG", "ORG", "ORG", "ORG", "GPE"],
+            text=[
+                "King's College London",
+                "KCL",
+                "Kings College London",
+                "King's College London",
+                "University of Leeds",
+                "KCL",
+            ],
+        )
+    )
+    entities["entity"] = entities["label"] + ": " + entities["text"]
+
+    canonicalised = canonical.canonicalise(entities)
+
+    assert canonicalised["text"].tolist() == entities["text"].tolist()
+    assert canonicalised["entity"].tolist() == entities["entity"].tolist()
+    assert canonicalised["canonical"].tolist()[:5] == [
+        "King's College London"
+    ] * 4 + ["University of Leeds"]
+    assert canonicalised["canonical"].iloc[5] == "KCL"
+    assert canonical.canonicalise(canonicalised).equals(canonicalised)
+
+    entities = canonical.get_canonical_entities(canonicalised)
+    assert entities["entity"].iloc[1] == "ORG: King's College London"
+
+    extracted = canonicalised.drop(columns="canonical")
+    assert canonical.get_canonical_entities(extracted).equals(extracted)
+
+
+def test_get_canonical_ambiguous_acronym():
+    counts = pd.Series(
+        [1, 1, 1], index=["UCL", "University College London", "Ucl Centre Leeds"]
+    )
+
+    assert canonical.get_canonical(counts)["UCL"] == "UCL"
+
+
+def test_get_groups():
+    assert canonical.get_groups(5, [(0, 1), (3, 4), (1, 4)]) == [[0, 1, 3, 4], [2]]
+
+
+def test_normalise():
+    assert canonical.normalise("The King’s  College, London") == "kings college london"
+    assert canonical.get_acronym("King's College London") == "KCL"
+    assert canonical.get_acronym("NHS") == "NHS"
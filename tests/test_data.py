@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from refida import data as dm
+
+
+@pytest.fixture
+def datadir(tmp_path) -> str:
+    tmp_path.joinpath("1_interim").mkdir()
+    return str(tmp_path)
+
+
+@pytest.fixture
+def topics() -> pd.DataFrame:
+    return pd.DataFrame(
+        data=dict(
+            id=["b", "a", "a", "c", "b"],
+            topic=["x", "y", "x", "z", "y"],
+            score=[0.9, 0.6, 0.01, 0.8, 0.3],
+            group=["G1", "G2", "G1", "G2", "G2"],
+        )
+    )
+
+
+def test_get_batches(datadir):
+    pd.DataFrame(
+        data=dict(id=[1, 2, 3], text=["a", None, "c"], summary=["x", "y", "z"])
+    ).to_csv(dm.get_etl_data_path(datadir), index=False)
+
+    assert dm.get_etl_columns(datadir) == ["id", "text", "summary"]
+    assert dm.get_etl_size(datadir) == 3
+
+    batches = list(dm.get_batches("summary", datadir, 2))
+    assert batches == [[(1, "x"), (2, "y")], [(3, "z")]]
+
+    chunks = list(dm.get_etl_chunks(["id", "text", "details"], datadir, 2))
+    assert [chunk.columns.tolist() for chunk in chunks] == [["id", "text"]] * 2
+
+    batches = list(dm.get_sections_batches(["summary", "text"], datadir, 2))
+    assert [section for section, _ in batches] == ["summary", "text"] * 2
+    assert batches[0] == ("summary", [(1, "x"), (2, "y")])
+    assert batches[3] == ("text", [(3, "c")])
+
+
+def test_get_batches_not_found(datadir):
+    assert dm.get_etl_columns(datadir) is None
+    assert dm.get_etl_size(datadir) == 0
+
+
+def test_topics_matrix(datadir, topics):
+    dm.save_topics_matrix(topics, dm.get_topics_matrix_path("text", datadir), 0.05)
+    matrix = dm.get_topics_matrix("text", datadir)
+
+    assert matrix["ids"].tolist() == ["a", "b", "c"]
+    assert matrix["labels"].tolist() == ["x", "y", "z"]
+    assert len(matrix["data"]) == 4
+
+    found = dm.query_topics_matrix(matrix, 0.5)
+    assert found["id"].tolist() == ["a", "b", "c"]
+    assert found["topic"].tolist() == ["y", "x", "z"]
+    assert found["group"].tolist() == ["G2", "G1", "G2"]
+
+    found = dm.query_topics_matrix(matrix, 0.0, topics=["y"], ids=("b",))
+    assert found["id"].tolist() == ["b"]
+    assert found["score"].tolist() == pytest.approx([0.3], abs=1e-3)
+
+
+def test_topics_matrix_not_found(datadir):
+    assert dm.get_topics_matrix("text", datadir) is None
+
+
+@pytest.fixture
+def geo() -> pd.DataFrame:
+    uk = dict(place="United Kingdom", place_lat=54.7, place_lon=-2.7)
+    return pd.DataFrame(
+        data=[
+            dict(id="a", label="GPE", category="Local", state="England", **uk),
+            dict(id="a", label="GPE", category="Local", state="England", **uk),
+            dict(id="a", label="GPE", category="National", state="Scotland", **uk),
+            dict(id="a", label="GPE", category="National", state="Wales", **uk),
+            dict(id="b", label="GPE", category="National", state="Wales", **uk),
+            dict(
+                id="c",
+                label="GPE",
+                category="Global",
+                state=None,
+                place="France",
+                place_lat=46.0,
+                place_lon=2.0,
+            ),
+        ]
+    )
+
+
+def test_places_matrix(datadir, geo):
+    dm.save_places_matrix(geo, dm.get_places_matrix_path(datadir))
+    matrix = dm.get_places_matrix(datadir)
+
+    assert matrix["ids"].tolist() == ["a", "b", "c"]
+    assert matrix["state"].tolist() == ["", "England", "Scotland", "Wales"]
+    assert len(matrix["indices"]) == 5
+
+    found = dm.query_places_matrix(matrix, ("a", "b", "c"))
+    assert found["place"].tolist() == ["France", "United Kingdom", "United Kingdom"]
+    assert found["category"].tolist() == ["Global", "Local", "National"]
+    assert found["count"].tolist() == [1, 1, 2]
+
+    found = dm.query_places_matrix(matrix, ("a", "b"), ["GPE", "LOC"], state=True)
+    assert found["state"].tolist() == ["England", "Scotland", "Wales"]
+    assert found["count"].tolist() == [1, 1, 2]
+
+    found = dm.query_places_matrix(matrix, ("b",), ["LOC"])
+    assert found.empty
+
+
+def test_places_matrix_not_found(datadir):
+    assert dm.get_places_matrix(datadir) is None
+
+
+def test_summaries_cache(datadir):
+    path = dm.get_summaries_cache_path(datadir)
+    assert dm.get_cached_summaries(path, "model", ["a"]) == {}
+
+    dm.cache_summaries(path, "model", {"a": "summary a", "b": "summary b"})
+    dm.cache_summaries(path, "model", {"a": "new summary a"})
+
+    assert dm.get_cached_summaries(path, "model", ["a", "b", "c"]) == {
+        "a": "new summary a",
+        "b": "summary b",
+    }
+    assert dm.get_cached_summaries(path, "other model", ["a"]) == {}
+
+
+def test_explanations(datadir):
+    path = dm.get_explanations_path("text", datadir)
+    assert dm.get_explanations("text", datadir) is None
+
+    explanations = [
+        ("b", "x", np.array(["Hello", " world"]), np.array([0.5, -0.25])),
+        ("a", "y", np.array(["A", " text", "."]), np.array([0.1, 0.2, 0.3])),
+        ("a", "x", np.array(["A", " text", "."]), np.array([-0.1, 0.0, 0.7])),
+    ]
+    dm.save_explanations(explanations, path)
+    store = dm.get_explanations("text", datadir)
+
+    assert store["values"].dtype == np.float16
+    assert store["ids"].tolist() == ["a", "a", "b"]
+
+    tokens, values = dm.get_explanation(store, "b", "x")
+    assert tokens.tolist() == ["Hello", " world"]
+    assert values.tolist() == [0.5, -0.25]
+    assert dm.get_explanation(store, "b", "y") is None
+
+    assert [
+        (doc_id, topic, tokens.tolist())
+        for doc_id, topic, tokens, _ in dm.iter_explanations(store)
+    ] == [
+        ("a", "x", ["A", " text", "."]),
+        ("a", "y", ["A", " text", "."]),
+        ("b", "x", ["Hello", " world"]),
+    ]
+
+
+def test_merge_explanations(datadir):
+    assert dm.merge_explanations("text", datadir) is None
+
+    dm.save_explanations(
+        [("a", "x", np.array(["A"]), np.array([0.5]))],
+        dm.get_explanations_path("text", datadir),
+    )
+    dm.save_explanations(
+        [("b", "x", np.array(["B"]), np.array([0.25]))],
+        dm.get_explanations_shard_path("text", 0, datadir),
+    )
+    dm.save_explanations(
+        [("a", "x", np.array(["C"]), np.array([1.0]))],
+        dm.get_explanations_shard_path("text", 1, datadir),
+    )
+
+    store = dm.merge_explanations("text", datadir)
+
+    assert store["ids"].tolist() == ["a", "b"]
+    assert dm.get_explanation(store, "a", "x")[0].tolist() == ["C"]
+    assert not dm.get_explanations_shards_path("text", datadir).exists()
+    assert dm.merge_explanations("text", datadir)["ids"].tolist() == ["a", "b"]
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from refida import distill
+
+
+@pytest.fixture
+def labels() -> list[str]:
+    return ["Economic", "Health", "Social"]
+
+
+@pytest.fixture
+def topics(labels) -> pd.DataFrame:
+    return pd.DataFrame(
+        data=dict(
+            id=[1, 1, 2, 3],
+            topic=[labels[0], labels[1], labels[1], labels[2]],
+            score=[0.9, 0.1, 0.8, 0.7],
+        )
+    )
+
+
+def test_get_targets(topics, labels):
+    targets = distill.get_targets(topics, [3, 2, 1, 4], labels)
+
+    assert targets.shape == (4, len(labels))
+    assert targets[0].tolist() == pytest.approx([0.0, 0.0, 0.7])
+    assert targets[2].tolist() == pytest.approx([0.9, 0.1, 0.0])
+    assert targets[3].sum() == 0
+
+
+def test_fit(topics, labels):
+    ids = [1, 2, 3]
+    features = np.eye(len(ids), dtype=np.float32)
+    targets = distill.get_targets(topics, ids, labels)
+
+    weights, bias = distill.fit(features, targets, epochs=2000, l2=0)
+    predictions = distill.predict(features, weights, bias)
+
+    assert np.abs(predictions - targets).max() < 0.1
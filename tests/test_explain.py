@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from refida import explain, registry
+
+
+class KeywordClassifier:
+    """
+    Zero shot classifier stub, the score of a topic is high when the text mentions it.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts, topics, multilabel=False):
+        self.calls += 1
+        return [
+            [
+                (idx, 0.9 if topic.lower() in text.lower() else 0.1)
+                for idx, topic in enumerate(topics)
+            ]
+            for text in texts
+        ]
+
+
+@pytest.fixture
+def classifier(monkeypatch) -> KeywordClassifier:
+    classifier = KeywordClassifier()
+    monkeypatch.setattr(registry, "get_labels", lambda model_name: classifier)
+    monkeypatch.setattr(
+        registry,
+        "get_segmentation",
+        lambda: lambda text: [f"{s.strip()}." for s in text.split(".") if s.strip()],
+    )
+    return classifier
+
+
+def test_sentence_occlusion(classifier):
+    text = "Health is good. Nothing here. Law is bad."
+    sentences, values = explain.sentence_occlusion(text, ["health", "law"], "model")
+
+    assert sentences.tolist() == ["Health is good. ", "Nothing here. ", "Law is bad. "]
+    assert values["health"] == pytest.approx([0.8, 0.0, 0.0])
+    assert values["law"] == pytest.approx([0.0, 0.0, 0.8])
+    assert classifier.calls == 2
+
+
+def test_sentence_occlusion_max_passes(classifier):
+    text = "Health is good. Nothing here. Law is bad. Nothing there."
+    _, values = explain.sentence_occlusion(text, ["law"], "model", max_passes=3)
+
+    assert values["law"] == pytest.approx([0.0, 0.0, 0.4, 0.4])
+    assert np.sum(values["law"]) == pytest.approx(0.8)
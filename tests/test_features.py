@@ -1,9 +1,11 @@
 import nltk
+import numpy as np
 import pandas as pd
 import pytest
+from geopy.location import Location
 
 from refida import features
-from settings import TOPIC_CLASSIFICATION_AREAS
+from settings import TOPIC_CLASSIFICATION_AREAS, TOPIC_CLASSIFICATION_TOPICS
 
 nltk.download("punkt")
 
@@ -43,3 +45,249 @@ def test_topic_classification_threshold(data):
         data, "text", topics=TOPIC_CLASSIFICATION_AREAS, threshold=0.5
     )
     assert len(topics) < len(data) * len(TOPIC_CLASSIFICATION_AREAS)
+
+
+def test_topic_classification_prefilter(data):
+    prefilter = 3
+    topics = features.topic_classification(
+        data, "text", topics=TOPIC_CLASSIFICATION_TOPICS, prefilter=prefilter
+    )
+    assert len(topics) == len(data) * prefilter
+
+
+class PairsClassifier:
+    """
+    Labels pipeline stub, records the (text, label) pairs it scores, and scores each
+    label by its position.
+    """
+
+    def __init__(self):
+        self.pairs = []
+
+    def __call__(self, texts, labels, multilabel=True):
+        self.pairs.extend((text, label) for text in texts for label in labels)
+        return [[(idx, 1 / (idx + 1)) for idx in range(len(labels))] for _ in texts]
+
+
+def test_classify_candidates():
+    classifier = PairsClassifier()
+
+    predictions = features.classify_candidates(
+        classifier, ["a", "b", "c", "d"], ["x", "y", "z"], [[0, 2], [1, 2], [0, 2], []]
+    )
+
+    assert sorted(classifier.pairs) == [
+        ("a", "x"),
+        ("a", "z"),
+        ("b", "y"),
+        ("b", "z"),
+        ("c", "x"),
+        ("c", "z"),
+    ]
+    assert predictions == [
+        [(0, 1.0), (2, 0.5)],
+        [(1, 1.0), (2, 0.5)],
+        [(0, 1.0), (2, 0.5)],
+        [],
+    ]
+
+
+def test_zero_shot_classification_pairs(monkeypatch):
+    classifier = PairsClassifier()
+    monkeypatch.setattr(
+        features, "label_prefilter", lambda texts, *args: [[0, 1], [1, 2]]
+    )
+
+    pairs = []
+    features.zero_shot_classification(
+        ["a", "b"], ["x", "y", "z"], prefilter=2, classifier=classifier, pairs=pairs
+    )
+
+    assert pairs == [len(classifier.pairs)] == [4]
+
+
+def test_zero_shot_classification_hierarchy_pairs():
+    hierarchy = {"Positive": ["x", "y"], "Negative": ["z"]}
+    scores = {("a", "Positive"): 0.9, ("b", "Negative"): 0.9}
+
+    class GroupsClassifier(PairsClassifier):
+        def __call__(self, texts, labels, multilabel=True):
+            if labels == list(hierarchy):
+                groups = list(enumerate(labels))
+                return [
+                    [(idx, scores.get((text, label), 0.1)) for idx, label in groups]
+                    for text in texts
+                ]
+
+            return super().__call__(texts, labels, multilabel)
+
+    classifier = GroupsClassifier()
+    pairs = []
+    features.zero_shot_classification(
+        ["a", "b"],
+        ["x", "y", "z"],
+        hierarchy=hierarchy,
+        group_threshold=0.5,
+        classifier=classifier,
+        pairs=pairs,
+    )
+
+    # each document is only scored against the topics of the group it selected
+    assert sorted(classifier.pairs) == [("a", "x"), ("a", "y"), ("b", "z")]
+    assert pairs == [4, 3]
+
+
+def test_topics_recall():
+    reference = pd.DataFrame(
+        data=dict(id=[1, 1, 2], topic=["a", "b", "a"], score=[0.9, 0.8, 0.1])
+    )
+    topics = pd.DataFrame(data=dict(id=[1, 2], topic=["a", "a"], score=[0.9, 0.1]))
+
+    assert features.topics_recall(reference, topics, 0.5) == 0.5
+    assert features.topics_recall(reference, topics, 0.0) == 2 / 3
+    assert features.topics_recall(reference, topics, 0.95) is None
+
+
+def test_topic_classification_hierarchy(data):
+    hierarchy = {
+        "Positive": ["strength", "future plans"],
+        "Negative": ["area for improvement"],
+    }
+    topics = features.topic_classification(
+        data,
+        "text",
+        topics=TOPIC_CLASSIFICATION_AREAS,
+        hierarchy=hierarchy,
+        group_threshold=1.0,
+    )
+    assert 0 < len(topics) < len(data) * len(TOPIC_CLASSIFICATION_AREAS)
+    assert topics["topic"].isin(TOPIC_CLASSIFICATION_AREAS).all()
+
+
+def test_stream_topic_classification(data):
+    rows = list(data[["id", "text"]].itertuples(index=False, name=None))
+    batches = [rows[:2], rows[2:]]
+    topics = list(
+        features.stream_topic_classification(
+            batches, topics=TOPIC_CLASSIFICATION_AREAS
+        )
+    )
+
+    assert len(topics) == len(batches)
+    assert sum(len(t) for t in topics) == len(data) * len(TOPIC_CLASSIFICATION_AREAS)
+
+
+def test_topics_long_format():
+    data = pd.DataFrame(data=dict(id=[1, 2, 3]))
+    predictions = [[(0, 0.9), (1, 0.2)], [], [(2, 0.7)]]
+
+    topics = features.topics_long_format(data, predictions, ["a", "b", "c"], 0.5)
+
+    assert topics["id"].tolist() == [1, 3]
+    assert topics["topic"].tolist() == ["a", "c"]
+    assert topics["score"].tolist() == [0.9, 0.7]
+
+
+def test_get_chunks():
+    sentences = ["a b.", "c d e.", "f.", "g h i j k l."]
+
+    chunks = features.get_chunks(sentences, [2, 3, 1, 6], 5)
+
+    assert chunks == ["a b. c d e.", "f.", "g h i j k l."]
+
+
+def test_get_central_sentences():
+    vectors = np.array([[1.0, 0.0], [0.0, 1.0], [0.8, 0.6], [0.6, 0.8]])
+
+    assert features.get_central_sentences(vectors, 2) == [2, 3]
+    assert features.get_central_sentences(vectors, 5) == [0, 1, 2, 3]
+
+
+def test_extractive_summarise(data):
+    summaries = features.extractive_summarise(data, k=1)
+
+    assert len(summaries) == len(data)
+    assert summaries["summary"].str.len().max() <= data["text"].str.len().max()
+
+
+def test_get_length_order():
+    assert features.get_length_order(["ab", "abcd", "", "abc"]) == [1, 3, 0, 2]
+
+
+def test_entities_agreement():
+    reference = pd.DataFrame(
+        data=dict(id=[1, 1, 2], label=["GPE", "ORG", "ORG"], text=["a", "b", "c"])
+    )
+    entities = pd.DataFrame(
+        data=dict(id=[1, 1], label=["GPE", "NORP"], text=["a", "d"])
+    )
+
+    agreement = features.entities_agreement(reference, entities)
+
+    assert agreement.loc["all", "found"] == 1
+    assert agreement.loc["all", "precision"] == 0.5
+    assert agreement.loc["ORG", "recall"] == 0
+    assert features.entities_agreement(reference.head(0), entities) is None
+
+
+def stub_geocoder(name, calls=None):
+    if calls is not None:
+        calls.append(name)
+
+    if name == "Atlantis":
+        return None
+
+    address = dict(country="United Kingdom") if name == "London" else {}
+    return Location(
+        name,
+        (51.5, -0.1),
+        dict(
+            display_name=name,
+            address=address,
+            geojson=dict(type="Point", coordinates=[-0.1, 51.5]),
+        ),
+    )
+
+
+@pytest.fixture
+def places() -> pd.DataFrame:
+    return pd.DataFrame(
+        data=dict(
+            id=[1, 2, 3, 4],
+            label=["GPE", "GPE", "GPE", "ORG"],
+            text=["London", "London", "Atlantis", "KCL"],
+        )
+    )
+
+
+def test_geolocate(places):
+    calls = []
+
+    geo_df, geojson_features = features.geolocate(
+        places, concurrency=4, geocoder=lambda name: stub_geocoder(name, calls)
+    )
+
+    assert sorted(calls) == ["Atlantis", "London", "United Kingdom"]
+    assert geo_df["id"].tolist() == [1, 2]
+    assert geo_df["place"].tolist() == ["United Kingdom"] * 2
+    assert len(geojson_features) == 1
+
+
+def test_geolocate_centroids(places):
+    calls = []
+
+    geo_df, _ = features.geolocate(
+        places,
+        geocoder=lambda name: stub_geocoder(name, calls),
+        centroids={"United Kingdom": (54.0, -2.0)},
+    )
+
+    assert sorted(calls) == ["Atlantis", "London"]
+    assert geo_df["place_lat"].tolist() == [54.0, 54.0]
+
+
+def test_get_centroids():
+    centroids = features.get_centroids(["London", "Atlantis"], stub_geocoder)
+
+    assert centroids["place"].tolist() == ["London", "United Kingdom"]
+    assert centroids["lat"].tolist() == [51.5, 51.5]
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import pytest
+
+from refida import gazetteer as gz
+
+
+def write_rows(path: Path, rows: list[list]) -> Path:
+    path.write_text(
+        "\n".join("\t".join(str(value) for value in row) for row in rows) + "\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+@pytest.fixture
+def gazetteer(tmp_path: Path) -> Path:
+    places = write_rows(
+        tmp_path / "places.txt",
+        [
+            [2643743, "London", "London", "Londres,Londra", 51.5, -0.12, "P", "PPLC"]
+            + ["GB", "", "ENG", "", "", "", 8961989, "", 25, "Europe/London", ""],
+            [6058560, "London", "London", "", 42.98, -81.23, "P", "PPL"]
+            + ["CA", "", "08", "", "", "", 346765, "", 252, "America/Toronto", ""],
+            [2635167, "United Kingdom", "United Kingdom", "UK,Great Britain", 54.75]
+            + [-2.7, "A", "PCLI", "GB", "", "00", "", "", "", 66488991, "", 0, "", ""],
+            [6255148, "Europe", "Europe", "", 48.69, 9.14, "L", "CONT", "", ""]
+            + ["00", "", "", "", 741000000, "", 0, "", ""],
+            [1, "A Road", "A Road", "", 0, 0, "R", "RD", "GB", "", "ENG"]
+            + ["", "", "", 0, "", 0, "", ""],
+        ],
+    )
+    countries = write_rows(
+        tmp_path / "countryInfo.txt",
+        [
+            ["#ISO", "ISO3", "ISO-Numeric", "fips", "Country"],
+            ["GB", "GBR", 826, "UK", "United Kingdom", "London"],
+            ["CA", "CAN", 124, "CA", "Canada", "Ottawa"],
+        ],
+    )
+    admin1 = write_rows(
+        tmp_path / "admin1.txt",
+        [["GB.ENG", "England", "England", 6269131], ["CA.08", "Ontario", "Ontario", 1]],
+    )
+
+    path = tmp_path / "gazetteer.sqlite"
+    assert gz.build(path, [places], countries, admin1) == 4
+
+    return path
+
+
+def test_geocode(gazetteer):
+    location = gz.geocode("London", gazetteer)
+    assert location.latitude == 51.5
+    assert location.raw["display_name"] == "London, England, United Kingdom"
+    assert location.raw["address"] == dict(
+        city="London", state="England", country="United Kingdom"
+    )
+    assert location.raw["geojson"] == dict(type="Point", coordinates=[-0.12, 51.5])
+
+    assert gz.geocode("londres", gazetteer).latitude == 51.5
+    assert gz.geocode("The UK", gazetteer).raw["address"] == dict(
+        country="United Kingdom"
+    )
+    assert gz.geocode("Europe", gazetteer).raw["address"] == {}
+    assert gz.geocode("A Road", gazetteer) is None
+    assert gz.geocode("Atlantis", gazetteer) is None
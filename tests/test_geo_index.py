@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from refida import geo_index
+
+
+@pytest.fixture
+def geo() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            dict(id=1, lat=51.5, lon=-0.12),
+            dict(id=2, lat=51.75, lon=-1.25),
+            dict(id=2, lat=51.75, lon=-1.25),
+            dict(id=3, lat=48.85, lon=2.35),
+            dict(id=4, lat=-17.7, lon=179.9),
+            dict(id=5, lat=-17.7, lon=-179.9),
+            dict(id=6, lat=None, lon=None),
+        ]
+    )
+
+
+def test_build(geo: pd.DataFrame):
+    index = geo_index.build(geo, cell_size=1.0)
+
+    assert len(index["ids"]) == 5
+    assert (index["keys"][:-1] <= index["keys"][1:]).all()
+
+
+def test_save_load(geo: pd.DataFrame, tmp_path: Path):
+    path = tmp_path / "geo_index.npz"
+    assert geo_index.load(path) is None
+
+    geo_index.save(path, geo_index.build(geo))
+    index = geo_index.load(path)
+
+    assert index is not None
+    assert geo_index.query_radius(index, 51.5, -0.12, 100) == {"1", "2"}
+
+
+def test_query_radius(geo: pd.DataFrame):
+    index = geo_index.build(geo, cell_size=1.0)
+
+    assert geo_index.query_radius(index, 51.5, -0.12, 10) == {"1"}
+    assert geo_index.query_radius(index, 51.5, -0.12, 400) == {"1", "2", "3"}
+    assert geo_index.query_radius(index, -17.7, 180, 50) == {"4", "5"}
+    assert geo_index.query_radius(index, 0, 0, 100) == set()
+    assert len(geo_index.query_radius(index, 0, 0, 20000)) == 5
+
+
+def test_build_bins():
+    geo = pd.DataFrame(
+        [
+            dict(place_lat=51.5, place_lon=-0.12),
+            dict(place_lat=51.5, place_lon=-0.12),
+            dict(place_lat=48.85, place_lon=2.35),
+        ]
+    )
+    bins = geo_index.build_bins(geo, [10.0, 1.0])
+
+    assert len(bins) == 4
+    coarse = bins[bins["resolution"] == 10.0]
+    assert coarse["bin_lat"].tolist() == [55.0, 45.0]
+    assert coarse["bin_lon"].tolist() == [-5.0, 5.0]
+    fine = bins[bins["resolution"] == 1.0]
+    assert fine["bin_lat"].tolist() == [51.5, 48.5]
+    assert fine["bin_lon"].tolist() == [-0.5, 2.5]
+
+
+def test_aggregate_bins():
+    places = pd.DataFrame(
+        [
+            dict(place="United Kingdom", place_lat=54.75, place_lon=-2.7, count=5),
+            dict(place="Ireland", place_lat=53.0, place_lon=-8.0, count=2),
+            dict(place="France", place_lat=46.0, place_lon=2.0, count=3),
+        ]
+    )
+    bins = geo_index.build_bins(places, [40.0, 1.0])
+
+    coarse = geo_index.aggregate_bins(places, bins, 40.0)
+    assert coarse["count"].tolist() == [10]
+    assert coarse["places"].tolist() == [3]
+    assert coarse["bin_label"].tolist() == ["United Kingdom and 2 more"]
+
+    fine = geo_index.aggregate_bins(places, bins, 1.0)
+    assert fine["count"].tolist() == [5, 3, 2]
+    assert fine["bin_label"].tolist() == ["United Kingdom", "France", "Ireland"]
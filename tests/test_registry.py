@@ -0,0 +1,36 @@
+from refida import registry
+
+
+def test_registry(monkeypatch):
+    rss = iter(size * 2**20 for size in [0, 100, 100, 250, 250, 400])
+    monkeypatch.setattr(registry, "get_rss", lambda: next(rss))
+
+    models = registry.ModelRegistry(budget=300)
+    loads = []
+
+    def loader(name: str):
+        return lambda: loads.append(name) or name
+
+    assert models.get("kind", "a", loader("a")) == "a"
+    assert models.get("kind", "b", loader("b")) == "b"
+    assert models.get("kind", "a", loader("a")) == "a"
+    assert loads == ["a", "b"]
+
+    # c does not fit the budget, b is the least recently used
+    assert models.get("kind", "c", loader("c")) == "c"
+    assert models.get_memory() == 250 * 2**20
+
+    report = models.report()
+    assert [row["name"] for row in report] == ["a", "b", "c"]
+    assert [row["loaded"] for row in report] == [True, False, True]
+    assert [row["memory"] for row in report] == [100, 0, 150]
+
+
+def test_registry_options(monkeypatch):
+    monkeypatch.setattr(registry, "get_rss", lambda: 0)
+
+    models = registry.ModelRegistry()
+    a = models.get("kind", "a", lambda: object(), quantize=False)
+
+    assert models.get("kind", "a", lambda: object(), quantize=False) is a
+    assert models.get("kind", "a", lambda: object(), quantize=True) is not a
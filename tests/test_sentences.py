@@ -0,0 +1,101 @@
+import re
+
+import pandas as pd
+import pytest
+
+import settings as _s
+from refida import registry
+from refida import sentences as sm
+
+
+class Segmentation:
+    """
+    Segmentation pipeline stub, splits on full stops and normalises the whitespace, as
+    txtai does.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        return [
+            " ".join(sentence.split())
+            for sentence in re.findall(r"[^.]+\.?", text)
+            if sentence.strip()
+        ]
+
+
+@pytest.fixture
+def segmentation(monkeypatch) -> Segmentation:
+    segmentation = Segmentation()
+    monkeypatch.setattr(registry, "get_segmentation", lambda: segmentation)
+    return segmentation
+
+
+def test_get_offsets(segmentation):
+    text = "  Health is\ngood.   Nothing\t here.\nLaw "
+    offsets = sm.segment([text])[0]
+
+    assert [text[start:end] for start, end in offsets] == [
+        "Health is\ngood.",
+        "Nothing\t here.",
+        "Law",
+    ]
+    assert sm.split(text, offsets) == segmentation(text)
+
+
+def test_sentences_table(segmentation):
+    data = pd.DataFrame(
+        {
+            _s.FIELD_ID: [1, 2],
+            _s.DATA_SUMMARY: ["One. Two.", None],
+            _s.DATA_TEXT: ["Three.", "Four. Five."],
+        }
+    )
+    table = sm.sentences_table(data, [_s.DATA_SUMMARY, _s.DATA_DETAILS, _s.DATA_TEXT])
+
+    assert table[_s.FEATURE_SENTENCE_ID].tolist() == [
+        "1:summary:0",
+        "1:summary:1",
+        "1:text:0",
+        "2:text:0",
+        "2:text:1",
+    ]
+    assert table[_s.FEATURE_SENTENCE_START].tolist() == [0, 5, 0, 0, 6]
+    assert table[_s.FEATURE_SENTENCE_END].tolist() == [4, 9, 6, 5, 11]
+
+    tables = list(
+        sm.stream_sentences([data.iloc[:1], data.iloc[1:]], [_s.DATA_TEXT], n_jobs=1)
+    )
+    assert [len(batch) for batch in tables] == [1, 2]
+
+
+def test_get_sentences(segmentation):
+    data = pd.DataFrame(
+        {_s.FIELD_ID: [1, 2, 3], _s.DATA_TEXT: ["One. Two.", "Changed.", "Three."]}
+    )
+    table = sm.sentences_table(
+        pd.DataFrame(
+            {_s.FIELD_ID: [1, 2], _s.DATA_DETAILS: ["One. Two.", "Old text."]}
+        ),
+        [_s.DATA_DETAILS],
+    )
+    segmentation.calls = 0
+
+    sentences = sm.get_sentences(data, _s.DATA_TEXT, table)
+
+    assert sentences[_s.FEATURE_SENTENCE_ID].tolist() == [
+        "1:details:0",
+        "1:details:1",
+        "2:details:0",
+        "3:details:0",
+    ]
+    assert sentences[_s.FEATURE_SENTENCE_TEXT].tolist() == [
+        "One.",
+        "Two.",
+        "Changed.",
+        "Three.",
+    ]
+    # the text of 2 changed after the table was built and 3 is not in the table
+    assert segmentation.calls == 2